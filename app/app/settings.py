@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -55,6 +57,46 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# "full" serves the admin and the API docs. "api" serves only the API and
+# leaves the apps and middleware they need out of the worker.
+APP_PROFILE = os.environ.get("APP_PROFILE", "full")
+
+SERVE_ADMIN = APP_PROFILE == "full"
+
+SERVE_API_DOCS = APP_PROFILE == "full"
+
+if not SERVE_ADMIN:
+    INSTALLED_APPS = [
+        app
+        for app in INSTALLED_APPS
+        if app
+        not in (
+            "django.contrib.admin",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+        )
+    ]
+    MIDDLEWARE = [
+        middleware
+        for middleware in MIDDLEWARE
+        if middleware
+        not in (
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "django.contrib.auth.middleware.AuthenticationMiddleware",
+            "django.contrib.messages.middleware.MessageMiddleware",
+        )
+    ]
+
+if not SERVE_API_DOCS:
+    INSTALLED_APPS.remove("drf_spectacular")
+
+# OpenAPI schema generated at build time by
+# `manage.py spectacular --format openapi-json --file <path>`. The docs
+# generate it on first use when the file is missing.
+OPENAPI_SCHEMA_FILE = os.environ.get(
+    "OPENAPI_SCHEMA_FILE", str(BASE_DIR / "openapi.json")
+)
+
 ROOT_URLCONF = "app.urls"
 
 TEMPLATES = [
@@ -81,14 +123,100 @@ WSGI_APPLICATION = "app.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # Per-process connection pool, see core.db.pool. A MAX_SIZE of 0
+        # opens a new connection per request instead.
+        "POOL": {
+            "MAX_SIZE": int(os.environ.get("DB_POOL_SIZE", 10)),
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+            "MAX_LIFETIME": float(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),
+            "CHECK_INTERVAL": float(
+                os.environ.get("DB_POOL_CHECK_INTERVAL", 30)
+            ),
+        },
     }
 }
 
+# Read replicas share the primary's credentials and are listed as a comma
+# separated DB_REPLICA_HOSTS. Each one is exposed as "replica_<n>".
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# The test suite gets a replica mirroring the primary, so replica routing is
+# tested against a real second connection. It serves no reads unless a test
+# lists it in DATABASE_REPLICAS.
+TESTING = sys.argv[1:2] == ["test"]
+if TESTING and not DATABASE_REPLICAS:
+    DATABASES["replica_1"] = {
+        **DATABASES["default"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Task and tag data is sharded by user. Extra shards share the primary's
+# credentials and are listed as a comma separated DB_SHARD_HOSTS. Each one
+# is exposed as "shard_<n>"; users always live in "default". A shard numbers
+# its task data from its own id range, picked by SHARD_INDEX, so rows keep
+# their ids when users move (see core.sharding.reserve_id_range).
+DATABASE_SHARDS = ["default"]
+for index, host in enumerate(
+    filter(None, os.environ.get("DB_SHARD_HOSTS", "").split(",")), start=1
+):
+    alias = f"shard_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host.strip(),
+        "SHARD_INDEX": index,
+    }
+    DATABASE_SHARDS.append(alias)
+
+# The test suite gets a second shard in a database of its own, which only
+# tests listing it in DATABASE_SHARDS move users to.
+if TESTING and len(DATABASE_SHARDS) == 1:
+    DATABASES["shard_1"] = {
+        **DATABASES["default"],
+        "NAME": f"{DATABASES['default']['NAME']}_shard_1",
+        "SHARD_INDEX": 1,
+    }
+
+# Seconds a user's shard lookup is cached.
+SHARD_CACHE_SECONDS = int(os.environ.get("DB_SHARD_CACHE_SECONDS", 300))
+
+# Rows deleted per transaction when purging a user's account.
+PURGE_BATCH_SIZE = int(os.environ.get("PURGE_BATCH_SIZE", 1000))
+
+DATABASE_ROUTERS = [
+    "core.db.routers.ShardRouter",
+    "core.db.routers.PrimaryReplicaRouter",
+]
+
+# Seconds a user keeps reading from the primary after a write.
+REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+
+# Seconds between health probes of a replica that looked healthy.
+REPLICA_HEALTH_CHECK_INTERVAL = int(
+    os.environ.get("DB_REPLICA_HEALTH_CHECK_INTERVAL", 10)
+)
+
+# Seconds an unhealthy replica is kept out of rotation.
+REPLICA_RETRY_SECONDS = int(os.environ.get("DB_REPLICA_RETRY_SECONDS", 30))
+
+# Replication lag (in seconds) above which a replica counts as unhealthy.
+# Zero disables the lag check.
+REPLICA_MAX_LAG_SECONDS = int(os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", 0))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -133,6 +261,127 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = 'core.User'
 
+# Responses of at least COMPRESSION_MIN_SIZE bytes are compressed with the
+# first of COMPRESSION_ENCODINGS the client accepts. The levels favour CPU
+# time over ratio: brotli 4 and zstd 3 beat gzip 6 on both.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_ENCODINGS = ["zstd", "br", "gzip"]
+COMPRESSION_LEVELS = {
+    "zstd": int(os.environ.get("COMPRESSION_ZSTD_LEVEL", 3)),
+    "br": int(os.environ.get("COMPRESSION_BROTLI_LEVEL", 4)),
+    "gzip": int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6)),
+}
+
+# Task and tag change events streamed at /api/events/. LocalBackend only
+# reaches clients connected to the same process, use
+# core.events.PostgresNotifyBackend when running several processes.
+EVENTS_BACKEND = os.environ.get("EVENTS_BACKEND", "core.events.LocalBackend")
+# Events buffered per client before it is told to resync instead.
+EVENTS_MAX_PENDING = int(os.environ.get("EVENTS_MAX_PENDING", 1000))
+EVENTS_COALESCE_SECONDS = float(os.environ.get("EVENTS_COALESCE_SECONDS", 0.05))
+EVENTS_KEEPALIVE_SECONDS = 15
+
+# Outbox events delivered per webhook request by `dispatch_webhooks`, how
+# many subscriptions are delivered concurrently and how failed deliveries
+# back off.
+WEBHOOK_BATCH_SIZE = int(os.environ.get("WEBHOOK_BATCH_SIZE", 100))
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", 8))
+WEBHOOK_TIMEOUT = float(os.environ.get("WEBHOOK_TIMEOUT", 5))
+WEBHOOK_RETRY_BASE_SECONDS = 5
+WEBHOOK_RETRY_MAX_SECONDS = 3600
+# Age at which an outbox event's transaction is assumed to have committed.
+WEBHOOK_SETTLE_SECONDS = 5
+
+# Background jobs run by `manage.py run_workers`. A running job is given
+# to another worker when its worker hasn't reported for
+# JOB_VISIBILITY_TIMEOUT seconds.
+JOB_WORKER_PROCESSES = int(os.environ.get("JOB_WORKER_PROCESSES", 1))
+JOB_WORKER_THREADS = int(os.environ.get("JOB_WORKER_THREADS", 4))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1))
+JOB_VISIBILITY_TIMEOUT = int(os.environ.get("JOB_VISIBILITY_TIMEOUT", 300))
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BASE_SECONDS = 10
+
+# Due-date reminders fired by `manage.py run_reminders`, REMINDER_LEAD_SECONDS
+# before a task is due. The scheduler holds the reminders of the next
+# REMINDER_WINDOW_SECONDS in memory, but never more than REMINDER_MAX_PENDING.
+REMINDER_SINK = os.environ.get("REMINDER_SINK", "core.reminders.EventSink")
+REMINDER_LEAD_SECONDS = int(os.environ.get("REMINDER_LEAD_SECONDS", 900))
+REMINDER_WINDOW_SECONDS = 3600
+REMINDER_MAX_PENDING = int(os.environ.get("REMINDER_MAX_PENDING", 100000))
+
+# Number of hash partitions by user of the task table on PostgreSQL, 0 keeps
+# it a plain table. Applied by `migrate` and `manage.py partition_tasks`.
+TASK_PARTITIONS = int(os.environ.get("TASK_PARTITIONS", 0))
+
+# Completed tasks due more than TASK_ARCHIVE_AFTER_DAYS ago are moved by
+# `manage.py archive_tasks` to compressed segment files of at most
+# TASK_ARCHIVE_BATCH_SIZE tasks in TASK_ARCHIVE_DIR, which every process
+# serving the API must be able to read.
+TASK_ARCHIVE_DIR = os.environ.get("TASK_ARCHIVE_DIR", str(BASE_DIR / "archive"))
+TASK_ARCHIVE_AFTER_DAYS = int(os.environ.get("TASK_ARCHIVE_AFTER_DAYS", 365))
+TASK_ARCHIVE_BATCH_SIZE = 10000
+
+# Most occurrences of recurring tasks a task list expands.
+TASK_MAX_OCCURRENCES = 1000
+
+# Longest agenda and its default number of tasks per day or week.
+AGENDA_MAX_DAYS = 366
+AGENDA_TASKS_PER_BUCKET = 5
+
+# Responses to POST and PATCH requests with an Idempotency-Key header are kept
+# for IDEMPOTENCY_TTL_SECONDS and replayed to retries. A retry arriving while
+# the first request runs waits up to IDEMPOTENCY_WAIT_SECONDS for its response.
+# They are stored in the Django cache, so multi-process deployments need a
+# shared cache backend.
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 86400))
+IDEMPOTENCY_WAIT_SECONDS = 5
+# Expiry of the lock of a running request, in case its process dies.
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+# Identical task and tag reads of a user running at the same time share one
+# computation, and its result is reused for READ_COALESCE_TTL_SECONDS after it
+# is done (0 only shares running reads). Writes through the API or the ORM in
+# the same process drop a user's results, and users who wrote through the API
+# skip shared results while they are pinned to the primary, so keep this below
+# REPLICA_PIN_SECONDS. Other writes by other processes show after at most this
+# long.
+READ_COALESCE_TTL_SECONDS = float(
+    os.environ.get("READ_COALESCE_TTL_SECONDS", 1)
+)
+
+# Requests accepted by POST /api/batch/, and threads running a parallel batch.
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+# GraphQL queries nested deeper than GRAPHQL_MAX_DEPTH or resolving more than
+# GRAPHQL_MAX_COST fields are rejected. Lists return at most GRAPHQL_MAX_LIST
+# items. Persisted queries are kept in the Django cache.
+GRAPHQL_MAX_DEPTH = 10
+GRAPHQL_MAX_COST = 10000
+GRAPHQL_MAX_LIST = 100
+GRAPHQL_PERSISTED_QUERY_TTL_SECONDS = 7 * 86400
+
+# Admin changelists of unfiltered tables estimated to hold at least this
+# many rows show PostgreSQL's row estimate instead of an exact count.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "core.renderers.MessagePackRenderer",
+        "core.renderers.CBORRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+        "core.parsers.MessagePackParser",
+        "core.parsers.CBORParser",
+    ],
 }
+
+if SERVE_API_DOCS:
+    REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = "drf_spectacular.openapi.AutoSchema"
+
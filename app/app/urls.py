@@ -14,20 +14,35 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 
+from core.views import BatchView, EventStreamView, GraphQLView, MetricsView
+
 urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("api/shema/", SpectacularAPIView.as_view(), name='api-schema'),
-    path("api/docs/",
-         SpectacularSwaggerView.as_view(url_name='api-schema'),
-         name='api_docs',
-         ),
     path("api/user/", include('user.urls')),
     path("api/task/", include('task.urls')),
+    path("api/", include('core.urls')),
+    path("api/metrics/", MetricsView.as_view(), name='metrics'),
+    path("api/events/", EventStreamView.as_view(), name='events'),
+    path("api/batch/", BatchView.as_view(), name='batch'),
+    path("api/graphql/", GraphQLView.as_view(), name='graphql'),
 ]
+
+if settings.SERVE_ADMIN:
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
+
+if settings.SERVE_API_DOCS:
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    from core.schema import SchemaView
+
+    urlpatterns += [
+        path("api/shema/", SchemaView.as_view(), name='api-schema'),
+        path("api/docs/",
+             SpectacularSwaggerView.as_view(url_name='api-schema'),
+             name='api_docs',
+             ),
+    ]
@@ -0,0 +1,18 @@
+"""
+Benchmarks, run from the app directory with ``python -m benchmarks.<name>``.
+"""
+import os
+
+import django
+
+
+def setup():
+    """Configure Django for a standalone benchmark run."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+
+
+def percentile(samples, fraction):
+    """Return the sample at `fraction` of the sorted samples."""
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
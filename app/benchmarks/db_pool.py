@@ -0,0 +1,61 @@
+"""
+Benchmark per-request connect latency with and without the pool.
+
+Needs the database from the environment (DB_HOST, DB_NAME, ...):
+
+    python -m benchmarks.db_pool --requests 500
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import percentile, setup
+
+
+def run(wrapper, requests):
+    """Simulate requests that connect, query and close at the end."""
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        wrapper.ensure_connection()
+        samples.append(time.perf_counter() - start)
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        wrapper.close()
+    return samples
+
+
+def report(label, samples):
+    print(f'{label:>10}: mean {statistics.mean(samples) * 1000:.3f} ms, '
+          f'p50 {percentile(samples, 0.5) * 1000:.3f} ms, '
+          f'p95 {percentile(samples, 0.95) * 1000:.3f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connections
+
+    default = connections['default']
+    backend = default.__class__
+    pool = {**default.settings_dict['POOL'], 'MAX_SIZE': 1}
+
+    direct = backend({**default.settings_dict, 'POOL': {'MAX_SIZE': 0}},
+                     alias='bench_direct')
+    pooled = backend({**default.settings_dict, 'POOL': pool},
+                     alias='bench_pooled')
+
+    direct_samples = run(direct, args.requests)
+    pooled_samples = run(pooled, args.requests)
+
+    report('direct', direct_samples)
+    report('pooled', pooled_samples)
+    saved = statistics.mean(direct_samples) - statistics.mean(pooled_samples)
+    print(f'Saved {saved * 1000:.3f} ms of connect latency per request.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Microbenchmark DRF's JSON renderer/parser against the orjson ones on a
+task list response:
+
+    python -m benchmarks.json_renderer --tasks 1000
+"""
+import argparse
+
+from benchmarks import setup
+from benchmarks.wire_formats import measure, task_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from core.parsers import FastJSONParser
+    from core.renderers import FastJSONRenderer
+
+    data = task_list(args.tasks, native=False)
+    results = {}
+    for name, renderer, json_parser in [
+        ('json', JSONRenderer(), JSONParser()),
+        ('orjson', FastJSONRenderer(), FastJSONParser()),
+    ]:
+        _, encode, decode = measure(renderer, json_parser, data, args.repeat)
+        results[name] = encode, decode
+        print(f'{name:>8}: encode {encode * 1000:.2f} ms, '
+              f'decode {decode * 1000:.2f} ms')
+
+    (encode, decode), (fast_encode, fast_decode) = results.values()
+    print(f'Speedup: encode {encode / fast_encode:.1f}x, '
+          f'decode {decode / fast_decode:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark payload size and encode/decode time of the wire formats on a
+task list response:
+
+    python -m benchmarks.wire_formats --tasks 1000
+"""
+import argparse
+import io
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup
+
+
+def task_list(count, native):
+    """Return a task list shaped like the serializer output."""
+    start = datetime(2089, 1, 1, tzinfo=timezone.utc)
+    tasks = []
+    for i in range(count):
+        created_at = start + timedelta(minutes=i)
+        due_date = created_at + timedelta(days=7)
+        tasks.append({
+            'id': i,
+            'created_at': created_at if native else created_at.isoformat(),
+            'description': f'Task number {i}',
+            'is_complete': i % 3 == 0,
+            'due_date': due_date if native else due_date.isoformat(),
+            'priority': i % 5,
+            'tags': [{'id': i % 7, 'name': 'Work'}],
+        })
+    return tasks
+
+
+def measure(renderer, parser, data, repeat):
+    body = renderer.render(data)
+    encode = min(timeit.repeat(
+        lambda: renderer.render(data), number=1, repeat=repeat
+    ))
+    decode = min(timeit.repeat(
+        lambda: parser.parse(io.BytesIO(body)), number=1, repeat=repeat
+    ))
+    return len(body), encode, decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from core.parsers import CBORParser, MessagePackParser
+    from core.renderers import CBORRenderer, MessagePackRenderer
+
+    formats = [
+        ('json', JSONRenderer(), JSONParser(), False),
+        ('msgpack', MessagePackRenderer(), MessagePackParser(), True),
+        ('cbor', CBORRenderer(), CBORParser(), True),
+    ]
+    baseline = None
+    for name, renderer, format_parser, native in formats:
+        data = task_list(args.tasks, native)
+        size, encode, decode = measure(renderer, format_parser, data,
+                                       args.repeat)
+        baseline = baseline or size
+        print(f'{name:>8}: {size:>8} bytes ({size / baseline:.0%}), '
+              f'encode {encode * 1000:.2f} ms, decode {decode * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
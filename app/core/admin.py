@@ -1,17 +1,89 @@
 """
 Django admin customization.
 """
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from core import models
+from core import models, purge
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using PostgreSQL's row estimate for big unfiltered tables.
+
+    An exact COUNT(*) has to scan the whole table, while `reltuples` is
+    maintained by VACUUM and ANALYZE and costs a single catalog lookup.
+    A partitioned table's estimate is the sum of its partitions'.
+    """
+
+    def estimate(self):
+        """Return the planner's row estimate, or None if unavailable."""
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT sum(greatest(reltuples, 0))::bigint FROM pg_class '
+                'WHERE oid = to_regclass(%s) OR oid IN ('
+                '  SELECT inhrelid FROM pg_inherits'
+                '  WHERE inhparent = to_regclass(%s)'
+                ')',
+                [queryset.model._meta.db_table] * 2,
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is not None and \
+                estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class UserIdFilter(admin.SimpleListFilter):
+    """Filter by a typed user id instead of listing every user."""
+    title = _('user id')
+    parameter_name = 'user_id'
+    template = 'admin/core/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'value': self.value() or '',
+            'preserved_params': [
+                (name, value) for name, value in changelist.params.items()
+                if name not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        if not value.isdigit():
+            return queryset.none()
+        return queryset.filter(user_id=value)
 
 
 class UserAdmin(BaseUserAdmin):
     """Define the admin pages for users."""
     ordering = ['id']
     list_display = ['email', 'username', 'phone_number']
+    search_fields = ['email', 'username']
     fieldsets = (
         (None, {'fields': ('email', 'username', 'phone_number')}),
         (
@@ -45,23 +117,76 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_deleted_objects(self, objs, request):
+        """List only the users, without collecting their related rows."""
+        objs = list(objs)
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        model_count = {self.opts.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        """Disable the user and leave the deletion to the purge worker."""
+        purge.schedule_user_purge(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            purge.schedule_user_purge(user)
+
 
 class TaskAdmin(admin.ModelAdmin):
     """Define the admin pages for tasks."""
     ordering = ['id']
     list_display = ['user', 'description', 'due_date',
                     'priority', 'is_complete']
-    list_filter = ('priority', 'is_complete', 'user')
+    list_filter = ('priority', 'is_complete', UserIdFilter)
+    list_select_related = ['user']
+    raw_id_fields = ['user', 'tags', 'series']
     readonly_fields = ['created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class TagAdmin(admin.ModelAdmin):
-    """Define the admin pages for tasks."""
+    """Define the admin pages for tags."""
     ordering = ['id']
     list_display = ['name', 'user']
-    list_filter = ('user',)
+    list_filter = (UserIdFilter,)
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class WebhookCursorInline(admin.TabularInline):
+    """Show the delivery position of a subscription on each shard."""
+    model = models.WebhookCursor
+    extra = 0
+    readonly_fields = ['shard', 'last_event_id', 'attempts', 'retry_at',
+                       'last_error']
+    can_delete = False
+
+
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    """Define the admin pages for webhook subscriptions."""
+    ordering = ['id']
+    list_display = ['url', 'topics', 'is_active']
+    list_filter = ('is_active',)
+    inlines = [WebhookCursorInline]
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Define the admin pages for background jobs."""
+    ordering = ['-id']
+    list_display = ['name', 'status', 'attempts', 'run_at', 'user']
+    list_filter = ('status', 'name')
+    raw_id_fields = ['user']
+    readonly_fields = ['created_at', 'updated_at']
 
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Task, TaskAdmin)
 admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.WebhookSubscription, WebhookSubscriptionAdmin)
+admin.site.register(models.Job, JobAdmin)
@@ -0,0 +1,250 @@
+"""
+Cold archive of old completed tasks.
+
+`archive_shard` moves completed tasks due more than TASK_ARCHIVE_AFTER_DAYS
+ago, with their tag links, out of the task table into segment files under
+TASK_ARCHIVE_DIR. A segment holds up to TASK_ARCHIVE_BATCH_SIZE tasks as
+newline-delimited JSON, one gzip member per user, and an `ArchiveChunk` row
+on the user's shard indexes each member, so a user's archive is read
+without decompressing anyone else's.
+
+The index rows are written and the tasks deleted in one transaction, and
+the segment of a failed transaction is removed, so a task is always either
+in the table or in the archive. Recurring tasks and their stored
+occurrences stay in the table, since listing a series reads them.
+"""
+import json
+import os
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from core import events, metrics
+from core.models import ArchiveChunk, Tag, Task
+
+SUFFIX = '.ndjson.gz'
+
+_READ_SIZE = 64 * 1024
+# Segments are written once and rarely read, favour the ratio.
+_LEVEL = 9
+# Younger files may belong to an archive transaction still running.
+_PRUNE_MIN_AGE = 3600
+
+
+class _Encoder(DjangoJSONEncoder):
+    """JSON encoder keeping the microseconds DjangoJSONEncoder drops."""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _path(segment):
+    return os.path.join(settings.TASK_ARCHIVE_DIR, segment)
+
+
+def archivable(using, before):
+    """Return the tasks of a shard that are archived when due before
+    `before`."""
+    return Task.objects.using(using).filter(
+        is_complete=True,
+        due_date__lt=before,
+        recurrence='',
+        series__isnull=True,
+    )
+
+
+def _record(task, tag_ids):
+    record = {
+        field.attname: getattr(task, field.attname)
+        for field in Task._meta.concrete_fields
+    }
+    record['tags'] = tag_ids
+    return json.dumps(record, cls=_Encoder).encode() + b'\n'
+
+
+def _write_segment(using, tasks, links):
+    """Write tasks sorted by user to a new segment.
+
+    Return its path and unsaved chunks.
+    """
+    segment = f'{using}/{timezone.now():%Y%m%d%H%M%S}-' \
+              f'{uuid.uuid4().hex}{SUFFIX}'
+    path = _path(segment)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    chunks = []
+    try:
+        with open(f'{path}.tmp', 'wb') as file:
+            for user_id, user_tasks in groupby(tasks,
+                                               key=attrgetter('user_id')):
+                offset = file.tell()
+                compressor = zlib.compressobj(_LEVEL, zlib.DEFLATED, 31)
+                count = 0
+                for task in user_tasks:
+                    file.write(compressor.compress(
+                        _record(task, links.get(task.pk, []))
+                    ))
+                    count += 1
+                file.write(compressor.flush())
+                chunks.append(ArchiveChunk(
+                    user_id=user_id, segment=segment, offset=offset,
+                    size=file.tell() - offset, tasks=count,
+                ))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f'{path}.tmp', path)
+    except BaseException:
+        if os.path.exists(f'{path}.tmp'):
+            os.remove(f'{path}.tmp')
+        raise
+    return path, chunks
+
+
+def _archive_batch(using, before, batch_size):
+    """Archive one segment of tasks. Return the number of tasks."""
+    through = Task.tags.through
+    path = None
+    try:
+        with transaction.atomic(using=using):
+            tasks = list(
+                archivable(using, before).select_for_update()
+                .order_by('user_id', 'id')[:batch_size]
+            )
+            if not tasks:
+                return 0
+            task_ids = [task.pk for task in tasks]
+            links = {}
+            for task_id, tag_id in through.objects.using(using) \
+                    .filter(task_id__in=task_ids).order_by('id') \
+                    .values_list('task_id', 'tag_id'):
+                links.setdefault(task_id, []).append(tag_id)
+
+            path, chunks = _write_segment(using, tasks, links)
+            ArchiveChunk.objects.using(using).bulk_create(chunks)
+            through.objects.using(using) \
+                .filter(task_id__in=task_ids)._raw_delete(using)
+            Task.objects.using(using).filter(
+                user_id__in={chunk.user_id for chunk in chunks},
+                pk__in=task_ids,
+            )._raw_delete(using)
+            for chunk in chunks:
+                # The tasks left the user's list, ask clients to refetch.
+                events.publish(chunk.user_id, 'resync', using=using)
+    except BaseException:
+        if path is not None:
+            os.remove(path)
+        raise
+    return len(tasks)
+
+
+def archive_shard(using, before=None, batch_size=None, progress=None):
+    """Archive the tasks of a shard completed and due before `before`,
+    TASK_ARCHIVE_AFTER_DAYS ago by default, a segment at a time.
+
+    `progress(archived)` is called after each segment. Return the number
+    of archived tasks.
+    """
+    if before is None:
+        before = timezone.now() - \
+            timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS)
+    batch_size = batch_size or settings.TASK_ARCHIVE_BATCH_SIZE
+    archived = 0
+    while True:
+        count = _archive_batch(using, before, batch_size)
+        if not count:
+            return archived
+        archived += count
+        metrics.increment('tasks_archived', count, shard=using)
+        if progress is not None:
+            progress(archived)
+
+
+def prune_segments():
+    """Delete the segments no chunk refers to any more, e.g. after their
+    users were purged. Return the number of deleted segments."""
+    referenced = set()
+    for alias in settings.DATABASE_SHARDS:
+        referenced.update(
+            ArchiveChunk.objects.using(alias)
+            .values_list('segment', flat=True).distinct()
+        )
+    root = settings.TASK_ARCHIVE_DIR
+    cutoff = time.time() - _PRUNE_MIN_AGE
+    pruned = 0
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if not name.endswith(SUFFIX) or \
+                    os.path.relpath(path, root) in referenced or \
+                    os.path.getmtime(path) > cutoff:
+                continue
+            os.remove(path)
+            pruned += 1
+    return pruned
+
+
+def read_chunk(chunk):
+    """Yield the task records stored in an archive chunk."""
+    decompressor = zlib.decompressobj(31)
+    pending = b''
+    with open(_path(chunk.segment), 'rb') as file:
+        file.seek(chunk.offset)
+        remaining = chunk.size
+        while remaining > 0:
+            data = file.read(min(remaining, _READ_SIZE))
+            if not data:
+                raise EOFError(f'Archive segment {chunk.segment} is '
+                               f'truncated.')
+            remaining -= len(data)
+            *lines, pending = \
+                (pending + decompressor.decompress(data)).split(b'\n')
+            for line in lines:
+                yield json.loads(line)
+
+
+def _load(record, tags, using):
+    """Return an unsaved task of an archived record, with the tags that
+    still exist prefetched."""
+    task = Task(**{
+        field.attname: field.to_python(record[field.attname])
+        for field in Task._meta.concrete_fields
+        if field.attname in record
+    })
+    task._state.adding = False
+    task._state.db = using
+    task_tags = Tag.objects.using(using).all()
+    task_tags._result_cache = [
+        tags[tag_id] for tag_id in record['tags'] if tag_id in tags
+    ]
+    task_tags._prefetch_done = True
+    task._prefetched_objects_cache = {'tags': task_tags}
+    return task
+
+
+def user_archive(user, using=None):
+    """Return an iterator of a user's archived tasks, in the order they
+    were archived.
+
+    The index and the user's tags are read right away, the segments as
+    the iterator is consumed.
+    """
+    chunks = list(
+        ArchiveChunk.objects.using(using).filter(user=user).order_by('id')
+    )
+    tags = {tag.pk: tag for tag in Tag.objects.using(using).filter(user=user)}
+
+    def tasks():
+        for chunk in chunks:
+            for record in read_chunk(chunk):
+                yield _load(record, tags, chunk._state.db)
+
+    return tasks()
@@ -0,0 +1,129 @@
+"""
+Several API requests in one round trip.
+
+`POST /api/batch/` dispatches each sub-request to the view its path
+resolves to in the URLconf, as the user the batch was authenticated as,
+without running the middleware or authenticating again. Sequential
+sub-requests run on the batch request's thread and so share its database
+connection. Parallel ones, only allowed when none of them writes, run on
+up to BATCH_MAX_WORKERS threads, each with its own connection.
+
+The responses are collected unrendered, and rendered once with the batch
+response in the format the batch request negotiated, so their headers leave
+out Content-Type.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework.response import Response
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+PREFIX = '/api/'
+
+
+def _environ(request, item):
+    """Return the WSGI environ of a sub-request of a batch request."""
+    path = urlsplit(item['path'])
+    body = b''
+    if item.get('body') is not None:
+        body = json.dumps(item['body']).encode()
+    # The server's variables, but none of the batch request's headers.
+    environ = {
+        key: value for key, value in request.META.items()
+        if key.isupper() and not key.startswith(('CONTENT_', 'HTTP_'))
+    }
+    if 'HTTP_HOST' in request.META:
+        environ['HTTP_HOST'] = request.META['HTTP_HOST']
+    environ.update({
+        f'HTTP_{name.upper().replace("-", "_")}': value
+        for name, value in item.get('headers', {}).items()
+    })
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': path.path,
+        'QUERY_STRING': path.query,
+        'HTTP_ACCEPT': request.accepted_media_type,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    return environ
+
+
+def _body(response):
+    if isinstance(response, Response):
+        return response.data
+    content = b''.join(response) if response.streaming else response.content
+    if not content:
+        return None
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(content)
+    return content.decode(response.charset)
+
+
+def _error(status, detail):
+    return {'status': status, 'headers': {}, 'body': {'detail': detail}}
+
+
+def _dispatch(request, item):
+    """Run one sub-request and return its status, headers and body."""
+    path = urlsplit(item['path']).path
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return _error(404, 'Not found.')
+    view_class = getattr(match.func, 'view_class', None)
+    if view_class is not None and (
+        view_class.view_is_async or not getattr(view_class, 'batchable', True)
+    ):
+        return _error(400, 'This endpoint can not be batched.')
+
+    sub = WSGIRequest(_environ(request, item))
+    # The user and token the batch was authenticated with.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+        body = _body(response)
+    except Exception:
+        logger.exception('Batched %s %s failed', item['method'], path)
+        return _error(500, 'Server error.')
+    return {
+        'status': response.status_code,
+        'headers': {
+            name: value for name, value in response.items()
+            if name.lower() != 'content-type'
+        },
+        'body': body,
+    }
+
+
+def _dispatch_in_thread(request, item):
+    try:
+        return _dispatch(request, item)
+    finally:
+        connections.close_all()
+
+
+def run(request, items, parallel=False):
+    """Run the sub-requests of a batch request and return their results,
+    in order."""
+    metrics.observe('batch_size', len(items))
+    if not parallel or len(items) == 1:
+        return [_dispatch(request, item) for item in items]
+    workers = min(len(items), settings.BATCH_MAX_WORKERS)
+    with ThreadPoolExecutor(workers, thread_name_prefix='batch') as pool:
+        return list(pool.map(
+            lambda item: _dispatch_in_thread(request, item), items
+        ))
@@ -0,0 +1,131 @@
+"""
+Single-flight coalescing of identical reads.
+
+Identical requests of a user arriving together, e.g. from several devices
+opened at once, share one computation: the first runs it and the others
+wait for its result, which is also kept for READ_COALESCE_TTL_SECONDS for
+requests arriving right after. Results are dropped as soon as the user's
+tasks or tags change in this process. Changes made by other processes show
+after at most READ_COALESCE_TTL_SECONDS.
+
+Flights are per process. Waiting works from threads and, with `run_async`,
+from coroutines, which await the result without blocking their event loop.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+
+from core import metrics
+
+
+class _Flight:
+
+    def __init__(self):
+        self.future = Future()
+        # Monotonic time until which the result is shared, None while it
+        # is computed.
+        self.expires_at = None
+
+    def live(self, now):
+        return self.expires_at is None or self.expires_at > now
+
+
+class SingleFlight:
+    """Computations of results keyed by a scope, e.g. a user, and a key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._swept_at = time.monotonic()
+
+    def _sweep(self, now):
+        """Drop the expired results of every scope once per TTL."""
+        if now - self._swept_at < settings.READ_COALESCE_TTL_SECONDS:
+            return
+        self._swept_at = now
+        for scope, flights in list(self._flights.items()):
+            for key, flight in list(flights.items()):
+                if not flight.live(now):
+                    del flights[key]
+            if not flights:
+                del self._flights[scope]
+
+    def _join(self, scope, key):
+        """Return the flight of a key and whether the caller leads it."""
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            flights = self._flights.setdefault(scope, {})
+            flight = flights.get(key)
+            if flight is not None and flight.live(now):
+                metrics.increment('read_coalescing', role='follower')
+                return flight, False
+            flight = flights[key] = _Flight()
+        metrics.increment('read_coalescing', role='leader')
+        return flight, True
+
+    def _land(self, scope, key, flight, exc=None):
+        with self._lock:
+            ttl = settings.READ_COALESCE_TTL_SECONDS
+            flights = self._flights.get(scope, {})
+            if exc is not None or ttl <= 0:
+                if flights.get(key) is flight:
+                    del flights[key]
+            else:
+                flight.expires_at = time.monotonic() + ttl
+
+    def run(self, scope, key, func):
+        """Return the result of `func()`, shared with the callers of the
+        same scope and key."""
+        flight, leader = self._join(scope, key)
+        if not leader:
+            return flight.future.result()
+        try:
+            result = func()
+        except BaseException as exc:
+            # Waiting callers fail too, later ones try again.
+            flight.future.set_exception(exc)
+            self._land(scope, key, flight, exc)
+            raise
+        flight.future.set_result(result)
+        self._land(scope, key, flight)
+        return result
+
+    async def run_async(self, scope, key, func):
+        """Return the result of `await func()`, shared like `run`."""
+        flight, leader = self._join(scope, key)
+        if not leader:
+            return await asyncio.wrap_future(flight.future)
+        try:
+            result = await func()
+        except BaseException as exc:
+            flight.future.set_exception(exc)
+            self._land(scope, key, flight, exc)
+            raise
+        flight.future.set_result(result)
+        self._land(scope, key, flight)
+        return result
+
+    def forget(self, scope):
+        """Stop sharing the results of a scope.
+
+        Computations already running finish for the callers waiting for
+        them, new callers start another.
+        """
+        with self._lock:
+            self._flights.pop(scope, None)
+
+    def clear(self):
+        with self._lock:
+            self._flights.clear()
+
+
+reads = SingleFlight()
+
+
+def forget(user_id):
+    """Stop sharing the reads of a user whose data changed."""
+    reads.forget(user_id)
@@ -0,0 +1,3 @@
+"""
+Database routing and connection helpers.
+"""
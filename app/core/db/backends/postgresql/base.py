@@ -0,0 +1,37 @@
+"""
+PostgreSQL backend that checks connections out of a process-wide pool.
+
+Pooling is enabled by a "POOL" entry in the database settings, e.g.
+``{"MAX_SIZE": 10, "TIMEOUT": 10, "MAX_LIFETIME": 1800}``. Closing the
+connection at the end of a request returns it to the pool.
+"""
+from django.db.backends.postgresql import base
+
+from core.db.backends.postgresql.creation import DatabaseCreation
+from core.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool_enabled(self):
+        return bool(self.settings_dict.get('POOL', {}).get('MAX_SIZE'))
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_enabled:
+            return super().get_new_connection(conn_params)
+
+        self._pool = get_pool(self.alias, self.settings_dict, conn_params)
+        return self._pool.acquire(
+            lambda: super(DatabaseWrapper, self)
+            .get_new_connection(conn_params)
+        )
+
+    def _close(self):
+        pool = getattr(self, '_pool', None)
+        if self.connection is None or pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            pool.release(self.connection)
@@ -0,0 +1,19 @@
+"""
+Test database creation for the pooled PostgreSQL backend.
+"""
+from django.db.backends.postgresql import creation
+
+from core.db.pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Close pooled connections before test databases are copied or
+    dropped, since PostgreSQL refuses both while sessions are open."""
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        close_pools(self.connection.alias)
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,204 @@
+"""
+Bounded connection pool shared by the database wrappers of a process.
+"""
+import threading
+import time
+from collections import deque
+
+from core import metrics
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available in time."""
+
+
+class ConnectionPool:
+    """A thread safe pool of DB-API connections.
+
+    Idle connections are reused last-in first-out, closed once they are
+    older than `max_lifetime` and pinged before reuse when they have been
+    idle for longer than `check_interval`.
+    """
+
+    def __init__(self, name, max_size=10, timeout=10.0,
+                 max_lifetime=1800.0, check_interval=30.0):
+        self.name = name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_interval = check_interval
+        self._idle = deque()
+        self._created = {}
+        self._size = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, connect):
+        """Return a pooled connection, opening one with `connect()`."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            connection, last_used = self._take(deadline)
+            if connection is None:
+                break
+            if self._usable(connection, last_used):
+                self._record_checkout(start)
+                return connection
+            self._discard(connection)
+
+        try:
+            connection = connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._created[id(connection)] = time.monotonic()
+        metrics.increment('db_pool_connections_opened', pool=self.name)
+        self._record_checkout(start)
+        return connection
+
+    def release(self, connection):
+        """Return a connection to the pool."""
+        reusable = not connection.closed and not self._expired(connection)
+        if reusable:
+            try:
+                self._reset(connection)
+            except Exception:
+                reusable = False
+
+        if not reusable:
+            self._discard(connection)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+        self._publish_gauges()
+
+    def close(self):
+        """Close all idle connections."""
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+        for connection, _ in idle:
+            self._close(connection)
+        self._publish_gauges()
+
+    def stats(self):
+        """Return the current size and usage of the pool."""
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def _take(self, deadline):
+        """Pop an idle connection, or reserve a slot for a new one."""
+        with self._cond:
+            while True:
+                if self._idle:
+                    self._in_use += 1
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._in_use += 1
+                    return None, None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.increment('db_pool_timeouts', pool=self.name)
+                    raise PoolTimeout(
+                        f'No connection available in pool {self.name!r} '
+                        f'after {self.timeout} seconds.'
+                    )
+                self._cond.wait(remaining)
+
+    def _usable(self, connection, last_used):
+        if connection.closed or self._expired(connection):
+            return False
+        if time.monotonic() - last_used < self.check_interval:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not connection.autocommit:
+                connection.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _expired(self, connection):
+        created = self._created.get(id(connection), 0)
+        return time.monotonic() - created > self.max_lifetime
+
+    def _reset(self, connection):
+        """Roll back anything a connection left open."""
+        status = getattr(connection, 'info', None)
+        if status is None or status.transaction_status != 0:
+            connection.rollback()
+
+    def _discard(self, connection):
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._cond.notify()
+        self._close(connection)
+        metrics.increment('db_pool_connections_closed', pool=self.name)
+
+    def _close(self, connection):
+        self._created.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _record_checkout(self, start):
+        metrics.observe('db_pool_wait_seconds', time.monotonic() - start,
+                        pool=self.name)
+        self._publish_gauges()
+
+    def _publish_gauges(self):
+        stats = self.stats()
+        metrics.set_gauge('db_pool_in_use', stats['in_use'], pool=self.name)
+        metrics.set_gauge('db_pool_size', stats['size'], pool=self.name)
+        metrics.set_gauge('db_pool_saturation',
+                          stats['in_use'] / self.max_size, pool=self.name)
+
+
+def get_pool(alias, settings_dict, conn_params):
+    """Return the pool for a database alias and its connection parameters."""
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict['POOL']
+            pool = _pools[key] = ConnectionPool(
+                alias,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10.0),
+                max_lifetime=options.get('MAX_LIFETIME', 1800.0),
+                check_interval=options.get('CHECK_INTERVAL', 30.0),
+            )
+        return pool
+
+
+def close_pools(alias=None):
+    """Close idle connections of all pools, or only those of `alias`."""
+    with _pools_lock:
+        pools = [
+            pool for (pool_alias, _), pool in _pools.items()
+            if alias is None or pool_alias == alias
+        ]
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,122 @@
+"""
+Read replica selection and read-your-writes stickiness.
+"""
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import DatabaseError
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+_health_lock = threading.Lock()
+_unhealthy_until = {}
+_checked_at = {}
+
+
+def activate():
+    """Route reads in the current context to a replica."""
+    return _use_replica.set(True)
+
+
+def deactivate(token):
+    """Restore the routing that was active before `activate`."""
+    _use_replica.reset(token)
+
+
+@contextmanager
+def read_from_replica():
+    """Context manager routing reads to a replica."""
+    token = activate()
+    try:
+        yield
+    finally:
+        deactivate(token)
+
+
+def is_active():
+    """Return True when reads should go to a replica."""
+    return _use_replica.get()
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    """Send the user's reads to the primary for a short window."""
+    cache.set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    """Return True when the user wrote recently."""
+    return bool(cache.get(_pin_key(user.pk)))
+
+
+def _probe(alias):
+    """Check that a replica accepts connections and is not lagging."""
+    connection = connections[alias]
+    connection.ensure_connection()
+    max_lag = settings.REPLICA_MAX_LAG_SECONDS
+    if connection.vendor != 'postgresql' or not max_lag:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT COALESCE(EXTRACT(EPOCH FROM now() - '
+            'pg_last_xact_replay_timestamp()), 0)'
+        )
+        lag = cursor.fetchone()[0]
+    return lag <= max_lag
+
+
+def _is_healthy(alias, now):
+    """Return the cached health of a replica, probing it when stale."""
+    with _health_lock:
+        if _unhealthy_until.get(alias, 0) > now:
+            return False
+        fresh = now - _checked_at.get(alias, 0) < \
+            settings.REPLICA_HEALTH_CHECK_INTERVAL
+        if fresh:
+            return True
+        _checked_at[alias] = now
+
+    try:
+        healthy = _probe(alias)
+    except DatabaseError:
+        healthy = False
+
+    if not healthy:
+        mark_unhealthy(alias)
+    return healthy
+
+
+def mark_unhealthy(alias):
+    """Take a replica out of rotation for the retry window."""
+    with _health_lock:
+        _unhealthy_until[alias] = \
+            time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        _checked_at.pop(alias, None)
+
+
+def reset_health():
+    """Forget everything known about replica health."""
+    with _health_lock:
+        _unhealthy_until.clear()
+        _checked_at.clear()
+
+
+def choose_replica():
+    """Return a healthy replica alias, falling back to the primary."""
+    candidates = list(settings.DATABASE_REPLICAS)
+    random.shuffle(candidates)
+    now = time.monotonic()
+    for alias in candidates:
+        if _is_healthy(alias, now):
+            return alias
+
+    return DEFAULT_DB_ALIAS
@@ -0,0 +1,62 @@
+"""
+Database routers.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+
+from core import sharding
+from core.db import replicas
+
+
+class ShardRouter:
+    """Send task and tag queries to the owning user's shard.
+
+    Queries for users on the default shard are left to the next router,
+    so they can still be served by read replicas.
+    """
+
+    def _db_for_model(self, model, hints):
+        if not sharding.is_sharded(model):
+            return None
+        alias = sharding.shard_for_hints(hints)
+        if alias == DEFAULT_DB_ALIAS:
+            return None
+        return alias
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_model(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for_model(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        user_model = get_user_model()
+        for user, other in ((obj1, obj2), (obj2, obj1)):
+            if isinstance(user, user_model) and \
+                    sharding.is_sharded(type(other)):
+                return True
+        return None
+
+
+class PrimaryReplicaRouter:
+    """Send writes to the primary and opted-in reads to a replica."""
+
+    def db_for_read(self, model, **hints):
+        if replicas.is_active():
+            return replicas.choose_replica()
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
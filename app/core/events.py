@@ -0,0 +1,213 @@
+"""
+Push task and tag change events to subscribed clients.
+
+Changes are published to the backend named by `settings.EVENTS_BACKEND`,
+which hands them to the broker of every process with subscribers. The
+broker fans them out to the subscriptions of the owning user, where bursts
+are coalesced per object and a slow client gets a single `resync` event
+instead of an unbounded queue.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.module_loading import import_string
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """Events waiting to be sent to one client."""
+
+    def __init__(self, user_id, loop, max_pending, coalesce_seconds):
+        self.user_id = user_id
+        self.max_pending = max_pending
+        self.coalesce_seconds = coalesce_seconds
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+        self._pending = {}
+        self._overflowed = False
+
+    def push(self, event):
+        """Queue `event`, merging it with a pending event of the same object.
+
+        Safe to call from any thread.
+        """
+        key = (event['type'].partition('.')[0], event.get('id'))
+        with self._lock:
+            if self._overflowed:
+                return
+            previous = self._pending.pop(key, None)
+            if previous is not None:
+                metrics.increment('events_coalesced')
+                if previous['type'].endswith('.created'):
+                    if event['type'].endswith('.deleted'):
+                        return
+                    event = previous
+            if event['type'] == RESYNC['type'] or \
+                    len(self._pending) >= self.max_pending:
+                self._pending.clear()
+                self._overflowed = True
+                metrics.increment('events_overflowed')
+            else:
+                self._pending[key] = event
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The subscriber's event loop is gone.
+            pass
+
+    async def next_batch(self, timeout):
+        """Wait up to `timeout` seconds and return the pending events."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        # Give a burst of changes the chance to coalesce.
+        await asyncio.sleep(self.coalesce_seconds)
+        self._ready.clear()
+        with self._lock:
+            if self._overflowed:
+                batch = [RESYNC]
+            else:
+                batch = list(self._pending.values())
+            self._pending = {}
+            self._overflowed = False
+        return batch
+
+
+class Broker:
+    """Fan events out to the subscriptions of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._listeners = []
+
+    def subscribe(self, user_id):
+        """Return a new subscription for `user_id` on the running loop."""
+        subscription = Subscription(
+            user_id,
+            asyncio.get_running_loop(),
+            settings.EVENTS_MAX_PENDING,
+            settings.EVENTS_COALESCE_SECONDS,
+        )
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        get_backend().start(self)
+        metrics.increment('events_subscriptions')
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def listen(self, callback):
+        """Also pass every event to `callback(user_id, event)`."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def unlisten(self, callback):
+        with self._lock:
+            self._listeners.remove(callback)
+
+    def dispatch(self, user_id, event):
+        """Deliver `event` to the subscriptions of `user_id`."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+            listeners = list(self._listeners)
+        for subscription in subscriptions:
+            subscription.push(event)
+        for callback in listeners:
+            callback(user_id, event)
+
+
+broker = Broker()
+
+
+class LocalBackend:
+    """Deliver events to subscribers of this process only."""
+    cross_process = False
+
+    def start(self, broker):
+        pass
+
+    def publish(self, user_id, event):
+        broker.dispatch(user_id, event)
+
+
+class PostgresNotifyBackend(LocalBackend):
+    """Deliver events to every process through PostgreSQL LISTEN/NOTIFY."""
+    channel = 'core_events'
+    cross_process = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def publish(self, user_id, event):
+        payload = json.dumps({'user': user_id, 'event': event})
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def start(self, broker):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, args=(broker,),
+                    name='events-listener', daemon=True,
+                )
+                self._listener.start()
+
+    def _listen(self, broker):
+        import psycopg2
+
+        wrapper = connections[DEFAULT_DB_ALIAS]
+        while True:
+            try:
+                conn = psycopg2.connect(**wrapper.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        message = json.loads(conn.notifies.pop(0).payload)
+                        broker.dispatch(message['user'], message['event'])
+            except Exception:
+                logger.exception('Event listener failed, reconnecting.')
+                time.sleep(1)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Return the backend configured by `settings.EVENTS_BACKEND`."""
+    return import_string(settings.EVENTS_BACKEND)()
+
+
+def publish(user_id, event_type, obj_id=None, using=None):
+    """Publish an event once the current transaction commits."""
+    event = {'type': event_type}
+    if obj_id is not None:
+        event['id'] = obj_id
+    metrics.increment('events_published', type=event_type)
+    transaction.on_commit(
+        lambda: get_backend().publish(user_id, event), using=using
+    )
@@ -0,0 +1,370 @@
+"""
+GraphQL API over the user's tasks and tags.
+
+Resolvers of nested fields don't query the database themselves, they ask
+the request's `DataLoader`s, which load all keys asked for while a level
+of the result is completed in one query: a list of tasks loads the tags of
+every task in one query and their users in another.
+
+Queries are rejected before they run when they nest deeper than
+GRAPHQL_MAX_DEPTH or cost more than GRAPHQL_MAX_COST, where every field
+costs 1 for each time it's resolved, so the fields under a list cost its
+size (`first`, GRAPHQL_MAX_LIST without it) times over. A negative
+`first` is rejected.
+
+Parsed and validated documents are kept per process, so a query seen
+before isn't parsed again. Clients may send the SHA-256 hash of a query in
+place of the query (Apollo's automatic persisted queries): an unknown hash
+gets a `PersistedQueryNotFound` error, and the client sends the query with
+its hash, which is kept in the Django cache for
+GRAPHQL_PERSISTED_QUERY_TTL_SECONDS.
+"""
+import asyncio
+import hashlib
+from functools import lru_cache
+from inspect import isawaitable
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from graphql import (
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLArgument,
+    GraphQLBoolean,
+    GraphQLError,
+    GraphQLField,
+    GraphQLID,
+    GraphQLInt,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    GraphQLScalarType,
+    GraphQLSchema,
+    GraphQLString,
+    IntValueNode,
+    ValidationRule,
+    execute,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+    is_object_type,
+    parse,
+    specified_rules,
+    validate,
+)
+
+from core.models import Tag, Task
+
+# Parsed documents kept per process.
+DOCUMENT_CACHE_SIZE = 256
+
+
+class DataLoader:
+    """Load values by key, batching the keys asked for until the event
+    loop runs next into one call of `batch_load(keys)`, which returns the
+    values in the order of the keys. Values are cached for the request."""
+
+    def __init__(self, batch_load):
+        self.batch_load = batch_load
+        self._futures = {}
+        self._queue = []
+        # The running batches, as the event loop only keeps weak references
+        # to tasks.
+        self._tasks = set()
+
+    def load(self, key):
+        """Return a future of the value of `key`."""
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            if not self._queue:
+                loop.call_soon(self._schedule, loop)
+            self._queue.append((key, future))
+        return future
+
+    def _schedule(self, loop):
+        task = loop.create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        queue, self._queue = self._queue, []
+        try:
+            values = await sync_to_async(self.batch_load)(
+                [key for key, _ in queue]
+            )
+        except Exception as exc:
+            for _, future in queue:
+                future.set_exception(exc)
+            return
+        for (_, future), value in zip(queue, values):
+            future.set_result(value)
+
+
+def _load_tags(task_ids):
+    """Return the tags of each task."""
+    tags = {task_id: [] for task_id in task_ids}
+    links = Task.tags.through.objects.filter(task_id__in=task_ids) \
+        .select_related('tag').order_by('id')
+    for link in links:
+        tags[link.task_id].append(link.tag)
+    return [tags[task_id] for task_id in task_ids]
+
+
+def _load_users(user_ids):
+    users = get_user_model().objects.in_bulk(user_ids)
+    return [users.get(user_id) for user_id in user_ids]
+
+
+class Context:
+    """The request and data loaders of one query."""
+
+    def __init__(self, request):
+        self.user = request.user
+        self.tags = DataLoader(_load_tags)
+        self.users = DataLoader(_load_users)
+
+
+def _attr(name):
+    return lambda obj, info: getattr(obj, name)
+
+
+DateTime = GraphQLScalarType(
+    'DateTime',
+    description='An ISO 8601 date and time.',
+    serialize=lambda value: value.isoformat(),
+)
+
+UserType = GraphQLObjectType('User', lambda: {
+    'id': GraphQLField(GraphQLNonNull(GraphQLID)),
+    'email': GraphQLField(GraphQLNonNull(GraphQLString)),
+    'username': GraphQLField(GraphQLNonNull(GraphQLString)),
+})
+
+TagType = GraphQLObjectType('Tag', lambda: {
+    'id': GraphQLField(GraphQLNonNull(GraphQLID)),
+    'name': GraphQLField(GraphQLNonNull(GraphQLString)),
+})
+
+TaskType = GraphQLObjectType('Task', lambda: {
+    'id': GraphQLField(GraphQLNonNull(GraphQLID)),
+    'createdAt': GraphQLField(GraphQLNonNull(DateTime),
+                              resolve=_attr('created_at')),
+    'description': GraphQLField(GraphQLNonNull(GraphQLString)),
+    'dueDate': GraphQLField(GraphQLNonNull(DateTime),
+                            resolve=_attr('due_date')),
+    'isComplete': GraphQLField(GraphQLNonNull(GraphQLBoolean),
+                               resolve=_attr('is_complete')),
+    'priority': GraphQLField(GraphQLNonNull(GraphQLInt)),
+    'recurrence': GraphQLField(GraphQLNonNull(GraphQLString)),
+    'series': GraphQLField(GraphQLID, resolve=_attr('series_id')),
+    'tags': GraphQLField(
+        GraphQLNonNull(GraphQLList(GraphQLNonNull(TagType))),
+        resolve=lambda task, info: info.context.tags.load(task.pk),
+        # Assumed number of tags of a task, for the cost of queries.
+        extensions={'list_size': 10},
+    ),
+    'user': GraphQLField(
+        GraphQLNonNull(UserType),
+        resolve=lambda task, info: info.context.users.load(task.user_id),
+    ),
+})
+
+
+async def _resolve_tasks(root, info, first=None, is_complete=None,
+                         tags=None):
+    queryset = Task.objects.filter(user=info.context.user)
+    if is_complete is not None:
+        queryset = queryset.filter(is_complete=is_complete)
+    if tags:
+        queryset = queryset.filter(tags__id__in=tags).distinct()
+    if first is None or first > settings.GRAPHQL_MAX_LIST:
+        first = settings.GRAPHQL_MAX_LIST
+    return await sync_to_async(list)(
+        queryset.order_by('-due_date', 'id')[:max(first, 0)]
+    )
+
+
+async def _resolve_task(root, info, id):
+    return await sync_to_async(
+        Task.objects.filter(user=info.context.user, pk=id).first
+    )()
+
+
+async def _resolve_tags(root, info):
+    return await sync_to_async(list)(
+        Tag.objects.filter(user=info.context.user).order_by('-name')
+    )
+
+
+QueryType = GraphQLObjectType('Query', {
+    'me': GraphQLField(
+        GraphQLNonNull(UserType),
+        resolve=lambda root, info: info.context.user,
+    ),
+    'tasks': GraphQLField(
+        GraphQLNonNull(GraphQLList(GraphQLNonNull(TaskType))),
+        args={
+            'first': GraphQLArgument(GraphQLInt),
+            'isComplete': GraphQLArgument(GraphQLBoolean,
+                                          out_name='is_complete'),
+            'tags': GraphQLArgument(GraphQLList(GraphQLNonNull(GraphQLID))),
+        },
+        resolve=_resolve_tasks,
+    ),
+    'task': GraphQLField(
+        TaskType,
+        args={'id': GraphQLArgument(GraphQLNonNull(GraphQLID))},
+        resolve=_resolve_task,
+    ),
+    'tags': GraphQLField(
+        GraphQLNonNull(GraphQLList(GraphQLNonNull(TagType))),
+        resolve=_resolve_tags,
+    ),
+})
+
+schema = GraphQLSchema(query=QueryType)
+
+
+def _list_size(field, node):
+    """Return the number of items a list field is assumed to have."""
+    for argument in node.arguments or ():
+        if argument.name.value == 'first' and \
+                isinstance(argument.value, IntValueNode):
+            first = int(argument.value.value)
+            if first < 0:
+                raise GraphQLError('`first` can\'t be negative.', argument)
+            return min(first, settings.GRAPHQL_MAX_LIST)
+    return (field.extensions or {}).get('list_size',
+                                        settings.GRAPHQL_MAX_LIST)
+
+
+def _measure(context, selection_set, parent_type, fragments=frozenset()):
+    """Return the depth and cost of a selection set."""
+    depth = cost = 0
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            field = parent_type.fields.get(selection.name.value) \
+                if is_object_type(parent_type) else None
+            # Introspection, or unknown fields the other rules report.
+            if field is None:
+                continue
+            inner_depth = inner_cost = 0
+            if selection.selection_set is not None:
+                inner_depth, inner_cost = _measure(
+                    context, selection.selection_set,
+                    get_named_type(field.type), fragments,
+                )
+            if is_list_type(get_nullable_type(field.type)):
+                inner_cost *= _list_size(field, selection)
+            depth = max(depth, inner_depth + 1)
+            cost += 1 + inner_cost
+            continue
+
+        if isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            fragment = context.get_fragment(name)
+            # Cycles are reported by the other rules.
+            if fragment is None or name in fragments:
+                continue
+            seen = fragments | {name}
+        else:
+            fragment, seen = selection, fragments
+        fragment_type = parent_type
+        if fragment.type_condition is not None:
+            fragment_type = context.schema.get_type(
+                fragment.type_condition.name.value
+            )
+        inner_depth, inner_cost = _measure(
+            context, fragment.selection_set, fragment_type, seen,
+        )
+        depth = max(depth, inner_depth)
+        cost += inner_cost
+    return depth, cost
+
+
+class LimitsRule(ValidationRule):
+    """Reject operations nested too deep or too costly to run."""
+
+    def enter_operation_definition(self, node, *args):
+        try:
+            depth, cost = _measure(
+                self.context, node.selection_set,
+                self.context.schema.get_root_type(node.operation),
+            )
+        except GraphQLError as error:
+            self.report_error(error)
+            return
+        if depth > settings.GRAPHQL_MAX_DEPTH:
+            self.report_error(GraphQLError(
+                f'The query is nested {depth} levels deep, at most '
+                f'{settings.GRAPHQL_MAX_DEPTH} are allowed.', node,
+            ))
+        if cost > settings.GRAPHQL_MAX_COST:
+            self.report_error(GraphQLError(
+                f'The query costs {cost}, at most '
+                f'{settings.GRAPHQL_MAX_COST} is allowed.', node,
+            ))
+
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def document(query):
+    """Return the parsed document of a query and its validation errors."""
+    try:
+        parsed = parse(query)
+    except GraphQLError as error:
+        return None, [error]
+    return parsed, validate(schema, parsed,
+                            [*specified_rules, LimitsRule])
+
+
+class PersistedQueryNotFound(Exception):
+    """The hash of a persisted query is unknown."""
+
+
+def _persisted_key(digest):
+    return f'graphql:query:{digest}'
+
+
+def resolve_query(query, extensions):
+    """Return the query of a request, storing or looking up persisted
+    queries.
+
+    Raise PersistedQueryNotFound for an unknown hash and ValueError for a
+    hash not matching the query.
+    """
+    persisted = (extensions or {}).get('persistedQuery')
+    if not isinstance(persisted, dict):
+        return query
+    digest = persisted.get('sha256Hash')
+    if not isinstance(digest, str):
+        raise ValueError('The persisted query has no sha256Hash.')
+    if query is None:
+        query = cache.get(_persisted_key(digest))
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query
+    if hashlib.sha256(query.encode()).hexdigest() != digest:
+        raise ValueError('The sha256Hash does not match the query.')
+    cache.set(_persisted_key(digest), query,
+              settings.GRAPHQL_PERSISTED_QUERY_TTL_SECONDS)
+    return query
+
+
+async def _execute(parsed, context, variables, operation_name):
+    result = execute(schema, parsed, context_value=context,
+                     variable_values=variables,
+                     operation_name=operation_name)
+    if isawaitable(result):
+        result = await result
+    return result
+
+
+def run(request, parsed, variables=None, operation_name=None):
+    """Execute a validated document for a request and return the
+    result."""
+    return async_to_sync(_execute)(parsed, Context(request), variables,
+                                   operation_name)
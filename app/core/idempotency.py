@@ -0,0 +1,115 @@
+"""
+Idempotency keys for retried writes.
+
+The first response to a request with an `Idempotency-Key` header is stored
+in the Django cache for IDEMPOTENCY_TTL_SECONDS, and retries with the same
+key get it back without running the view again. While the first request
+runs it holds a lock, so a concurrent retry waits for its response instead
+of running too. Keys are scoped to the user, and a key reused for a
+different request is rejected.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core import metrics
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+_POLL_INTERVAL = 0.05
+
+
+class InProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this idempotency key is in progress.'
+    default_code = 'idempotency_in_progress'
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'The idempotency key was used for another request.'
+    default_code = 'idempotency_key_reused'
+
+
+def fingerprint(request):
+    """Return a digest of the method, path and body of a request."""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.get_full_path()}\n'.encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+class Claim:
+    """The right to run the request of an idempotency key."""
+
+    def __init__(self, user_id, key, request_fingerprint):
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError(
+                {HEADER: f'Keys are at most {MAX_KEY_LENGTH} characters.'}
+            )
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        self.response_key = f'idempotency:{user_id}:{digest}'
+        self.lock_key = f'{self.response_key}:lock'
+        self.fingerprint = request_fingerprint
+        self.token = uuid.uuid4().hex
+
+    def _stored(self):
+        stored = cache.get(self.response_key)
+        if stored is not None and stored['fingerprint'] != self.fingerprint:
+            raise KeyReused()
+        return stored
+
+    def acquire(self):
+        """Return the stored response to replay, or None once the lock is
+        held and the request should run.
+
+        Raise InProgress when another request keeps the lock for longer
+        than IDEMPOTENCY_WAIT_SECONDS.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            stored = self._stored()
+            if stored is None and cache.add(
+                self.lock_key, self.token, settings.IDEMPOTENCY_LOCK_SECONDS
+            ):
+                # The holder may have stored its response in between.
+                stored = self._stored()
+                if stored is None:
+                    return None
+                self.release()
+            if stored is not None:
+                metrics.increment('idempotent_replays')
+                response = HttpResponse(
+                    stored['content'],
+                    status=stored['status'],
+                    content_type=stored['content_type'],
+                )
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            if time.monotonic() >= deadline:
+                raise InProgress()
+            time.sleep(_POLL_INTERVAL)
+
+    def store(self, response):
+        """Keep a rendered response for retries, unless it's a server
+        error a retry may not repeat, and release the lock."""
+        if response.status_code < 500:
+            cache.set(self.response_key, {
+                'fingerprint': self.fingerprint,
+                'status': response.status_code,
+                'content_type': response.get('Content-Type'),
+                'content': response.content,
+            }, settings.IDEMPOTENCY_TTL_SECONDS)
+        self.release()
+
+    def release(self):
+        # Don't drop a lock that timed out and was taken by a retry.
+        if cache.get(self.lock_key) == self.token:
+            cache.delete(self.lock_key)
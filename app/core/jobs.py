@@ -0,0 +1,193 @@
+"""
+Database-backed background jobs.
+
+Functions registered with `@register(name)` are queued with `enqueue` and
+run by `manage.py run_workers`. Workers claim jobs with
+`SELECT ... FOR UPDATE SKIP LOCKED`, so any number of them can poll the
+same table. A claimed job is hidden from other workers until its
+visibility timeout; the worker extends it while the job runs, so a job is
+only claimed again when its worker died. Jobs must therefore be safe to
+run more than once. Failed jobs are retried with backoff up to their
+`max_attempts`.
+
+Apps add jobs in a `jobs` module, which workers import at startup.
+"""
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (
+    DatabaseError,
+    close_old_connections,
+    connection,
+    transaction,
+)
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+_STATE_FIELDS = ['status', 'attempts', 'run_at', 'locked_until', 'result',
+                 'error', 'updated_at']
+
+
+def register(name):
+    """Register the decorated function as the job `name`."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, user=None, max_attempts=None, **kwargs):
+    """Queue the job `name` to be called with `kwargs`. Return the Job."""
+    if name not in _registry:
+        raise ValueError(f'Unknown job {name!r}.')
+    return Job.objects.create(
+        name=name,
+        user=user,
+        kwargs=kwargs,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim():
+    """Claim the next due job, or return None when there is none."""
+    now = timezone.now()
+    due = Q(status=Job.Status.QUEUED, run_at__lte=now) | \
+        Q(status=Job.Status.RUNNING, locked_until__lt=now)
+    while True:
+        with transaction.atomic():
+            job = Job.objects.select_for_update(skip_locked=True) \
+                .filter(due).order_by('run_at').first()
+            if job is None:
+                return None
+            if job.attempts >= job.max_attempts:
+                # Its worker died during the last attempt.
+                job.status = Job.Status.FAILED
+                job.error = 'Visibility timeout expired.'
+                job.locked_until = None
+                job.save(update_fields=_STATE_FIELDS)
+                continue
+            job.status = Job.Status.RUNNING
+            job.attempts += 1
+            job.locked_until = now + timedelta(
+                seconds=settings.JOB_VISIBILITY_TIMEOUT
+            )
+            job.save(update_fields=_STATE_FIELDS)
+            return job
+
+
+def backoff(attempts):
+    """Return the delay before retry number `attempts`, with jitter."""
+    delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+class _Heartbeat(threading.Thread):
+    """Keep extending a running job's visibility timeout."""
+
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job_id = job.pk
+        self.done = threading.Event()
+
+    def run(self):
+        timeout = settings.JOB_VISIBILITY_TIMEOUT
+        try:
+            while not self.done.wait(timeout / 2):
+                Job.objects.filter(
+                    pk=self.job_id, status=Job.Status.RUNNING
+                ).update(
+                    locked_until=timezone.now() + timedelta(seconds=timeout)
+                )
+        finally:
+            connection.close()
+
+
+def run(job):
+    """Run a claimed job and record its outcome."""
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    try:
+        result = _registry[job.name](**job.kwargs)
+    except Exception:
+        logger.exception('Job %s failed.', job)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.Status.QUEUED
+            job.run_at = timezone.now() + backoff(job.attempts)
+        else:
+            job.status = Job.Status.FAILED
+    else:
+        job.status = Job.Status.SUCCEEDED
+        job.result = result
+        job.error = ''
+    finally:
+        heartbeat.done.set()
+        heartbeat.join()
+    job.locked_until = None
+    # Leave `user` alone, the job may have deleted the user.
+    job.save(update_fields=_STATE_FIELDS)
+    return job
+
+
+def work(stop, poll_interval=None, burst=False):
+    """Run jobs until `stop` is set, waiting `poll_interval` when idle, or
+    until no job is due with `burst`.
+
+    Return the number of jobs run.
+    """
+    poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+    count = 0
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            job = claim()
+            if job is not None:
+                run(job)
+        except DatabaseError:
+            # Lost connections and lock timeouts shouldn't stop the worker,
+            # a job it couldn't finish is claimed again after its timeout.
+            logger.exception('Worker database error.')
+            stop.wait(poll_interval)
+            continue
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        count += 1
+    return count
+
+
+def run_pending():
+    """Run every due job in this thread. Return the number of jobs run."""
+    count = 0
+    while (job := claim()) is not None:
+        run(job)
+        count += 1
+    return count
+
+
+@register('core.purge_user')
+def purge_user(user_id):
+    """Delete a disabled account's data in batches."""
+    from django.contrib.auth import get_user_model
+
+    from core import purge
+
+    user = get_user_model().objects.filter(
+        pk=user_id, purge_requested_at__isnull=False
+    ).first()
+    if user is None:
+        # Already purged by an earlier attempt.
+        return None
+    return purge.purge_user(user)
@@ -0,0 +1,50 @@
+"""
+Django command to move old completed tasks to the archive.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import archive
+
+
+class Command(BaseCommand):
+    """Django command archiving the old completed tasks of every shard."""
+    help = 'Move old completed tasks to compressed archive segments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help='Archive tasks due this many days ago, '
+                                 'TASK_ARCHIVE_AFTER_DAYS by default.')
+        parser.add_argument('--batch-size', type=int,
+                            help='Tasks per segment.')
+        parser.add_argument('--database', action='append',
+                            dest='databases',
+                            help='Shard to archive, every shard by default.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        days = options['days']
+        if days is None:
+            days = settings.TASK_ARCHIVE_AFTER_DAYS
+        before = timezone.now() - timedelta(days=days)
+
+        for alias in options['databases'] or settings.DATABASE_SHARDS:
+            self.stdout.write(f'Archiving {alias}...')
+
+            def progress(archived):
+                self.stdout.write(f'  {alias}: {archived} tasks archived')
+
+            archived = archive.archive_shard(
+                alias, before, batch_size=options['batch_size'],
+                progress=progress,
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: archived {archived} tasks.'
+            ))
+
+        pruned = archive.prune_segments()
+        if pruned:
+            self.stdout.write(f'Deleted {pruned} unused segments.')
@@ -0,0 +1,45 @@
+"""
+Django command to deliver outbox events to webhook subscriptions.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    """Django command draining the outbox."""
+    help = 'Deliver outbox events to webhooks in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help='Events per request to a subscription.')
+        parser.add_argument('--workers', type=int,
+                            help='Subscriptions delivered concurrently.')
+        parser.add_argument('--timeout', type=float,
+                            help='Seconds to wait for a subscription.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new events.')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Seconds between idle polls with --loop.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        while True:
+            result = outbox.dispatch(
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                timeout=options['timeout'],
+            )
+            pruned = outbox.prune()
+            if result['delivered'] or result['failed']:
+                self.stdout.write(
+                    f"Delivered {result['delivered']} events, "
+                    f"{result['failed']} batches failed, "
+                    f"{pruned} events pruned."
+                )
+            if not options['loop']:
+                break
+            if not result['delivered']:
+                time.sleep(options['interval'])
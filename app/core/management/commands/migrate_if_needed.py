@@ -0,0 +1,39 @@
+"""
+Django command to apply migrations only when some are pending.
+"""
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    """Skip `migrate`, its system checks and post-migrate handlers when
+    every migration is already applied."""
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help='Database to migrate, defaults to every shard.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        for database in options['databases'] or settings.DATABASE_SHARDS:
+            pending = self.pending_migrations(database)
+            if not pending:
+                self.stdout.write(f'No migrations to apply on {database}.')
+                continue
+
+            self.stdout.write(f'{len(pending)} migrations pending '
+                              f'on {database}.')
+            call_command('migrate', database=database,
+                         verbosity=options['verbosity'])
+
+    def pending_migrations(self, database):
+        """Return the migrations not yet applied to a database."""
+        executor = MigrationExecutor(connections[database])
+        targets = executor.loader.graph.leaf_nodes()
+        return executor.migration_plan(targets)
@@ -0,0 +1,44 @@
+"""
+Django command to partition the task table of every shard.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core import partitioning
+
+
+class Command(BaseCommand):
+    """Django command to partition tasks by a hash of their user."""
+    help = 'Rebuild the task table as hash partitions by user.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int,
+                            help='Number of partitions, TASK_PARTITIONS '
+                                 'by default.')
+        parser.add_argument('--database', action='append',
+                            dest='databases',
+                            help='Shard to partition, every shard by '
+                                 'default.')
+        parser.add_argument('--check', action='store_true',
+                            help='Only report the current partitions.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        partitions = options['partitions'] or settings.TASK_PARTITIONS
+        if not options['check'] and partitions < 2:
+            raise CommandError('Set --partitions or TASK_PARTITIONS to '
+                               'at least 2.')
+
+        for alias in options['databases'] or settings.DATABASE_SHARDS:
+            connection = connections[alias]
+            if connection.vendor != 'postgresql':
+                raise CommandError(f'{alias} is not a PostgreSQL database.')
+            current = partitioning.partition_count(connection)
+            self.stdout.write(f'{alias}: {current or "no"} partitions.')
+            if options['check'] or current == partitions:
+                continue
+
+            self.stdout.write(f'Partitioning {alias} into {partitions}...')
+            partitioning.partition(connection, partitions)
+            self.stdout.write(self.style.SUCCESS(f'{alias} partitioned.'))
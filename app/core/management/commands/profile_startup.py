@@ -0,0 +1,90 @@
+"""
+Django command to profile the cold start of a worker process.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+PROBE = '''
+import json, resource, sys, time
+import django
+django.setup()
+setup_done = time.time()
+from django.conf import settings
+from django.test import Client
+host = (settings.ALLOWED_HOSTS or ['localhost'])[0].lstrip('.') or 'localhost'
+response = Client(HTTP_HOST=host).get(sys.argv[1])
+print(json.dumps({
+    'setup_done': setup_done,
+    'first_response': time.time(),
+    'status': response.status_code,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+'''
+
+
+def import_times(stderr):
+    """Sum `-X importtime` self times (in seconds) by top-level package."""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return {name: us / 1_000_000 for name, us in totals.items()}
+
+
+class Command(BaseCommand):
+    """Start a fresh interpreter, set Django up, serve one request and
+    report where the time went."""
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/task/tasks/',
+                            help='Path of the first request.')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Number of packages to list.')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        started = time.time()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE,
+             options['path']],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        report = {
+            'setup_seconds': timings['setup_done'] - started,
+            'first_request_seconds': timings['first_response'] - started,
+            'first_request_status': timings['status'],
+            'max_rss_mb': timings['max_rss_kb'] / 1024,
+            'imports': import_times(result.stderr),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f'Process start to django.setup(): '
+                          f'{report["setup_seconds"]:.3f}s')
+        self.stdout.write(f'Process start to first response: '
+                          f'{report["first_request_seconds"]:.3f}s '
+                          f'(HTTP {report["first_request_status"]})')
+        self.stdout.write(f'Peak RSS after first response: '
+                          f'{report["max_rss_mb"]:.1f} MiB')
+        self.stdout.write('Import time by package:')
+        ranked = sorted(report['imports'].items(),
+                        key=lambda item: item[1], reverse=True)
+        for name, seconds in ranked[:options['top']]:
+            self.stdout.write(f'  {name:<30} {seconds:.3f}s')
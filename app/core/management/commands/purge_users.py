@@ -0,0 +1,42 @@
+"""
+Django command to delete accounts scheduled for purging.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import purge
+
+
+class Command(BaseCommand):
+    """Django command working through the purge queue."""
+    help = 'Delete the data of disabled accounts in bounded batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new purge requests.')
+        parser.add_argument('--interval', type=float, default=10,
+                            help='Seconds between polls with --loop.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        while True:
+            for user in purge.pending_purges():
+                self.purge(user, options['batch_size'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def purge(self, user, batch_size):
+        self.stdout.write(f'Purging user {user.pk}...')
+
+        def progress(stage, deleted):
+            self.stdout.write(f'  user {user.pk}: {deleted} {stage} deleted')
+
+        totals = purge.purge_user(user, batch_size=batch_size,
+                                  progress=progress)
+        summary = ', '.join(f'{n} {stage}' for stage, n in totals.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged user {user.pk} ({summary}).'
+        ))
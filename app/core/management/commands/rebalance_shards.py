@@ -0,0 +1,84 @@
+"""
+Django command to move users between task shards.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.utils import IntegrityError
+
+from core import sharding
+
+
+class Command(BaseCommand):
+    """Django command to move one user or rebalance all shards."""
+    help = 'Move a user to another shard, or even out task counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int,
+                            help='ID of a single user to move.')
+        parser.add_argument('--to', dest='target',
+                            help='Shard alias to move the user to.')
+        parser.add_argument('--tolerance', type=float, default=0.1,
+                            help='Allowed load difference between the '
+                                 'largest and smallest shard.')
+        parser.add_argument('--max-moves', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['user'] is not None:
+            if options['target'] not in settings.DATABASE_SHARDS:
+                raise CommandError('--to must name a configured shard.')
+            user = get_user_model().objects.get(pk=options['user'])
+            self._move(user, options['target'], options)
+            return
+
+        for user_id, target in self._plan(options):
+            user = get_user_model().objects.get(pk=user_id)
+            self._move(user, target, options)
+
+    def _move(self, user, target, options):
+        self.stdout.write(f'Moving user {user.pk} '
+                          f'from {user.shard} to {target}...')
+        if options['dry_run']:
+            return
+        try:
+            moved = sharding.move_user(user, target,
+                                       batch_size=options['batch_size'])
+        except IntegrityError as exc:
+            raise CommandError(
+                f'Ids of user {user.pk} collide on {target}: {exc}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} tasks.'))
+
+    def _plan(self, options):
+        """Greedily move users from the fullest to the emptiest shard."""
+        loads = sharding.shard_loads()
+        candidates = {
+            alias: sharding.user_loads(alias) for alias in loads
+        }
+        moves = []
+        while len(moves) < options['max_moves']:
+            fullest = max(loads, key=loads.get)
+            emptiest = min(loads, key=loads.get)
+            gap = loads[fullest] - loads[emptiest]
+            if gap <= options['tolerance'] * max(loads[fullest], 1):
+                break
+
+            fitting = [
+                (user_id, total) for user_id, total in candidates[fullest]
+                if total * 2 <= gap
+            ]
+            if not fitting:
+                break
+
+            user_id, total = fitting[0]
+            candidates[fullest].remove((user_id, total))
+            loads[fullest] -= total
+            loads[emptiest] += total
+            moves.append((user_id, emptiest))
+
+        if not moves:
+            self.stdout.write('Shards are balanced.')
+        return moves
@@ -0,0 +1,37 @@
+"""
+Django command to fire due-date reminders.
+"""
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import events
+from core.reminders import Scheduler
+
+
+class Command(BaseCommand):
+    """Django command running the reminder scheduler."""
+    help = 'Send reminders of tasks that are due soon.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        backend = events.get_backend()
+        if not getattr(backend, 'cross_process', False):
+            # The scheduler would miss the API's task changes, and its
+            # reminder events would reach no client.
+            raise CommandError(
+                'The reminder scheduler runs in its own process and needs '
+                'an EVENTS_BACKEND delivering events across processes, '
+                'such as core.events.PostgresNotifyBackend.'
+            )
+        scheduler = Scheduler()
+        backend.start(events.broker)
+        events.broker.listen(scheduler.on_event)
+        signal.signal(signal.SIGTERM, lambda *args: scheduler.stop())
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            events.broker.unlisten(scheduler.on_event)
+        self.stdout.write(self.style.SUCCESS('Scheduler stopped.'))
@@ -0,0 +1,103 @@
+"""
+Django command to run background jobs.
+"""
+import multiprocessing
+import signal
+import threading
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.utils.module_loading import autodiscover_modules
+
+
+def run_threads(threads, poll_interval, burst):
+    """Run jobs in `threads` threads until stopped, or the queue is empty
+    with `burst`. Return the number of jobs run."""
+    # Imported here, spawned workers import this module before setup.
+    from core import jobs
+
+    stop = threading.Event()
+    previous = signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    counts = []
+
+    def target():
+        try:
+            counts.append(jobs.work(stop, poll_interval, burst))
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=target, name=f'job-worker-{n}')
+               for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+    return sum(counts)
+
+
+def _process_main(threads, poll_interval, burst):
+    django.setup()
+    autodiscover_modules('jobs')
+    run_threads(threads, poll_interval, burst)
+
+
+class Command(BaseCommand):
+    """Django command running a pool of job workers."""
+    help = 'Run background jobs with a pool of processes and threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            default=settings.JOB_WORKER_PROCESSES,
+                            help='Worker processes to start.')
+        parser.add_argument('--threads', type=int,
+                            default=settings.JOB_WORKER_THREADS,
+                            help='Worker threads per process.')
+        parser.add_argument('--poll-interval', type=float,
+                            default=settings.JOB_POLL_INTERVAL,
+                            help='Seconds between polls of an idle worker.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is due.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        autodiscover_modules('jobs')
+        worker_args = (options['threads'], options['poll_interval'],
+                       options['burst'])
+        if options['processes'] <= 1:
+            count = run_threads(*worker_args)
+            self.stdout.write(self.style.SUCCESS(f'Ran {count} jobs.'))
+            return
+
+        # The parent only waits for its children.
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=_process_main, args=worker_args)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+
+        def terminate(*args):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, terminate)
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # The children got the interrupt too.
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped.'))
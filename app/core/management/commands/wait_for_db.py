@@ -1,28 +1,61 @@
 """
 Django command to wait for the database to be available.
 """
+import random
 import time
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to wait for database."""
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds to wait before giving up.')
+        parser.add_argument('--initial-delay', type=float, default=0.1,
+                            help='Upper bound of the first retry delay.')
+        parser.add_argument('--max-delay', type=float, default=5,
+                            help='Upper bound of any retry delay.')
+
+    def probe(self, database):
+        """Open a connection and run the cheapest possible query."""
+        connection = connections[database]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        finally:
+            connection.close()
 
     def handle(self, *args, **options):
         """Entrypoint for command."""
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
             try:
-                self.check(databases=['default'])
-                db_up = True
+                self.probe(options['database'])
+                break
             except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailable, '
-                                  'waiting for 1 second...')
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database unavailable after '
+                        f'{options["timeout"]} seconds.'
+                    )
+                # Exponential backoff with full jitter.
+                ceiling = min(options['max_delay'],
+                              options['initial_delay'] * 2 ** attempt)
+                delay = min(random.uniform(0, ceiling), remaining)
+                self.stdout.write(f'Database unavailable, '
+                                  f'waiting {delay:.2f} seconds...')
+                time.sleep(delay)
+                attempt += 1
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,59 @@
+"""
+In-process metrics registry.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_summaries = {}
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    rendered = ','.join(f'{k}={v}' for k, v in sorted(labels.items()))
+    return f'{name}{{{rendered}}}'
+
+
+def increment(name, value=1, **labels):
+    """Add `value` to a counter."""
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to its current value."""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    """Record one observation of a summary (count, sum and max)."""
+    key = _key(name, labels)
+    with _lock:
+        summary = _summaries.setdefault(
+            key, {'count': 0, 'sum': 0.0, 'max': 0.0}
+        )
+        summary['count'] += 1
+        summary['sum'] += value
+        summary['max'] = max(summary['max'], value)
+
+
+def snapshot():
+    """Return a copy of all metrics."""
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'gauges': dict(_gauges),
+            'summaries': {k: dict(v) for k, v in _summaries.items()},
+        }
+
+
+def reset():
+    """Forget all recorded metrics."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _summaries.clear()
@@ -0,0 +1,221 @@
+"""
+Middleware for the API.
+"""
+import time
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipCompressor:
+    """Incremental gzip compressor."""
+    encoding = 'gzip'
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    """Incremental brotli compressor."""
+    encoding = 'br'
+
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    """Incremental zstd compressor."""
+    encoding = 'zstd'
+
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+COMPRESSORS = {
+    compressor.encoding: compressor
+    for compressor, available in [
+        (ZstdCompressor, zstandard is not None),
+        (BrotliCompressor, brotli is not None),
+        (GzipCompressor, True),
+    ]
+    if available
+}
+
+
+def parse_accept_encoding(header):
+    """Return the `{coding: q}` of an Accept-Encoding header."""
+    codings = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def choose_encoding(header, encodings):
+    """Return the preferred of `encodings` the client accepts, or None.
+
+    Encodings the client ranks equally are picked in the order given.
+    """
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = codings.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Stats:
+    """Bytes in and out and CPU time spent compressing one response."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def run(self, func, *data):
+        start = time.thread_time()
+        out = func(*data)
+        self.seconds += time.thread_time() - start
+        self.bytes_in += sum(len(chunk) for chunk in data)
+        self.bytes_out += len(out)
+        return out
+
+    def publish(self):
+        metrics.increment('compression_responses', encoding=self.encoding)
+        metrics.increment('compression_bytes_saved',
+                          self.bytes_in - self.bytes_out,
+                          encoding=self.encoding)
+        metrics.observe('compression_cpu_seconds', self.seconds,
+                        encoding=self.encoding)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the best encoding the client accepts.
+
+    Like Django's GZipMiddleware, but negotiates zstd, brotli and gzip and
+    compresses streaming responses chunk by chunk, flushing after each one.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.encodings = [
+            encoding for encoding in settings.COMPRESSION_ENCODINGS
+            if encoding in COMPRESSORS
+        ]
+        self.levels = settings.COMPRESSION_LEVELS
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings
+        )
+        if encoding is None:
+            return response
+
+        compressor = COMPRESSORS[encoding](self.levels[encoding])
+        stats = _Stats(encoding)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(
+                    response.streaming_content, compressor, stats
+                )
+            else:
+                response.streaming_content = self._compress(
+                    response.streaming_content, compressor, stats
+                )
+            # The compressed length isn't known up front.
+            del response.headers['Content-Length']
+        else:
+            content = response.content
+            compressed = (stats.run(compressor.compress, content)
+                          + stats.run(compressor.finish))
+            if len(compressed) >= len(content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+            stats.publish()
+
+        # A weak ETag stays valid for the compressed representation.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _compress(content, compressor, stats):
+        for chunk in content:
+            yield (stats.run(compressor.compress, chunk)
+                   + stats.run(compressor.flush))
+        yield stats.run(compressor.finish)
+        stats.publish()
+
+    @staticmethod
+    async def _compress_async(content, compressor, stats):
+        async for chunk in content:
+            yield (stats.run(compressor.compress, chunk)
+                   + stats.run(compressor.flush))
+        yield stats.run(compressor.finish)
+        stats.publish()
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_user_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='purge_requested_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
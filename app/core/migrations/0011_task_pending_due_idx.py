@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_complete', False)), fields=['due_date'], name='task_pending_due_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_task_recurrence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_date'], name='core_task_user_id_d96f3d_idx'),
+        ),
+    ]
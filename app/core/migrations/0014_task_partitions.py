@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:02
+
+from django.conf import settings
+from django.db import migrations
+
+
+def partition_tasks(apps, schema_editor):
+    """Partition the task table when TASK_PARTITIONS asks for it."""
+    from core import partitioning
+
+    connection = schema_editor.connection
+    partitions = settings.TASK_PARTITIONS
+    if connection.vendor != 'postgresql' or not partitions:
+        return
+    if partitioning.partition_count(connection) != partitions:
+        partitioning.partition(connection, partitions)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_task_user_due_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_task_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('segment', models.CharField(max_length=255)),
+                ('offset', models.BigIntegerField()),
+                ('size', models.BigIntegerField()),
+                ('tasks', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
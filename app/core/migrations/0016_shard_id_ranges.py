@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:14
+
+from django.db import migrations
+
+
+def reserve_id_range(apps, schema_editor):
+    """Number the task data of a shard from its own id range."""
+    from core import sharding
+
+    Task = apps.get_model('core', 'Task')
+    sharding.reserve_id_range(schema_editor.connection, [
+        Task,
+        apps.get_model('core', 'Tag'),
+        Task._meta.get_field('tags').remote_field.through,
+        apps.get_model('core', 'ArchiveChunk'),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_archivechunk'),
+    ]
+
+    operations = [
+        migrations.RunPython(reserve_id_range, migrations.RunPython.noop),
+    ]
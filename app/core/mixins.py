@@ -0,0 +1,168 @@
+"""
+Reusable mixins for API views.
+"""
+from django.db import router, transaction
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from core import coalescing, idempotency, outbox, sharding
+from core.db import replicas
+
+
+class ShardMixin:
+    """Route the request's task and tag queries to the user's shard."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._shard_token = sharding.activate(request.user.shard)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_shard_token', None)
+        if token is not None:
+            sharding.deactivate(token)
+            self._shard_token = None
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaReadMixin:
+    """Serve read actions from a replica and pin writers to the primary."""
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions and \
+                not replicas.is_pinned(request.user):
+            self._replica_token = replicas.activate()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            replicas.deactivate(token)
+            self._replica_token = None
+
+        wrote = request.method not in SAFE_METHODS and \
+            response.status_code < 400
+        if wrote and request.user.is_authenticated:
+            replicas.pin_to_primary(request.user)
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class OutboxMixin:
+    """Record an outbox event in the transaction of each write."""
+
+    def _outbox_topic(self, action):
+        return f'{self.queryset.model._meta.model_name}.{action}'
+
+    def _outbox_payload(self, instance):
+        return self.get_serializer_class()(instance).data
+
+    def _atomic(self):
+        return transaction.atomic(
+            using=router.db_for_write(self.queryset.model)
+        )
+
+    def perform_create(self, serializer):
+        with self._atomic():
+            super().perform_create(serializer)
+            outbox.record(self.request.user.pk, self._outbox_topic('created'),
+                          self._outbox_payload(serializer.instance))
+
+    def perform_update(self, serializer):
+        with self._atomic():
+            super().perform_update(serializer)
+            outbox.record(self.request.user.pk, self._outbox_topic('updated'),
+                          self._outbox_payload(serializer.instance))
+
+    def perform_destroy(self, instance):
+        with self._atomic():
+            outbox.record(self.request.user.pk, self._outbox_topic('deleted'),
+                          {'id': instance.pk})
+            super().perform_destroy(instance)
+
+
+class IdempotencyMixin:
+    """Answer a POST or PATCH retried with the same `Idempotency-Key`
+    header with the first response instead of running it again."""
+    idempotent_methods = ('POST', 'PATCH')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(idempotency.HEADER)
+        if not key or request.method not in self.idempotent_methods:
+            return
+        claim = idempotency.Claim(request.user.pk, key,
+                                  idempotency.fingerprint(request))
+        replay = claim.acquire()
+        if replay is not None:
+            # Replace the handler dispatch is about to call.
+            setattr(self, request.method.lower(),
+                    lambda request, *args, **kwargs: replay)
+            return
+        self._idempotency_claim = claim
+
+    def handle_exception(self, exc):
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            claim = getattr(self, '_idempotency_claim', None)
+            if claim is not None:
+                claim.release()
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        claim = getattr(self, '_idempotency_claim', None)
+        if claim is not None:
+            self._idempotency_claim = None
+            if not getattr(response, 'is_rendered', True):
+                response.render()
+            claim.store(response)
+        return response
+
+
+class CoalescedReadMixin:
+    """Let identical concurrent reads of a user share one computation."""
+    coalesced_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Users who wrote recently, maybe through another process, read
+        # their own results until their pin to the primary ends.
+        if request.method == 'GET' and \
+                self.action in self.coalesced_actions and \
+                not replicas.is_pinned(request.user):
+            # Replace the handler dispatch is about to call.
+            self.get = self._coalesced(self.get)
+
+    def _coalesced(self, handler):
+        def get(request, *args, **kwargs):
+            own = None
+
+            def compute():
+                nonlocal own
+                own = handler(request, *args, **kwargs)
+                if not isinstance(own, Response):
+                    # A streamed response can't be shared.
+                    return None
+                return own.status_code, own.data, dict(own.items())
+
+            key = (request.get_full_path(), request.accepted_media_type)
+            shared = coalescing.reads.run(request.user.pk, key, compute)
+            if own is not None:
+                return own
+            if shared is None:
+                return handler(request, *args, **kwargs)
+            status_code, data, headers = shared
+            return Response(data, status=status_code, headers=headers)
+        return get
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        wrote = request.method not in SAFE_METHODS and \
+            response.status_code < 400
+        if wrote and request.user.is_authenticated:
+            coalescing.forget(request.user.pk)
+
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,10 +1,13 @@
 """
 Database models.
 """
+import copy
+
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -12,6 +15,67 @@ from django.contrib.auth.models import (
     PermissionsMixin
 )
 
+from core import recurrence, sharding
+
+
+class TrackedFieldsMixin:
+    """Save only the fields changed since the instance was loaded.
+
+    Values are compared with a copy taken when the instance is loaded,
+    refreshed or saved, so fields must hold immutable values. A save
+    without changes is skipped, and `save` overrides can use
+    `changed_fields` to only validate or derive what changed.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self, fields=None):
+        if fields is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+            fields = self._meta.concrete_fields
+        else:
+            fields = [self._meta.get_field(name) for name in fields]
+        for field in fields:
+            if field.attname in self.__dict__:
+                self._loaded_values[field.attname] = \
+                    self.__dict__[field.attname]
+
+    def changed_fields(self):
+        """Return the names of the fields changed since the instance was
+        loaded or saved, or None when it isn't stored yet."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or self._state.adding:
+            return None
+        return {
+            field.name for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and
+            loaded.get(field.attname, loaded) != self.__dict__[field.attname]
+        }
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot(fields)
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        changed = self.changed_fields()
+        if update_fields is None and not force_insert and \
+                changed is not None and self._meta.pk.name not in changed \
+                and using in (None, self._state.db):
+            if not changed:
+                return
+            update_fields = changed | {
+                field.name for field in self._meta.concrete_fields
+                if getattr(field, 'auto_now', False)
+            }
+        super().save(force_insert=force_insert, force_update=force_update,
+                     using=using, update_fields=update_fields)
+        self._snapshot(update_fields)
+
 
 class UserManager(BaseUserManager):
     """Manager for users."""
@@ -21,7 +85,9 @@ class UserManager(BaseUserManager):
         if not email:
             raise ValueError('User must have an email address.')
 
-        user = self.model(email=self.normalize_email(email), **extra_fields)
+        email = self.normalize_email(email)
+        extra_fields.setdefault('shard', sharding.shard_for_new_user(email))
+        user = self.model(email=email, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
 
@@ -37,7 +103,7 @@ class UserManager(BaseUserManager):
         return user
 
 
-class User(AbstractBaseUser, PermissionsMixin):
+class User(TrackedFieldsMixin, AbstractBaseUser, PermissionsMixin):
     """User in the system."""
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -46,6 +112,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     phone_number = models.CharField(max_length=255, null=True, blank=True)
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    shard = models.CharField(max_length=64, default='default')
+    purge_requested_at = models.DateTimeField(null=True, blank=True)
 
     objects = UserManager()
 
@@ -57,13 +125,15 @@ class Tag(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Users live in the default database, tags and tasks on shards.
+        db_constraint=False,
     )
 
     def __str__(self):
         return self.name
 
 
-class Task(models.Model):
+class Task(TrackedFieldsMixin, models.Model):
     """Task object."""
     class Priority(models.IntegerChoices):
         LOW = 1, _('Low')
@@ -82,17 +152,232 @@ class Task(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        # Users live in the default database, tags and tasks on shards.
+        db_constraint=False,
     )
+    # Recurrence rule of a repeating task, see `core.recurrence`. The
+    # task's due date is the first occurrence.
+    recurrence = models.CharField(max_length=255, blank=True)
+    # Last occurrence of the series, null when it never ends.
+    recurrence_end = models.DateTimeField(null=True, blank=True,
+                                          editable=False)
+    # Set on an occurrence of a series that was changed or completed, which
+    # is then stored as its own task.
+    series = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        # Purges delete tasks in batches without the cascade.
+        db_constraint=False,
+    )
+    occurrence = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Window queries of the reminder scheduler.
+            models.Index(
+                fields=['due_date'],
+                condition=models.Q(is_complete=False),
+                name='task_pending_due_idx',
+            ),
+            # A user's tasks in a due date window, e.g. the agenda.
+            models.Index(fields=['user', 'due_date']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['series', 'occurrence'],
+                name='unique_task_occurrence',
+            ),
+        ]
 
     def clean(self):
-        if self.due_date < timezone.now():
+        now = timezone.now()
+        if self.recurrence:
+            try:
+                rule = recurrence.parse(self.recurrence)
+            except ValueError as error:
+                raise ValidationError({'recurrence': str(error)})
+            # A series may have started in the past while it still has
+            # occurrences to come.
+            last = rule.last(self.due_date)
+            if last is None or last >= now:
+                return
+        elif self.series_id and self.due_date == self.occurrence:
+            # An occurrence kept at its time in the series, e.g. to
+            # complete it after the fact.
+            return
+        if self.due_date < now:
             raise ValidationError(_("You can't set a due date "
                                     "earlier than now."))
 
     def save(self, *args, **kwargs):
-        """Override save method to call clean before saving."""
-        self.clean()  # This will validate the fields
+        """Validate and derive the changed fields before saving."""
+        changed = self.changed_fields()
+        if changed is None or \
+                changed & {'due_date', 'recurrence', 'series'}:
+            self.clean()
+        if changed is None or changed & {'due_date', 'recurrence'}:
+            self.recurrence_end = None
+            if self.recurrence:
+                self.recurrence_end = recurrence.parse(self.recurrence) \
+                    .last(self.due_date)
         super().save(*args, **kwargs)
 
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        # Naming the stored user lets a partitioned task table update a
+        # single partition (see `core.partitioning`).
+        user_id = getattr(self, '_loaded_values', {}).get('user_id')
+        if user_id is not None:
+            base_qs = base_qs.filter(user_id=user_id)
+        return super()._do_update(base_qs, using, pk_val, values,
+                                  update_fields, forced_update)
+
+    def occurrence_at(self, at):
+        """Return an unsaved copy of a recurring task standing for its
+        occurrence at `at`."""
+        task = copy.copy(self)
+        task.due_date = at
+        task.series_id = self.pk
+        task.occurrence = at
+        return task
+
+    def materialize(self, at):
+        """Return the task of this series' occurrence at `at`, creating it
+        from the series when it doesn't exist yet."""
+        task, created = Task.objects.using(self._state.db).get_or_create(
+            user_id=self.user_id,
+            series=self,
+            occurrence=at,
+            defaults={
+                'description': self.description,
+                'priority': self.priority,
+                'due_date': at,
+            },
+        )
+        if created:
+            task.tags.set(self.tags.all())
+        return task, created
+
     def __str__(self):
         return self.description
+
+
+class ArchiveChunk(models.Model):
+    """A user's tasks stored in an archive segment (see `core.archive`)."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        # Users live in the default database, archive chunks on shards.
+        db_constraint=False,
+    )
+    # Segment file, relative to TASK_ARCHIVE_DIR.
+    segment = models.CharField(max_length=255)
+    # Position and length of the chunk's gzip member in the segment.
+    offset = models.BigIntegerField()
+    size = models.BigIntegerField()
+    tasks = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f'{self.segment}@{self.offset}'
+
+
+class OutboxEvent(models.Model):
+    """Change to a task or tag waiting to be delivered to webhooks.
+
+    Stored on the user's shard, so it is written in the same transaction
+    as the change.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Events outlive the user until they are delivered, so no foreign key.
+    user_id = models.BigIntegerField()
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+
+    def __str__(self):
+        return f'{self.topic} #{self.pk}'
+
+
+class WebhookSubscription(models.Model):
+    """Endpoint receiving outbox events."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    url = models.URLField(max_length=500)
+    # Comma separated topics (`task.updated`) or models (`task`), blank
+    # for every event.
+    topics = models.CharField(max_length=255, blank=True)
+    secret = models.CharField(max_length=255, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def matches(self, topic):
+        """Return True when the subscription wants events of `topic`."""
+        topics = {t.strip() for t in self.topics.split(',') if t.strip()}
+        return not topics or topic in topics or \
+            topic.partition('.')[0] in topics
+
+    def __str__(self):
+        return self.url
+
+
+class WebhookCursor(models.Model):
+    """Delivery position of a subscription in the outbox of one shard."""
+    subscription = models.ForeignKey(
+        WebhookSubscription,
+        on_delete=models.CASCADE,
+        related_name='cursors',
+    )
+    shard = models.CharField(max_length=64)
+    last_event_id = models.BigIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subscription', 'shard'],
+                name='unique_webhook_cursor',
+            ),
+        ]
+
+
+class Job(models.Model):
+    """Background job run by `manage.py run_workers`."""
+    class Status(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RUNNING = 'running', _('Running')
+        SUCCEEDED = 'succeeded', _('Succeeded')
+        FAILED = 'failed', _('Failed')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    name = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.QUEUED,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    # A running job not finished by then is given to another worker.
+    locked_until = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,32 @@
+"""
+OpenAPI annotations for API views.
+
+drf-spectacular is only imported when the API docs are served, so
+API-only workers don't load it at startup. Otherwise the annotations
+are no-ops.
+"""
+from django.conf import settings
+
+if settings.SERVE_API_DOCS:
+    from drf_spectacular.types import OpenApiTypes  # noqa: F401
+    from drf_spectacular.utils import (  # noqa: F401
+        OpenApiParameter,
+        extend_schema,
+        extend_schema_view,
+    )
+else:
+    class _OpenApiTypes:
+        """Stand-in returning the name of any requested type."""
+
+        def __getattr__(self, name):
+            return name
+
+    OpenApiTypes = _OpenApiTypes()
+
+    def OpenApiParameter(*args, **kwargs):
+        return None
+
+    def extend_schema(*args, **kwargs):
+        return lambda target: target
+
+    extend_schema_view = extend_schema
@@ -0,0 +1,202 @@
+"""
+Transactional outbox of task and tag changes, delivered to webhooks.
+
+Views record an `OutboxEvent` in the transaction of each change. The
+dispatcher reads the events of every shard in id order and POSTs them in
+batches to each subscription, concurrently across subscriptions but in
+order for each one: a subscription's position only moves past a batch
+once it has been accepted, and a failed batch is retried with backoff
+before anything newer is sent. Delivery is at least once.
+
+Ids are assigned before commit, so an event can become visible after a
+newer one. Events are only read once they are WEBHOOK_SETTLE_SECONDS old,
+which must outlast the transactions that record them.
+"""
+import hashlib
+import hmac
+import json
+import random
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import (
+    BigIntegerField,
+    CharField,
+    DateTimeField,
+    Min,
+    Value,
+)
+from django.db.models.functions import JSONObject
+from django.utils import timezone
+
+from core import metrics
+from core.models import OutboxEvent, WebhookCursor, WebhookSubscription
+
+
+def record(user_id, topic, payload):
+    """Record one event in the current transaction."""
+    return OutboxEvent.objects.create(
+        user_id=user_id, topic=topic, payload=payload,
+    )
+
+
+def record_each(user_id, topic, queryset, using):
+    """Record an event with the id of each row of `queryset` with a single
+    INSERT ... SELECT, without reading the rows. Return the number of
+    events."""
+    rows = queryset.using(using).order_by('pk').annotate(
+        event_created_at=Value(timezone.now(), DateTimeField()),
+        event_user_id=Value(user_id, BigIntegerField()),
+        event_topic=Value(topic, CharField()),
+        event_payload=JSONObject(id='pk'),
+    ).values_list('event_created_at', 'event_user_id', 'event_topic',
+                  'event_payload')
+    sql, params = rows.query.get_compiler(using).as_sql()
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(OutboxEvent._meta.get_field(name).column)
+        for name in ('created_at', 'user_id', 'topic', 'payload')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(OutboxEvent._meta.db_table)} '
+            f'({columns}) {sql}',
+            params,
+        )
+        return cursor.rowcount
+
+
+def backoff(attempts):
+    """Return the delay before retry number `attempts`, with jitter."""
+    delay = min(settings.WEBHOOK_RETRY_MAX_SECONDS,
+                settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def render(shard, events):
+    """Return the request body delivering `events`."""
+    return json.dumps({
+        'events': [
+            {
+                'id': f'{shard}:{event.pk}',
+                'topic': event.topic,
+                'user': event.user_id,
+                'created_at': event.created_at,
+                'data': event.payload,
+            }
+            for event in events
+        ],
+    }, cls=DjangoJSONEncoder).encode()
+
+
+def deliver(subscription, body, timeout):
+    """POST `body` to a subscription. Return None or the error."""
+    request = urllib.request.Request(
+        subscription.url,
+        data=body,
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    if subscription.secret:
+        signature = hmac.new(subscription.secret.encode(), body,
+                             hashlib.sha256).hexdigest()
+        request.add_header('X-Webhook-Signature', f'sha256={signature}')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout):
+            return None
+    except Exception as exc:
+        # urlopen raises HTTPError for responses other than 2xx.
+        return str(exc) or type(exc).__name__
+
+
+def _pending(cursor, subscription, batch_size, now):
+    """Return the next settled events of a cursor's shard, oldest first."""
+    settled = now - timedelta(seconds=settings.WEBHOOK_SETTLE_SECONDS)
+    return list(
+        OutboxEvent.objects.using(cursor.shard)
+        .filter(id__gt=cursor.last_event_id,
+                created_at__gte=subscription.created_at,
+                created_at__lte=settled)
+        .order_by('id')[:batch_size]
+    )
+
+
+def dispatch(batch_size=None, workers=None, timeout=None):
+    """Deliver one batch to every subscription that is due on every shard.
+
+    Return the number of delivered events and failed batches.
+    """
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    workers = workers or settings.WEBHOOK_WORKERS
+    timeout = timeout or settings.WEBHOOK_TIMEOUT
+    now = timezone.now()
+
+    jobs = []
+    for subscription in WebhookSubscription.objects.filter(is_active=True):
+        for shard in settings.DATABASE_SHARDS:
+            cursor, _ = WebhookCursor.objects.get_or_create(
+                subscription=subscription, shard=shard,
+            )
+            if cursor.retry_at and cursor.retry_at > now:
+                continue
+            events = _pending(cursor, subscription, batch_size, now)
+            if not events:
+                continue
+            wanted = [e for e in events if subscription.matches(e.topic)]
+            jobs.append((cursor, subscription, events, wanted))
+
+    def send(job):
+        cursor, subscription, _, wanted = job
+        if not wanted:
+            return None
+        return deliver(subscription, render(cursor.shard, wanted), timeout)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        errors = list(executor.map(send, jobs))
+
+    delivered = failed = 0
+    for (cursor, subscription, events, wanted), error in zip(jobs, errors):
+        if error is None:
+            cursor.last_event_id = events[-1].pk
+            cursor.attempts = 0
+            cursor.retry_at = None
+            cursor.last_error = ''
+            delivered += len(wanted)
+            metrics.increment('webhook_events_delivered', len(wanted))
+        else:
+            cursor.attempts += 1
+            cursor.retry_at = now + backoff(cursor.attempts)
+            cursor.last_error = error
+            failed += 1
+            metrics.increment('webhook_batches_failed')
+        cursor.save()
+
+    return {'delivered': delivered, 'failed': failed}
+
+
+def prune():
+    """Delete events every active subscription has received.
+
+    Return the number of deleted events.
+    """
+    active = WebhookCursor.objects.filter(subscription__is_active=True)
+    subscriptions = WebhookSubscription.objects.filter(is_active=True)
+    deleted = 0
+    for shard in settings.DATABASE_SHARDS:
+        events = OutboxEvent.objects.using(shard)
+        if subscriptions.exists():
+            cursors = active.filter(shard=shard)
+            if cursors.count() < subscriptions.count():
+                # A subscription hasn't started on this shard yet.
+                continue
+            position = cursors.aggregate(Min('last_event_id'))
+            events = events.filter(
+                id__lte=position['last_event_id__min']
+            )
+        deleted += events.delete()[0]
+    return deleted
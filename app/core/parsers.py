@@ -0,0 +1,68 @@
+"""
+Parsers for the API.
+"""
+import codecs
+import io
+
+import cbor2
+import msgpack
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson turns integers over 64 bits into floats. Bodies with runs of 19 or
+# more digits are found by mapping digits to 0 and everything else to a
+# space, which is much faster than a regex.
+_DIGITS = bytes(ord('0') if chr(i) in '0123456789' else ord(' ')
+                for i in range(256))
+_LONG_NUMBER = b'0' * 19
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser using orjson when it is installed.
+
+    Bodies orjson can't parse the same way as `JSONParser` are parsed by
+    `JSONParser`.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if (orjson is None or not self.strict
+                or codecs.lookup(encoding).name != 'utf-8'):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if _LONG_NUMBER not in body.translate(_DIGITS):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    """Parse MessagePack request bodies."""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), timestamp=3)
+        except ValueError as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
+
+class CBORParser(BaseParser):
+    """Parse CBOR request bodies."""
+    media_type = 'application/cbor'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return cbor2.loads(stream.read())
+        except (ValueError, cbor2.CBORDecodeError) as exc:
+            raise ParseError(f'CBOR parse error - {exc}')
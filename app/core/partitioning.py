@@ -0,0 +1,137 @@
+"""
+Hash partitioning of the task table on PostgreSQL.
+
+`partition` rebuilds `core_task` as a table partitioned by a hash of
+`user_id`. Task API queries always name the user, so PostgreSQL reads a
+single partition for them, and each partition is vacuumed and indexed on
+its own. Hash partitions cover every user id, so all partitions exist as
+soon as the table is partitioned and rows never wait for one.
+
+PostgreSQL only allows unique constraints on a partitioned table when they
+include the partition key. The primary key and `unique_task_occurrence`
+are extended with `user_id`, which changes nothing since a series and its
+occurrences have the same user, and the link table's foreign key to tasks
+is dropped, since `id` alone can no longer be referenced.
+"""
+from django.db import NotSupportedError, transaction
+
+from core.models import Task
+
+
+def partition_count(connection):
+    """Return the number of partitions of the task table, 0 when it isn't
+    partitioned."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM pg_inherits '
+            'JOIN pg_partitioned_table ON partrelid = inhparent '
+            'WHERE inhparent = to_regclass(%s)',
+            [Task._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def _definitions(cursor, table):
+    """Return the unique constraints and other indexes of `table`."""
+    cursor.execute(
+        'SELECT conname, contype, array('
+        '  SELECT attname FROM unnest(conkey) WITH ORDINALITY AS k(num, i)'
+        '  JOIN pg_attribute ON attrelid = conrelid AND attnum = num'
+        '  ORDER BY i'
+        ') FROM pg_constraint '
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'u') "
+        'ORDER BY conname',
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+        'WHERE indrelid = %s::regclass AND NOT EXISTS ('
+        '  SELECT FROM pg_constraint WHERE conindid = indexrelid'
+        ') ORDER BY indexrelid',
+        [table],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    return constraints, indexes
+
+
+def _drop_references(cursor, quote, table):
+    """Drop the foreign keys of other tables pointing at `table`."""
+    cursor.execute(
+        'SELECT conrelid::regclass::text, conname FROM pg_constraint '
+        "WHERE confrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    for referencing, name in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE {referencing} '
+                       f'DROP CONSTRAINT {quote(name)}')
+
+
+def partition(connection, partitions):
+    """Rebuild the task table as `partitions` hash partitions by user.
+
+    The rows are copied in one transaction holding an exclusive lock on
+    the table, so run it while the API is stopped. A partitioned table is
+    rebuilt the same way to change its number of partitions.
+    """
+    if connection.vendor != 'postgresql':
+        raise NotSupportedError('Partitioning needs PostgreSQL.')
+    if partitions < 2:
+        raise ValueError('At least 2 partitions are needed.')
+    quote = connection.ops.quote_name
+    table = Task._meta.db_table
+    old = f'{table}_unpartitioned'
+
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE')
+        constraints, indexes = _definitions(cursor, table)
+        _drop_references(cursor, quote, table)
+        cursor.execute(
+            f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}'
+        )
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(old)} '
+            f'INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS '
+            f'INCLUDING STORAGE) PARTITION BY HASH (user_id)'
+        )
+        for remainder in range(partitions):
+            name = f'{table}_{partitions}_{remainder}'
+            cursor.execute(
+                f'CREATE TABLE {quote(name)} PARTITION OF {quote(table)} '
+                f'FOR VALUES WITH (MODULUS {partitions}, '
+                f'REMAINDER {remainder})'
+            )
+        cursor.execute(
+            f'INSERT INTO {quote(table)} OVERRIDING SYSTEM VALUE '
+            f'SELECT * FROM {quote(old)}'
+        )
+
+        # Carry on numbering where the old table's sequence stopped.
+        cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, 'id'), "
+            "pg_get_serial_sequence(%s, 'id')",
+            [old, table],
+        )
+        old_sequence, sequence = cursor.fetchone()
+        if sequence is None:
+            # A serial column: its default still uses the old sequence.
+            cursor.execute(f'ALTER SEQUENCE {old_sequence} '
+                           f'OWNED BY {quote(table)}.id')
+        else:
+            cursor.execute(
+                'SELECT setval(%s::regclass, nextval(%s::regclass), false)',
+                [sequence, old_sequence],
+            )
+        cursor.execute(f'DROP TABLE {quote(old)}')
+
+        for name, kind, columns in constraints:
+            if 'user_id' not in columns:
+                columns.append('user_id')
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+                f'{"PRIMARY KEY" if kind == "p" else "UNIQUE"} '
+                f'({", ".join(quote(column) for column in columns)})'
+            )
+        for definition in indexes:
+            cursor.execute(definition.replace(' ON ONLY ', ' ON ', 1))
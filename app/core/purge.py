@@ -0,0 +1,82 @@
+"""
+Chunked deletion of user accounts with large task sets.
+
+Deleting a user through the ORM makes the cascade collector load every
+related row into memory under one long transaction. Instead the user is
+disabled right away and a background job deletes their data in small
+batches.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core import jobs
+
+
+def schedule_user_purge(user):
+    """Disable a user at once and queue their account for deletion.
+
+    Return the purge job.
+    """
+    with transaction.atomic():
+        user.is_active = False
+        user.purge_requested_at = timezone.now()
+        user.save(update_fields=['is_active', 'purge_requested_at'])
+        return jobs.enqueue('core.purge_user', user=user, user_id=user.pk)
+
+
+def pending_purges():
+    """Return users waiting to be purged, oldest request first."""
+    return get_user_model().objects.filter(
+        purge_requested_at__isnull=False
+    ).order_by('purge_requested_at')
+
+
+def _delete_in_batches(queryset, using, batch_size):
+    """Delete rows of a queryset one short transaction at a time.
+
+    Yield the running number of deleted rows after each batch.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(
+                queryset.using(using).values_list('pk', flat=True)
+                [:batch_size]
+            )
+            if not ids:
+                return
+            deleted += queryset.model.objects.using(using) \
+                .filter(pk__in=ids)._raw_delete(using)
+        yield deleted
+
+
+def purge_user(user, batch_size=None, progress=None):
+    """Delete a user's tag links, tasks, tags and archive index in
+    bounded batches, then the user. `progress(stage, deleted)` is called
+    after each batch. Return the number of deleted rows per stage.
+
+    Archived tasks stay in their segments until `archive.prune_segments`
+    finds no other user left in them.
+    """
+    from core.models import ArchiveChunk, Task, Tag
+
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    using = user.shard
+    stages = [
+        ('links', Task.tags.through.objects.filter(task__user=user)),
+        ('tasks', Task.objects.filter(user=user)),
+        ('tags', Tag.objects.filter(user=user)),
+        ('archived', ArchiveChunk.objects.filter(user=user)),
+    ]
+    totals = {}
+    for stage, queryset in stages:
+        totals[stage] = 0
+        for deleted in _delete_in_batches(queryset, using, batch_size):
+            totals[stage] = deleted
+            if progress is not None:
+                progress(stage, deleted)
+
+    user.delete()
+    return totals
@@ -0,0 +1,162 @@
+"""
+Recurrence rules of repeating tasks.
+
+Rules are a subset of RFC 5545 RRULEs: a FREQ of DAILY, WEEKLY, MONTHLY or
+YEARLY, an optional INTERVAL and either a COUNT or an UNTIL, e.g.
+`FREQ=WEEKLY;INTERVAL=2;COUNT=10`. The first occurrence is the task's due
+date. Occurrences keep its wall-clock time in the current time zone, and
+monthly and yearly series fall on the last day of months too short for
+their day.
+
+The n-th occurrence is computed directly, so listing the occurrences in a
+window costs the same however long the series has been running.
+"""
+import calendar
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+
+_UNTIL_FORMATS = ('%Y%m%dT%H%M%SZ', '%Y%m%dT%H%M%S', '%Y%m%d')
+
+
+def _add_months(value, months):
+    year, month = divmod(value.month - 1 + months, 12)
+    year += value.year
+    day = min(value.day, calendar.monthrange(year, month + 1)[1])
+    return value.replace(year=year, month=month + 1, day=day)
+
+
+class Rule(namedtuple('Rule', ['freq', 'interval', 'count', 'until'])):
+    """Parsed recurrence rule."""
+
+    def __str__(self):
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.count is not None:
+            parts.append(f'COUNT={self.count}')
+        if self.until is not None:
+            until = self.until.astimezone(dt_timezone.utc)
+            parts.append(f'UNTIL={until:%Y%m%dT%H%M%SZ}')
+        return ';'.join(parts)
+
+    def _nth(self, local, n):
+        """Return occurrence `n` of a series starting at naive `local`."""
+        if self.freq == 'DAILY':
+            value = local + timedelta(days=n * self.interval)
+        elif self.freq == 'WEEKLY':
+            value = local + timedelta(weeks=n * self.interval)
+        elif self.freq == 'MONTHLY':
+            value = _add_months(local, n * self.interval)
+        else:
+            value = _add_months(local, 12 * n * self.interval)
+        return timezone.make_aware(value)
+
+    def _first_index(self, local, moment):
+        """Return the index of the first occurrence at or after `moment`."""
+        target = timezone.make_naive(moment)
+        if self.freq in ('DAILY', 'WEEKLY'):
+            step = timedelta(days=self.interval)
+            if self.freq == 'WEEKLY':
+                step *= 7
+            n = -((local - target) // step)
+        else:
+            months = self.interval * (12 if self.freq == 'YEARLY' else 1)
+            elapsed = (target.year - local.year) * 12 + \
+                target.month - local.month
+            n = elapsed // months
+        # The estimate is off by one at most, e.g. around DST changes.
+        n = max(n, 0)
+        while n > 0 and self._nth(local, n - 1) >= moment:
+            n -= 1
+        while self._nth(local, n) < moment:
+            n += 1
+        return n
+
+    def between(self, start, after, before):
+        """Yield the occurrences from `after` until before `before` of a
+        series starting at `start`."""
+        local = timezone.make_naive(start)
+        try:
+            n = self._first_index(local, max(after, start))
+            while self.count is None or n < self.count:
+                value = self._nth(local, n)
+                if value >= before or \
+                        (self.until is not None and value > self.until):
+                    return
+                yield value
+                n += 1
+        except (OverflowError, ValueError):
+            # Past the year 9999.
+            return
+
+    def includes(self, start, moment):
+        """Return True when `moment` is an occurrence of the series."""
+        return any(self.between(start, moment,
+                                moment + timedelta(microseconds=1)))
+
+    def last(self, start):
+        """Return the last occurrence, or None when the series is endless."""
+        local = timezone.make_naive(start)
+        try:
+            if self.count is not None:
+                n = self.count
+            elif self.until is not None and self.until >= start:
+                n = self._first_index(
+                    local, self.until + timedelta(microseconds=1)
+                )
+            elif self.until is not None:
+                return start
+            else:
+                return None
+            return self._nth(local, n - 1)
+        except (OverflowError, ValueError):
+            return None
+
+
+def parse(value):
+    """Parse a recurrence rule. Raise ValueError when it's invalid."""
+    try:
+        parts = dict(
+            part.split('=', 1) for part in value.upper().split(';') if part
+        )
+    except ValueError:
+        raise ValueError('Expected NAME=VALUE parts separated by ";".')
+    freq = parts.pop('FREQ', None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f'FREQ must be one of {", ".join(FREQUENCIES)}.')
+    try:
+        interval = int(parts.pop('INTERVAL', 1))
+        count = parts.pop('COUNT', None)
+        count = None if count is None else int(count)
+    except ValueError:
+        raise ValueError('INTERVAL and COUNT must be numbers.')
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError('INTERVAL and COUNT must be positive.')
+
+    until = parts.pop('UNTIL', None)
+    if until is not None:
+        for fmt in _UNTIL_FORMATS:
+            try:
+                parsed = datetime.strptime(until, fmt)
+            except ValueError:
+                continue
+            if fmt.endswith('Z'):
+                until = parsed.replace(tzinfo=dt_timezone.utc)
+            elif fmt == '%Y%m%d':
+                until = timezone.make_aware(
+                    parsed.replace(hour=23, minute=59, second=59)
+                )
+            else:
+                until = timezone.make_aware(parsed)
+            break
+        else:
+            raise ValueError('UNTIL must look like 20891231T235959Z.')
+    if count is not None and until is not None:
+        raise ValueError('COUNT and UNTIL can\'t be combined.')
+    if parts:
+        raise ValueError(f'Unsupported parts: {", ".join(sorted(parts))}.')
+    return Rule(freq, interval, count, until)
@@ -0,0 +1,275 @@
+"""
+Due-date reminders.
+
+A `Scheduler` holds the reminders of the next REMINDER_WINDOW_SECONDS in a
+min-heap, loaded with range queries on the indexed `Task.due_date` as the
+window moves forward. Changes to tasks reach it as events (see
+`core.events`), and only the changed tasks are read again, so nothing is
+ever rescanned. When more than REMINDER_MAX_PENDING reminders fall in the
+window, the window is shortened to keep memory bounded.
+
+A task is checked once more right before its reminder fires, so a missed
+event never fires a stale reminder. Reminders are handed in batches to the
+sink named by REMINDER_SINK. The scheduler starts from the current time:
+reminders that were due while it was stopped are not sent.
+"""
+import heapq
+import logging
+import threading
+from collections import deque, namedtuple
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import events, metrics, sharding
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+Reminder = namedtuple('Reminder', ['task_id', 'user_id', 'due_date'])
+
+
+class LogSink:
+    """Log reminders."""
+
+    def send(self, reminders):
+        for reminder in reminders:
+            logger.info('Task %s of user %s is due at %s.',
+                        reminder.task_id, reminder.user_id,
+                        reminder.due_date)
+
+
+class EventSink:
+    """Push reminders to their owner's clients as `reminder` events."""
+
+    def send(self, reminders):
+        for reminder in reminders:
+            events.publish(reminder.user_id, 'reminder', reminder.task_id)
+
+
+@lru_cache(maxsize=None)
+def get_sink():
+    """Return the sink configured by `settings.REMINDER_SINK`."""
+    return import_string(settings.REMINDER_SINK)()
+
+
+class Scheduler:
+    """Fire the reminders of pending tasks on time."""
+
+    def __init__(self, sink=None, lead=None, window=None, max_pending=None):
+        self.sink = sink or get_sink()
+        self.lead = timedelta(seconds=(
+            settings.REMINDER_LEAD_SECONDS if lead is None else lead
+        ))
+        self.window = timedelta(
+            seconds=window or settings.REMINDER_WINDOW_SECONDS
+        )
+        self.max_pending = max_pending or settings.REMINDER_MAX_PENDING
+        # Every reminder due before `horizon` is held in `_entries`, keyed
+        # by (user id, task id). `_heap` may also hold superseded entries,
+        # which are skipped when popped.
+        self.horizon = None
+        self._entries = {}
+        self._heap = []
+        # Reminders sent for tasks that aren't due yet, so an unrelated
+        # change doesn't send them again.
+        self._sent = {}
+        self._sent_order = deque()
+        self._lock = threading.Lock()
+        self._changed = {}
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def on_event(self, user_id, event):
+        """Note a change from the events broker. Safe to call from any
+        thread."""
+        if event['type'] == events.RESYNC['type']:
+            with self._lock:
+                self._changed[user_id] = None
+        elif event['type'].startswith('task.'):
+            with self._lock:
+                task_ids = self._changed.setdefault(user_id, set())
+                if task_ids is not None:
+                    task_ids.add(event['id'])
+        else:
+            return
+        self._wakeup.set()
+
+    def run(self):
+        """Fire reminders until `stop` is called."""
+        while not self._stopped:
+            timeout = self.tick(timezone.now())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def tick(self, now):
+        """Apply changes, load and fire the reminders due at `now`.
+
+        Return the seconds until the next reminder or load is due.
+        """
+        if self.horizon is None:
+            self.horizon = now
+        self._apply_changes(now)
+        if self.horizon < now + self.window / 2:
+            self._load(now + self.window)
+        self._fire(now)
+        while self._sent_order and self._sent_order[0][0] <= now:
+            _, key = self._sent_order.popleft()
+            if self._sent.get(key, now) <= now:
+                self._sent.pop(key, None)
+        metrics.set_gauge('reminders_pending', len(self._entries))
+
+        wake_at = self._heap[0][0] if self._heap else self.horizon
+        if len(self._entries) < self.max_pending:
+            wake_at = min(wake_at, self.horizon - self.window / 2)
+        return max((wake_at - now).total_seconds(), 0)
+
+    def _add(self, key, remind_at):
+        if self._entries.get(key) == remind_at:
+            return
+        self._entries[key] = remind_at
+        heapq.heappush(self._heap, (remind_at, *key))
+        if len(self._entries) > self.max_pending:
+            self._shrink()
+        elif len(self._heap) > 2 * len(self._entries) + 64:
+            self._rebuild(self._entries)
+
+    def _rebuild(self, entries):
+        self._entries = entries
+        self._heap = [(remind_at, *key) for key, remind_at in entries.items()]
+        heapq.heapify(self._heap)
+
+    def _shrink(self):
+        """Pull the horizon in until the window is a quarter below its cap."""
+        ordered = sorted(
+            (remind_at, key) for key, remind_at in self._entries.items()
+        )
+        cut = ordered[self.max_pending * 3 // 4][0]
+        if cut <= ordered[0][0]:
+            # All of them are due at the same instant.
+            return
+        self.horizon = cut
+        self._rebuild({key: remind_at for remind_at, key in ordered
+                       if remind_at < cut})
+
+    def _pending(self, shard, start, end):
+        return Task.objects.using(shard).filter(
+            is_complete=False,
+            due_date__gte=start + self.lead,
+            due_date__lt=end + self.lead,
+        ).order_by('due_date').values_list('due_date', 'user_id', 'pk')
+
+    def _load(self, until):
+        """Load the reminders due between the horizon and `until`."""
+        room = self.max_pending - len(self._entries)
+        if room <= 0:
+            return
+        start = self.horizon
+        rows = []
+        for shard in settings.DATABASE_SHARDS:
+            batch = list(self._pending(shard, start, until)[:room + 1])
+            if len(batch) > room:
+                # Stop before the first reminder that doesn't fit.
+                until = min(until, batch[room][0] - self.lead)
+            rows.extend(batch)
+        rows.sort()
+        if len(rows) > room:
+            until = min(until, rows[room][0] - self.lead)
+        if until <= start:
+            # More reminders are due at one instant than fit, hold them all.
+            until = start + timedelta(microseconds=1)
+            rows = [row for shard in settings.DATABASE_SHARDS
+                    for row in self._pending(shard, start, until)]
+        for due_date, user_id, task_id in rows:
+            remind_at = due_date - self.lead
+            if remind_at >= until:
+                break
+            self._add((user_id, task_id), remind_at)
+        self.horizon = until
+        metrics.increment('reminders_loaded', len(rows))
+
+    def _apply_changes(self, now):
+        """Read the tasks changed since the last tick again."""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+        for user_id, task_ids in changed.items():
+            try:
+                shard = sharding.shard_for_user_id(user_id)
+            except ObjectDoesNotExist:
+                # Its reminders are dropped when they are checked.
+                continue
+            tasks = Task.objects.using(shard).filter(user_id=user_id)
+            if task_ids is None:
+                tasks = tasks.filter(due_date__lt=self.horizon + self.lead,
+                                     due_date__gt=now)
+            else:
+                tasks = tasks.filter(pk__in=task_ids)
+            found = {
+                task_id: (due_date, is_complete)
+                for task_id, due_date, is_complete
+                in tasks.values_list('pk', 'due_date', 'is_complete')
+            }
+            for task_id in found if task_ids is None else task_ids:
+                key = (user_id, task_id)
+                due_date, is_complete = found.get(task_id, (None, True))
+                if is_complete or due_date - self.lead >= self.horizon or \
+                        self._sent.get(key) == due_date:
+                    self._entries.pop(key, None)
+                else:
+                    self._add(key, due_date - self.lead)
+
+    def _fire(self, now):
+        """Send the reminders that are due at `now`."""
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            remind_at, user_id, task_id = heapq.heappop(self._heap)
+            if self._entries.get((user_id, task_id)) == remind_at:
+                del self._entries[(user_id, task_id)]
+                due.setdefault(user_id, set()).add(task_id)
+        if not due:
+            return
+
+        reminders = []
+        by_shard = {}
+        for user_id in due:
+            try:
+                shard = sharding.shard_for_user_id(user_id)
+            except ObjectDoesNotExist:
+                continue
+            by_shard.setdefault(shard, []).append(user_id)
+        for shard, user_ids in by_shard.items():
+            tasks = Task.objects.using(shard).filter(
+                user_id__in=user_ids, is_complete=False,
+                pk__in={task_id for user_id in user_ids
+                        for task_id in due[user_id]},
+            ).values_list('pk', 'user_id', 'due_date')
+            for task_id, user_id, due_date in tasks:
+                if task_id not in due[user_id]:
+                    continue
+                remind_at = due_date - self.lead
+                if remind_at <= now:
+                    reminders.append(Reminder(task_id, user_id, due_date))
+                elif remind_at < self.horizon:
+                    # Moved to a later time by a change not seen yet.
+                    self._add((user_id, task_id), remind_at)
+        if not reminders:
+            return
+
+        reminders.sort(key=lambda reminder: reminder.due_date)
+        self.sink.send(reminders)
+        for reminder in reminders:
+            key = (reminder.user_id, reminder.task_id)
+            self._sent[key] = reminder.due_date
+            self._sent_order.append((reminder.due_date, key))
+        metrics.increment('reminders_sent', len(reminders))
@@ -0,0 +1,99 @@
+"""
+Renderers for the API.
+"""
+from datetime import timezone
+from decimal import Decimal
+
+import cbor2
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _orjson_default(value):
+    if isinstance(value, Decimal):
+        # orjson formats floats differently than json, leave it to json.
+        raise TypeError('Decimal')
+    return _encoder.default(value)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson when it is installed.
+
+    The output is the same as `JSONRenderer`'s. Anything orjson can't render
+    the same way (indented output, escaped unicode, decimals, integers over
+    64 bits, ...) is rendered by `JSONRenderer`. Other floats keep their
+    value but can use a different exponent notation.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_orjson_default,
+                option=(orjson.OPT_PASSTHROUGH_DATETIME
+                        | orjson.OPT_PASSTHROUGH_DATACLASS
+                        | orjson.OPT_NON_STR_KEYS),
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        # Keep the output a strict javascript subset like JSONRenderer.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render responses as MessagePack, datetimes as timestamps."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    native_datetimes = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default, datetime=True)
+
+
+def _cbor_default(encoder, value):
+    encoder.encode(_encoder.default(value))
+
+
+class CBORRenderer(BaseRenderer):
+    """Render responses as CBOR, datetimes as epoch timestamps."""
+    media_type = 'application/cbor'
+    format = 'cbor'
+    charset = None
+    render_style = 'binary'
+    native_datetimes = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return cbor2.dumps(
+            data,
+            datetime_as_timestamp=True,
+            timezone=timezone.utc,
+            default=_cbor_default,
+        )
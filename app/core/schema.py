@@ -0,0 +1,60 @@
+"""
+Views serving the OpenAPI schema.
+"""
+import json
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import translation
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.response import Response
+
+_lock = threading.Lock()
+_schemas = {}
+
+
+def _language(request):
+    """Return the language of `?lang=` among LANGUAGES, None for the
+    default language or any other value."""
+    lang = request.GET.get('lang')
+    if not lang or not settings.USE_I18N:
+        return None
+    try:
+        lang = translation.get_supported_language_variant(lang)
+    except LookupError:
+        return None
+    default = translation.get_supported_language_variant(
+        settings.LANGUAGE_CODE
+    )
+    return None if lang == default else lang
+
+
+class SchemaView(SpectacularAPIView):
+    """Serve the schema precomputed at build time.
+
+    Without a precomputed file, or for another language of LANGUAGES, the
+    schema is generated on the first request and kept for the life of the
+    process.
+    """
+
+    def _load_schema(self, request, lang):
+        path = Path(settings.OPENAPI_SCHEMA_FILE)
+        if lang is None and path.exists():
+            return json.loads(path.read_text())
+        return super()._get_schema_response(request).data
+
+    def _get_schema_response(self, request):
+        lang = _language(request)
+        with _lock:
+            if lang not in _schemas:
+                with translation.override(lang):
+                    _schemas[lang] = self._load_schema(request, lang)
+
+        return Response(
+            data=_schemas[lang],
+            headers={
+                'Content-Disposition':
+                    f'inline; filename="{self._get_filename(request, None)}"'
+            },
+        )
@@ -0,0 +1,58 @@
+"""
+Serializers for the core APIs.
+"""
+from django.conf import settings
+from rest_framework import serializers
+
+from core import batch
+from core.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background job status."""
+
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'status', 'attempts', 'max_attempts',
+                  'created_at', 'updated_at', 'run_at', 'result', 'error']
+        read_only_fields = fields
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for one request of a batch."""
+    method = serializers.ChoiceField(
+        choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'],
+    )
+    path = serializers.CharField()
+    headers = serializers.DictField(child=serializers.CharField(),
+                                    required=False)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_path(self, value):
+        if not value.startswith(batch.PREFIX):
+            raise serializers.ValidationError(
+                f'Paths start with {batch.PREFIX}.'
+            )
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for batch requests."""
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests.'
+            )
+        return value
+
+    def validate(self, attrs):
+        if attrs['parallel'] and any(
+            item['method'] != 'GET' for item in attrs['requests']
+        ):
+            raise serializers.ValidationError(
+                {'parallel': 'Only batches of GET requests run in parallel.'}
+            )
+        return attrs
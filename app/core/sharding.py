@@ -0,0 +1,215 @@
+"""
+Horizontal sharding of task data by user.
+
+Users live in the default database, which acts as the shard directory.
+Each user's tasks, tags and task/tag links live together on the shard
+named by `User.shard`.
+"""
+import contextvars
+import zlib
+from contextlib import contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, NotSupportedError, transaction
+from django.db.models import Count
+
+SHARDED_MODELS = {
+    'core.task', 'core.tag', 'core.task_tags', 'core.outboxevent',
+    'core.archivechunk',
+}
+
+# Size of the id range each shard numbers task data from.
+SHARD_ID_RANGE = 2 ** 48
+
+_active_shard = contextvars.ContextVar('active_shard', default=None)
+
+
+def is_sharded(model):
+    """Return True when the model's rows are stored on user shards."""
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def shard_for_new_user(email):
+    """Pick a shard for a new user by hashing their email."""
+    shards = settings.DATABASE_SHARDS
+    return shards[zlib.crc32(email.lower().encode()) % len(shards)]
+
+
+def _cache_key(user_id):
+    return f'user-shard:{user_id}'
+
+
+def shard_for_user_id(user_id):
+    """Return the shard alias of a user, looking it up when not cached."""
+    alias = cache.get(_cache_key(user_id))
+    if alias is None:
+        alias = get_user_model().objects.using(DEFAULT_DB_ALIAS) \
+            .values_list('shard', flat=True).get(pk=user_id)
+        cache.set(_cache_key(user_id), alias, settings.SHARD_CACHE_SECONDS)
+    return alias
+
+
+def forget(user_id):
+    """Drop the cached shard of a user."""
+    cache.delete(_cache_key(user_id))
+
+
+def activate(alias):
+    """Route sharded queries in the current context to `alias`."""
+    return _active_shard.set(alias)
+
+
+def deactivate(token):
+    """Restore the shard that was active before `activate`."""
+    _active_shard.reset(token)
+
+
+@contextmanager
+def use_shard(alias):
+    """Context manager routing sharded queries to `alias`."""
+    token = activate(alias)
+    try:
+        yield
+    finally:
+        deactivate(token)
+
+
+def shard_for_hints(hints):
+    """Resolve the shard of a query from router hints or the context."""
+    instance = hints.get('instance')
+    if instance is not None:
+        if isinstance(instance, get_user_model()):
+            return instance.shard
+        if is_sharded(type(instance)):
+            if instance._state.db:
+                return instance._state.db
+            user_id = getattr(instance, 'user_id', None)
+            if user_id is not None:
+                return shard_for_user_id(user_id)
+
+    return _active_shard.get()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def reserve_id_range(connection, models):
+    """Start the ids of `models` on a shard at its range, the
+    `SHARD_INDEX` of its DATABASES entry times SHARD_ID_RANGE.
+
+    Ids stay unique across shards, so rows can keep their ids when their
+    user moves. SQLite numbers on from a table's highest id, so there rows
+    moved in from a shard with a higher range take a shard past its own.
+    """
+    start = connection.settings_dict.get('SHARD_INDEX', 0) * SHARD_ID_RANGE
+    if not start:
+        return
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        raise NotSupportedError(
+            f'Id ranges of shards are not supported on {connection.vendor}.'
+        )
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in models:
+            table = model._meta.db_table
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f'GREATEST(%s, (SELECT max(id) FROM {quote(table)})))',
+                    [table, start],
+                )
+                continue
+            cursor.execute('DELETE FROM sqlite_sequence WHERE name = %s',
+                           [table])
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) '
+                'SELECT %s, max(%s, coalesce(max(id), 0)) '
+                f'FROM {quote(table)}',
+                [table, start],
+            )
+
+
+def move_user(user, target, batch_size=1000):
+    """Move a user's tasks and tags to another shard.
+
+    Rows keep their ids, which don't collide with the target's own since
+    shards number rows from their own id ranges. Existing rows are locked
+    on the source while they are copied. Return the number of moved tasks.
+    """
+    from core.models import ArchiveChunk, Task, Tag
+
+    source = user.shard
+    if source == target:
+        return 0
+
+    through = Task.tags.through
+    moved = 0
+    with transaction.atomic(using=source), \
+            transaction.atomic(using=target):
+        tags = Tag.objects.using(source).filter(user=user) \
+            .select_for_update().iterator(chunk_size=batch_size)
+        for chunk in _chunks(tags, batch_size):
+            Tag.objects.using(target).bulk_create(chunk)
+
+        tasks = Task.objects.using(source).filter(user=user) \
+            .select_for_update().iterator(chunk_size=batch_size)
+        for chunk in _chunks(tasks, batch_size):
+            Task.objects.using(target).bulk_create(chunk)
+            moved += len(chunk)
+
+        links = through.objects.using(source).filter(task__user=user) \
+            .iterator(chunk_size=batch_size)
+        for chunk in _chunks(links, batch_size):
+            through.objects.using(target).bulk_create(chunk)
+
+        # Archive segments are shared by all shards, only the index moves.
+        chunks = ArchiveChunk.objects.using(source).filter(user=user) \
+            .iterator(chunk_size=batch_size)
+        for chunk in _chunks(chunks, batch_size):
+            ArchiveChunk.objects.using(target).bulk_create(chunk)
+
+        user.shard = target
+        user.save(update_fields=['shard'])
+        forget(user.pk)
+
+        delete_user_data(user, using=source)
+
+    return moved
+
+
+def delete_user_data(user, using):
+    """Delete a user's tasks, tags, links and archive index from one
+    shard."""
+    from core.models import ArchiveChunk, Task, Tag
+
+    Task.tags.through.objects.using(using) \
+        .filter(task__user=user).delete()
+    Task.objects.using(using).filter(user=user).delete()
+    Tag.objects.using(using).filter(user=user).delete()
+    ArchiveChunk.objects.using(using).filter(user=user).delete()
+
+
+def shard_loads():
+    """Return the number of tasks stored on each shard."""
+    from core.models import Task
+
+    return {
+        alias: Task.objects.using(alias).count()
+        for alias in settings.DATABASE_SHARDS
+    }
+
+
+def user_loads(alias):
+    """Return (user_id, task count) pairs for a shard, largest first."""
+    from core.models import Task
+
+    return list(
+        Task.objects.using(alias).values_list('user_id')
+        .annotate(total=Count('id')).order_by('-total')
+    )
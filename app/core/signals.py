@@ -0,0 +1,70 @@
+"""
+Signal handlers for core models.
+"""
+from django.conf import settings
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core import coalescing, events, sharding
+from core.models import Tag, Task
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_sharded_user_data(sender, instance, using, **kwargs):
+    """Delete data the cascade can't reach because it lives on a shard."""
+    if instance.shard != using:
+        sharding.delete_user_data(instance, using=instance.shard)
+    sharding.forget(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Tag)
+def publish_saved(sender, instance, created, using, **kwargs):
+    """Tell the owner's clients about a created or updated task or tag."""
+    action = 'created' if created else 'updated'
+    events.publish(instance.user_id, f'{sender._meta.model_name}.{action}',
+                   instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Tag)
+def publish_deleted(sender, instance, using, **kwargs):
+    """Tell the owner's clients about a deleted task or tag."""
+    events.publish(instance.user_id, f'{sender._meta.model_name}.deleted',
+                   instance.pk, using=using)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def publish_tags_changed(sender, instance, action, reverse, using, **kwargs):
+    """Tell the owner's clients a task's tags changed."""
+    if action.startswith('post_') and not reverse:
+        events.publish(instance.user_id, 'task.updated', instance.pk,
+                       using=using)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Tag)
+def forget_reads(sender, instance, **kwargs):
+    """Stop sharing the owner's reads of tasks and tags that changed."""
+    coalescing.forget(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_user_reads(sender, instance, **kwargs):
+    """Stop sharing the reads of a changed user, e.g. moved to a shard."""
+    coalescing.forget(instance.pk)
+
+
+@receiver(m2m_changed, sender=Task.tags.through)
+def forget_tagged_reads(sender, instance, action, **kwargs):
+    """Stop sharing the owner's reads when tags were added or removed."""
+    if action.startswith('post_'):
+        coalescing.forget(instance.user_id)
@@ -2,16 +2,20 @@
 Test for Django admin modifications.
 """
 from datetime import datetime
+from unittest.mock import patch
 
 from django.utils import timezone
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 
 from rest_framework import status
 
 from core import models
+from core.admin import EstimatedCountPaginator
 
 
 class AdminSiteTests(TestCase):
@@ -113,3 +117,65 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user_schedules_purge(self):
+        """Test deleting a user in the admin schedules a purge."""
+        url = reverse('admin:core_user_delete', args=[self.user.id])
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_302_FOUND)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.purge_requested_at)
+
+    def test_task_list_filter_by_user_id(self):
+        """Test tasks can be filtered by a typed user id."""
+        due_date = timezone.make_aware(datetime(2089, 10, 9))
+        models.Task.objects.create(user=self.user, description='Mine',
+                                   due_date=due_date)
+        models.Task.objects.create(user=self.admin_user,
+                                   description='Theirs', due_date=due_date)
+        url = reverse('admin:core_task_changelist')
+
+        res = self.client.get(url, {'user_id': self.user.id})
+
+        self.assertContains(res, 'Mine')
+        self.assertNotContains(res, 'Theirs')
+        self.assertContains(res, 'name="user_id"')
+
+    def test_task_list_queries_constant(self):
+        """Test listing tasks doesn't query each task's user."""
+        due_date = timezone.make_aware(datetime(2089, 10, 9))
+        url = reverse('admin:core_task_changelist')
+        models.Task.objects.create(user=self.user, description='Task',
+                                   due_date=due_date)
+        with CaptureQueriesContext(connection) as one_task:
+            self.client.get(url)
+
+        for index in range(5):
+            user = get_user_model().objects.create_user(
+                email=f'user{index}@example.com',
+                password='password123',
+            )
+            models.Task.objects.create(user=user, description='Task',
+                                       due_date=due_date)
+        with CaptureQueriesContext(connection) as six_tasks:
+            self.client.get(url)
+
+        self.assertEqual(len(one_task), len(six_tasks))
+
+    def test_estimated_count_used_for_large_tables(self):
+        """Test the changelist paginator uses the row estimate."""
+        paginator = EstimatedCountPaginator(models.Task.objects.all(), 100)
+
+        with patch.object(EstimatedCountPaginator, 'estimate',
+                          return_value=5_000_000):
+            self.assertEqual(paginator.count, 5_000_000)
+
+    def test_exact_count_used_for_small_tables(self):
+        """Test small or unestimated tables are counted exactly."""
+        paginator = EstimatedCountPaginator(models.Task.objects.all(), 100)
+
+        with patch.object(EstimatedCountPaginator, 'estimate',
+                          return_value=10):
+            self.assertEqual(paginator.count, 0)
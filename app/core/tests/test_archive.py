@@ -0,0 +1,158 @@
+"""
+Tests for the cold task archive.
+"""
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone as django_timezone
+
+from core import archive
+from core.models import ArchiveChunk, Tag, Task
+
+BEFORE = datetime(2089, 6, 1, tzinfo=timezone.utc)
+
+
+def due(month):
+    return datetime(2089, month, 1, 12, tzinfo=timezone.utc)
+
+
+class ArchiveTests(TestCase):
+    """Test archiving completed tasks."""
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self) -> None:
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings = override_settings(TASK_ARCHIVE_DIR=self.archive_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Work')
+
+    def create_task(self, month, user=None, **fields):
+        fields.setdefault('is_complete', True)
+        return Task.objects.create(
+            user=user or self.user, description=f'Task {month}',
+            due_date=due(month), **fields,
+        )
+
+    def segments(self):
+        return [
+            name for _, _, names in os.walk(self.archive_dir)
+            for name in names
+        ]
+
+    def test_old_completed_tasks_archived(self):
+        """Test only old completed tasks move to the archive."""
+        old = self.create_task(1, priority=Task.Priority.HIGH)
+        old.tags.add(self.tag)
+        kept = [
+            self.create_task(7),
+            self.create_task(2, is_complete=False),
+            self.create_task(3, recurrence='FREQ=DAILY'),
+        ]
+
+        archived = archive.archive_shard('default', BEFORE)
+
+        self.assertEqual(archived, 1)
+        self.assertEqual(
+            set(Task.objects.values_list('id', flat=True)),
+            {task.id for task in kept},
+        )
+        self.assertFalse(Task.tags.through.objects.exists())
+        [task] = archive.user_archive(self.user)
+        self.assertEqual(
+            (task.id, task.description, task.due_date, task.priority,
+             task.created_at, task.is_complete),
+            (old.id, old.description, old.due_date, old.priority,
+             old.created_at, True),
+        )
+        self.assertEqual(list(task.tags.all()), [self.tag])
+
+    def test_users_read_only_their_chunks(self):
+        """Test each user's tasks are a separate chunk of a segment."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        mine = [self.create_task(1), self.create_task(2)]
+        theirs = self.create_task(1, user=other)
+
+        archive.archive_shard('default', BEFORE)
+
+        self.assertEqual(len(self.segments()), 1)
+        self.assertEqual(
+            [task.id for task in archive.user_archive(self.user)],
+            [task.id for task in mine],
+        )
+        self.assertEqual(
+            [task.id for task in archive.user_archive(other)], [theirs.id]
+        )
+
+    def test_segment_per_batch(self):
+        """Test a segment holds at most a batch of tasks."""
+        tasks = [self.create_task(month) for month in range(1, 6)]
+        reports = []
+
+        archive.archive_shard('default', BEFORE, batch_size=2,
+                              progress=reports.append)
+
+        self.assertEqual(reports, [2, 4, 5])
+        self.assertEqual(len(self.segments()), 3)
+        self.assertEqual(
+            [task.id for task in archive.user_archive(self.user)],
+            [task.id for task in tasks],
+        )
+
+    def test_failed_batch_keeps_tasks(self):
+        """Test tasks stay and the segment is removed on errors."""
+        task = self.create_task(1)
+
+        with patch.object(QuerySet, 'bulk_create',
+                          side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                archive.archive_shard('default', BEFORE)
+
+        self.assertEqual(list(Task.objects.all()), [task])
+        self.assertEqual(self.segments(), [])
+
+    def test_unused_segments_pruned(self):
+        """Test segments without chunks are deleted once old enough."""
+        self.create_task(1)
+        archive.archive_shard('default', BEFORE)
+        self.assertEqual(archive.prune_segments(), 0)
+
+        ArchiveChunk.objects.all().delete()
+        self.assertEqual(archive.prune_segments(), 0)
+        [path] = [os.path.join(directory, name)
+                  for directory, _, names in os.walk(self.archive_dir)
+                  for name in names]
+        os.utime(path, (0, 0))
+
+        self.assertEqual(archive.prune_segments(), 1)
+        self.assertEqual(self.segments(), [])
+
+    def test_archive_command(self):
+        """Test the command archives tasks older than --days."""
+        self.create_task(1)
+        days = (django_timezone.now() - BEFORE).days
+        out = StringIO()
+
+        call_command('archive_tasks', '--days', str(days), '--database',
+                     'default', stdout=out)
+
+        self.assertIn('default: archived 1 tasks.', out.getvalue())
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,169 @@
+"""
+Tests for the batch API.
+"""
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Tag, Task
+
+BATCH_URL = reverse('batch')
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('task:tag-list')
+TASKS_URL = reverse('task:task-list')
+
+
+def create_user(email='test@example.com'):
+    return get_user_model().objects.create_user(
+        email=email,
+        password='testpass123',
+    )
+
+
+def create_task(user, **params):
+    return Task.objects.create(
+        user=user, description='Task',
+        due_date=datetime(2089, 4, 20, 12, tzinfo=timezone.utc), **params,
+    )
+
+
+class PublicBatchApiTests(TestCase):
+    """Test unauthenticated batch requests."""
+
+    def test_auth_required(self):
+        """Test authentication is required for batches."""
+        res = APIClient().post(BATCH_URL, {
+            'requests': [{'method': 'GET', 'path': ME_URL}],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """Test authenticated batch requests."""
+
+    def setUp(self) -> None:
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def batch(self, *requests, **params):
+        return self.client.post(BATCH_URL, {
+            'requests': list(requests), **params,
+        }, format='json')
+
+    def test_requests_dispatched_in_order(self):
+        """Test the responses of all requests are returned together."""
+        tag = Tag.objects.create(user=self.user, name='Home')
+        task = create_task(self.user)
+
+        res = self.batch(
+            {'method': 'GET', 'path': ME_URL},
+            {'method': 'GET', 'path': TAGS_URL},
+            {'method': 'GET', 'path': f'{TASKS_URL}?fields=id'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        responses = res.data['responses']
+        self.assertEqual([item['status'] for item in responses],
+                         [200, 200, 200])
+        self.assertEqual(responses[0]['body']['email'], self.user.email)
+        self.assertEqual(responses[1]['body'][0]['id'], tag.id)
+        self.assertEqual(responses[2]['body'], [{'id': task.id}])
+        for item in responses:
+            self.assertNotIn('Content-Type', item['headers'])
+        self.assertIn('Accept', responses[1]['headers']['Vary'])
+
+    def test_authenticated_once(self):
+        """Test the token is looked up once for the whole batch."""
+        # The token and the two task lists.
+        with self.assertNumQueries(3):
+            res = self.batch(
+                {'method': 'GET', 'path': TASKS_URL},
+                {'method': 'GET', 'path': f'{TASKS_URL}?fields=id'},
+            )
+
+        self.assertEqual([item['status'] for item in res.data['responses']],
+                         [200, 200])
+
+    def test_writes_see_earlier_requests(self):
+        """Test a write and a read of it in the same batch."""
+        res = self.batch(
+            {'method': 'POST', 'path': TASKS_URL, 'body': {
+                'description': 'Sample',
+                'due_date': '2089-04-20T12:00:00Z',
+            }},
+            {'method': 'GET', 'path': f'{TASKS_URL}?fields=description'},
+        )
+
+        created, listed = res.data['responses']
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        self.assertEqual(listed['body'], [{'description': 'Sample'}])
+
+    def test_failures_returned_per_request(self):
+        """Test errors of a request don't fail the others."""
+        other = create_task(create_user('other@example.com'))
+
+        res = self.batch(
+            {'method': 'GET', 'path': '/api/missing/'},
+            {'method': 'GET',
+             'path': reverse('task:task-detail', args=[other.id])},
+            {'method': 'POST', 'path': TASKS_URL, 'body': {}},
+            {'method': 'GET', 'path': reverse('events')},
+            {'method': 'POST', 'path': BATCH_URL, 'body': {}},
+            {'method': 'GET', 'path': ME_URL},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in res.data['responses']],
+                         [404, 404, 400, 400, 400, 200])
+
+    def test_invalid_batches_rejected(self):
+        """Test malformed batches get a 400."""
+        with override_settings(BATCH_MAX_REQUESTS=1):
+            too_many = self.batch(*[{'method': 'GET', 'path': ME_URL}] * 2)
+        for res in [
+            too_many,
+            self.batch(),
+            self.batch({'method': 'GET', 'path': '/admin/'}),
+            self.batch({'method': 'TRACE', 'path': ME_URL}),
+            self.batch({'method': 'PATCH', 'path': ME_URL, 'body': {}},
+                       parallel=True),
+        ]:
+            with self.subTest(res=res.data):
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+
+class ParallelBatchApiTests(TransactionTestCase):
+    """Test batches of reads run in parallel."""
+
+    def test_parallel_reads(self):
+        """Test parallel requests return their responses in order."""
+        user = create_user()
+        task = create_task(user)
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        res = client.post(BATCH_URL, {
+            'requests': [
+                {'method': 'GET', 'path': ME_URL},
+                {'method': 'GET', 'path': f'{TASKS_URL}?fields=id'},
+                {'method': 'GET', 'path': TAGS_URL},
+            ],
+            'parallel': True,
+        }, format='json')
+
+        responses = res.data['responses']
+        self.assertEqual([item['status'] for item in responses],
+                         [200, 200, 200])
+        self.assertEqual(responses[0]['body']['email'], user.email)
+        self.assertEqual(responses[1]['body'], [{'id': task.id}])
+        self.assertEqual(responses[2]['body'], [])
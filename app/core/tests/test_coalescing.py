@@ -0,0 +1,220 @@
+"""
+Tests for coalescing identical reads.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.coalescing import SingleFlight, reads
+from core.db import replicas
+from core.models import Tag, Task
+
+TASKS_URL = reverse('task:task-list')
+
+
+def counted(result='result'):
+    """Return a function returning `result` and the list of its calls."""
+    calls = []
+
+    def func():
+        calls.append(1)
+        return result
+    return func, calls
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Test sharing computations."""
+
+    def setUp(self) -> None:
+        metrics.reset()
+        self.flights = SingleFlight()
+
+    def test_concurrent_callers_share_computation(self):
+        """Test callers arriving while a computation runs get its result."""
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+
+        results = []
+
+        def call():
+            results.append(self.flights.run(1, 'key', slow))
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['result'] * 4)
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['read_coalescing{role=leader}'], 1)
+        self.assertEqual(counters['read_coalescing{role=follower}'], 3)
+
+    def test_scopes_and_keys_not_shared(self):
+        """Test other users and other keys compute their own result."""
+        func, calls = counted()
+
+        self.flights.run(1, 'key', func)
+        self.flights.run(2, 'key', func)
+        self.flights.run(1, 'other', func)
+
+        self.assertEqual(len(calls), 3)
+
+    @override_settings(READ_COALESCE_TTL_SECONDS=60)
+    def test_result_kept_until_forgotten(self):
+        """Test a result is reused until its scope is forgotten."""
+        func, calls = counted()
+
+        self.flights.run(1, 'key', func)
+        self.flights.run(1, 'key', func)
+        self.flights.forget(1)
+        self.flights.run(1, 'key', func)
+
+        self.assertEqual(len(calls), 2)
+
+    @override_settings(READ_COALESCE_TTL_SECONDS=0)
+    def test_finished_results_not_kept_without_ttl(self):
+        """Test only running computations are shared with a TTL of 0."""
+        func, calls = counted()
+
+        self.flights.run(1, 'key', func)
+        self.flights.run(1, 'key', func)
+
+        self.assertEqual(len(calls), 2)
+
+    @override_settings(READ_COALESCE_TTL_SECONDS=60)
+    def test_errors_not_kept(self):
+        """Test a failed computation runs again for the next caller."""
+        def fail():
+            raise ValueError('failed')
+
+        with self.assertRaises(ValueError):
+            self.flights.run(1, 'key', fail)
+        func, calls = counted()
+
+        self.assertEqual(self.flights.run(1, 'key', func), 'result')
+        self.assertEqual(len(calls), 1)
+
+    def test_coroutines_share_computation(self):
+        """Test coroutines await a running computation."""
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'result'
+
+        async def main():
+            return await asyncio.gather(*[
+                self.flights.run_async(1, 'key', slow) for _ in range(3)
+            ])
+
+        self.assertEqual(asyncio.run(main()), ['result'] * 3)
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(READ_COALESCE_TTL_SECONDS=60)
+class CoalescedApiTests(TestCase):
+    """Test identical task and tag reads are coalesced."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        reads.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.task = Task.objects.create(
+            user=self.user, description='Task',
+            due_date=datetime(2089, 4, 20, 12, tzinfo=timezone.utc),
+        )
+
+    def test_identical_reads_reuse_result(self):
+        """Test a repeated list is answered without queries."""
+        first = self.client.get(TASKS_URL, {'fields': 'id'})
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TASKS_URL, {'fields': 'id'})
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+
+    def test_different_reads_not_shared(self):
+        """Test other paths, parameters and users are computed."""
+        self.client.get(TASKS_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+
+        for url, user in [(TASKS_URL + '?fields=id', self.user),
+                          (reverse('task:task-detail', args=[self.task.id]),
+                           self.user),
+                          (TASKS_URL, other)]:
+            with self.subTest(url=url):
+                self.client.force_authenticate(user=user)
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+
+                self.assertTrue(queries.captured_queries)
+
+    def test_api_write_drops_results(self):
+        """Test a user's reads are computed again after a write."""
+        self.client.get(TASKS_URL)
+
+        res = self.client.patch(
+            reverse('task:task-detail', args=[self.task.id]),
+            {'description': 'Changed'}, format='json',
+        )
+        listed = self.client.get(TASKS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(listed.data[0]['description'], 'Changed')
+
+    def test_model_changes_drop_results(self):
+        """Test saved tasks and tags drop the owner's results."""
+        self.client.get(TASKS_URL)
+        tag = Tag.objects.create(user=self.user, name='Home')
+        self.task.tags.add(tag)
+
+        listed = self.client.get(TASKS_URL)
+
+        self.assertEqual(listed.data[0]['tags'][0]['name'], 'Home')
+
+    def test_pinned_users_skip_results(self):
+        """Test a user who wrote through another process reads their
+        write."""
+        self.client.get(TASKS_URL)
+        # A write by another process, which pins the user but can't drop
+        # this process's results.
+        Task.objects.filter(pk=self.task.pk).update(description='Changed')
+        replicas.pin_to_primary(self.user)
+
+        listed = self.client.get(TASKS_URL)
+
+        self.assertEqual(listed.data[0]['description'], 'Changed')
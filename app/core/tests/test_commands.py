@@ -1,34 +1,106 @@
 """
 Test custom Django management commands.
 """
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 
+from core.management.commands.profile_startup import import_times
 
-@patch('core.management.commands.wait_for_db.Command.check')
+
+@patch('core.management.commands.wait_for_db.Command.probe')
 class CommandTests(SimpleTestCase):
     """Test commands."""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_probe):
         """Test waiting for database if database ready."""
-        patched_check.return_value = True
+        patched_probe.return_value = None
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_probe.assert_called_once_with('default')
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+    def test_wait_for_db_delay(self, patched_sleep, patched_probe):
         """Test waiting for database when getting OperationalError."""
-        patched_check.side_effect = [Psycopg2Error] * 2 + \
-            [OperationalError] * 3 + [True]
+        patched_probe.side_effect = [Psycopg2Error] * 2 + \
+            [OperationalError] * 3 + [None]
+
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(patched_probe.call_count, 6)
+        patched_probe.assert_called_with('default')
+        self.assertEqual(patched_sleep.call_count, 5)
+
+    @patch('random.uniform', side_effect=lambda low, high: high)
+    @patch('time.sleep')
+    def test_wait_for_db_backoff(self, patched_sleep, patched_uniform,
+                                 patched_probe):
+        """Test retry delays grow exponentially up to the maximum."""
+        patched_probe.side_effect = [OperationalError] * 5 + [None]
+
+        call_command('wait_for_db', initial_delay=0.5, max_delay=3,
+                     stdout=StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(delays, [0.5, 1, 2, 3, 3])
+
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(self, patched_sleep, patched_probe):
+        """Test giving up once the timeout has passed."""
+        patched_probe.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+        patched_sleep.assert_not_called()
+
+
+class MigrateIfNeededTests(TestCase):
+    """Test the migrate fast path."""
+
+    @patch('core.management.commands.migrate_if_needed.call_command')
+    def test_skip_when_nothing_pending(self, patched_call):
+        """Test migrate isn't run when every migration is applied."""
+        out = StringIO()
+
+        call_command('migrate_if_needed', database=['default'], stdout=out)
+
+        patched_call.assert_not_called()
+        self.assertIn('No migrations to apply on default.', out.getvalue())
+
+    @patch('core.management.commands.migrate_if_needed.call_command')
+    @patch('core.management.commands.migrate_if_needed.Command'
+           '.pending_migrations')
+    def test_migrate_when_pending(self, patched_pending, patched_call):
+        """Test migrate is run when migrations are pending."""
+        patched_pending.return_value = [('core', '0001_initial')]
+
+        call_command('migrate_if_needed', database=['default'],
+                     stdout=StringIO())
+
+        patched_call.assert_called_once_with('migrate', database='default',
+                                             verbosity=1)
+
+
+class ProfileStartupTests(SimpleTestCase):
+    """Test the startup profile report."""
+
+    def test_import_times_grouped_by_package(self):
+        """Test import times are summed per top-level package."""
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:      1500 |       1500 |   django.db\n'
+            'import time:       500 |       2000 | django\n'
+            'import time:       250 |        250 | core.models\n'
+        )
 
-        call_command('wait_for_db')
+        times = import_times(stderr)
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        self.assertEqual(times, {'django': 0.002, 'core': 0.00025})
@@ -0,0 +1,152 @@
+"""
+Tests for the database connection pool.
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.db.backends.postgresql import base as postgresql_base
+from django.test import SimpleTestCase
+
+from core import metrics
+from core.db.backends.postgresql.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+def fake_connection():
+    """Create and return a stand-in for a DB-API connection."""
+    connection = MagicMock()
+    connection.closed = 0
+    connection.info.transaction_status = 0
+    return connection
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool."""
+
+    def setUp(self) -> None:
+        metrics.reset()
+        self.connect = MagicMock(side_effect=fake_connection)
+
+    def test_released_connection_reused(self):
+        """Test a released connection is handed out again."""
+        pool = ConnectionPool('test')
+
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        second = pool.acquire(self.connect)
+
+        self.assertIs(first, second)
+        self.connect.assert_called_once()
+
+    def test_pool_bounded(self):
+        """Test acquiring from an exhausted pool times out."""
+        pool = ConnectionPool('test', max_size=1, timeout=0.05)
+        pool.acquire(self.connect)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect)
+
+        self.assertEqual(
+            metrics.snapshot()['counters']['db_pool_timeouts{pool=test}'], 1
+        )
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting caller receives a connection once released."""
+        pool = ConnectionPool('test', max_size=1, timeout=5)
+        first = pool.acquire(self.connect)
+        received = []
+
+        waiter = threading.Thread(
+            target=lambda: received.append(pool.acquire(self.connect))
+        )
+        waiter.start()
+        pool.release(first)
+        waiter.join(timeout=5)
+
+        self.assertEqual(received, [first])
+        self.connect.assert_called_once()
+
+    def test_expired_connection_replaced(self):
+        """Test connections older than max_lifetime are closed."""
+        pool = ConnectionPool('test', max_lifetime=0)
+
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        second = pool.acquire(self.connect)
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+
+    def test_unhealthy_connection_replaced(self):
+        """Test idle connections failing the ping are replaced."""
+        pool = ConnectionPool('test', check_interval=0)
+        first = pool.acquire(self.connect)
+        pool.release(first)
+        first.cursor.side_effect = Exception('server closed the connection')
+
+        second = pool.acquire(self.connect)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_open_transaction_rolled_back_on_release(self):
+        """Test a connection left in a transaction is rolled back."""
+        pool = ConnectionPool('test')
+        connection = pool.acquire(self.connect)
+        connection.info.transaction_status = 2
+
+        pool.release(connection)
+
+        connection.rollback.assert_called_once()
+
+    def test_saturation_metrics(self):
+        """Test the pool publishes wait time and saturation."""
+        pool = ConnectionPool('test', max_size=4)
+
+        pool.acquire(self.connect)
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(
+            snapshot['gauges']['db_pool_saturation{pool=test}'], 0.25
+        )
+        self.assertEqual(
+            snapshot['summaries']['db_pool_wait_seconds{pool=test}']['count'],
+            1,
+        )
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Test the pooled PostgreSQL database wrapper."""
+
+    def _wrapper(self, pool_size):
+        settings_dict = {
+            'NAME': 'devdb',
+            'OPTIONS': {},
+            'POOL': {'MAX_SIZE': pool_size},
+        }
+        return DatabaseWrapper(settings_dict, alias=f'pooled_{pool_size}')
+
+    @patch.object(postgresql_base.DatabaseWrapper, 'get_new_connection')
+    def test_close_returns_connection_to_pool(self, patched_connect):
+        """Test closing a wrapper keeps the connection for the next one."""
+        patched_connect.side_effect = lambda params: fake_connection()
+        wrapper = self._wrapper(pool_size=2)
+
+        wrapper.connection = wrapper.get_new_connection({'dbname': 'devdb'})
+        raw = wrapper.connection
+        wrapper._close()
+        reused = wrapper.get_new_connection({'dbname': 'devdb'})
+
+        self.assertIs(raw, reused)
+        raw.close.assert_not_called()
+        patched_connect.assert_called_once()
+
+    @patch.object(postgresql_base.DatabaseWrapper, 'get_new_connection')
+    def test_pool_disabled(self, patched_connect):
+        """Test a pool size of zero connects per request."""
+        wrapper = self._wrapper(pool_size=0)
+
+        wrapper.get_new_connection({'dbname': 'devdb'})
+        wrapper.get_new_connection({'dbname': 'devdb'})
+
+        self.assertEqual(patched_connect.call_count, 2)
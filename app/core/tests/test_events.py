@@ -0,0 +1,182 @@
+"""
+Tests for pushing task and tag change events.
+"""
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core import events
+from core.models import Tag, Task
+
+EVENTS_URL = reverse('events')
+
+
+def collect(user_id, publish, **settings):
+    """Subscribe `user_id`, call `publish` and return the next batch."""
+    async def run():
+        with override_settings(**settings):
+            subscription = events.broker.subscribe(user_id)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, publish)
+            return await subscription.next_batch(1)
+        finally:
+            events.broker.unsubscribe(subscription)
+
+    return asyncio.run(run())
+
+
+class SubscriptionTests(SimpleTestCase):
+    """Test buffering events for a client."""
+
+    def test_events_of_other_users_not_delivered(self):
+        """Test a subscription only gets its user's events."""
+        def publish():
+            events.broker.dispatch(2, {'type': 'task.updated', 'id': 1})
+            events.broker.dispatch(1, {'type': 'task.updated', 'id': 2})
+
+        batch = collect(1, publish)
+
+        self.assertEqual(batch, [{'type': 'task.updated', 'id': 2}])
+
+    def test_bursts_coalesced(self):
+        """Test a burst of changes is one event per object."""
+        def publish():
+            for event in [
+                {'type': 'task.updated', 'id': 1},
+                {'type': 'task.updated', 'id': 2},
+                {'type': 'task.updated', 'id': 1},
+                {'type': 'tag.created', 'id': 1},
+                {'type': 'tag.updated', 'id': 1},
+                {'type': 'task.created', 'id': 3},
+                {'type': 'task.deleted', 'id': 3},
+                {'type': 'task.deleted', 'id': 2},
+            ]:
+                events.broker.dispatch(1, event)
+
+        batch = collect(1, publish)
+
+        self.assertEqual(batch, [
+            {'type': 'task.updated', 'id': 1},
+            {'type': 'tag.created', 'id': 1},
+            {'type': 'task.deleted', 'id': 2},
+        ])
+
+    def test_overflow_sends_resync(self):
+        """Test a client too slow to keep up is told to resync."""
+        def publish():
+            for task_id in range(10):
+                events.broker.dispatch(
+                    1, {'type': 'task.updated', 'id': task_id}
+                )
+
+        batch = collect(1, publish, EVENTS_MAX_PENDING=5)
+
+        self.assertEqual(batch, [events.RESYNC])
+
+    def test_no_events_times_out(self):
+        """Test waiting for events returns nothing after the timeout."""
+        async def run():
+            subscription = events.broker.subscribe(1)
+            try:
+                return await subscription.next_batch(0.01)
+            finally:
+                events.broker.unsubscribe(subscription)
+
+        self.assertEqual(asyncio.run(run()), [])
+
+
+class SignalTests(TestCase):
+    """Test changes to tasks and tags publish events."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            username='Jonny123',
+        )
+        self.published = []
+        patcher = patch.object(
+            events.broker, 'dispatch',
+            lambda user_id, event: self.published.append((user_id, event)),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_task_changes_published_on_commit(self):
+        """Test saving, tagging and deleting a task publish events."""
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(
+                user=self.user, description='Sample',
+                due_date=datetime(2089, 4, 1, tzinfo=timezone.utc),
+            )
+            tag = Tag.objects.create(user=self.user, name='Work')
+            task.tags.add(tag)
+            task_id = task.id
+            task.delete()
+
+            self.assertEqual(self.published, [])
+
+        self.assertEqual(self.published, [
+            (self.user.id, {'type': 'task.created', 'id': task_id}),
+            (self.user.id, {'type': 'tag.created', 'id': tag.id}),
+            (self.user.id, {'type': 'task.updated', 'id': task_id}),
+            (self.user.id, {'type': 'task.deleted', 'id': task_id}),
+        ])
+
+
+class EventStreamTests(TestCase):
+    """Test the event stream endpoint."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            username='Jonny123',
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    async def test_auth_required(self):
+        """Test authentication is required for the stream."""
+        res = await self.async_client.get(EVENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_stream_events(self):
+        """Test the user's events are streamed."""
+        res = await self.async_client.get(
+            EVENTS_URL, headers={'Authorization': f'Token {self.token.key}'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        stream = aiter(res.streaming_content)
+        try:
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            events.broker.dispatch(
+                self.user.id, {'type': 'task.updated', 'id': 5}
+            )
+            self.assertEqual(
+                await anext(stream),
+                b'event: task.updated\ndata: {"id": 5}\n\n',
+            )
+        finally:
+            await stream.aclose()
+
+    def test_wsgi_not_supported(self):
+        """Test the stream isn't served by the WSGI handler."""
+        self.client.force_login(self.user)
+
+        res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_501_NOT_IMPLEMENTED)
@@ -0,0 +1,219 @@
+"""
+Tests for the GraphQL API.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import gql
+from core.models import Tag, Task
+
+GRAPHQL_URL = reverse('graphql')
+
+TASKS_QUERY = '''
+query Tasks($complete: Boolean) {
+  tasks(isComplete: $complete) {
+    id description dueDate isComplete
+    tags { id name }
+    user { email }
+  }
+}
+'''
+
+
+def create_task(user, **params):
+    return Task.objects.create(
+        user=user, description='Task',
+        due_date=datetime(2089, 4, 20, 12, tzinfo=timezone.utc), **params,
+    )
+
+
+class DataLoaderTests(SimpleTestCase):
+    """Test loading values in batches."""
+
+    def test_keys_loaded_in_one_batch(self):
+        """Test keys asked for together are loaded by one call, which is
+        referenced until it's done."""
+        calls = []
+
+        def batch_load(keys):
+            calls.append(keys)
+            return [key * 2 for key in keys]
+
+        loader = gql.DataLoader(batch_load)
+
+        async def main():
+            futures = [loader.load(key) for key in [1, 2, 1]]
+            await asyncio.sleep(0)
+            pending = set(loader._tasks)
+            return pending, await asyncio.gather(*futures)
+
+        pending, values = asyncio.run(main())
+
+        self.assertEqual(values, [2, 4, 2])
+        self.assertEqual(calls, [[1, 2]])
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(loader._tasks, set())
+
+
+class PublicGraphQLApiTests(TestCase):
+    """Test unauthenticated GraphQL requests."""
+
+    def test_auth_required(self):
+        """Test authentication is required for queries."""
+        res = APIClient().post(GRAPHQL_URL, {'query': '{ me { id } }'},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateGraphQLApiTests(TestCase):
+    """Test authenticated GraphQL requests."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        gql.document.cache_clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def query(self, query, **params):
+        return self.client.post(GRAPHQL_URL, {'query': query, **params},
+                                format='json')
+
+    def test_nested_fields_loaded_in_batches(self):
+        """Test the tags and users of all tasks take one query each."""
+        home = Tag.objects.create(user=self.user, name='Home')
+        work = Tag.objects.create(user=self.user, name='Work')
+        for tags in [[home], [home, work], []]:
+            create_task(self.user).tags.add(*tags)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_task(other)
+
+        # The tasks, their tags and their user.
+        with self.assertNumQueries(3):
+            res = self.query(TASKS_QUERY)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('errors', res.data)
+        tasks = res.data['data']['tasks']
+        self.assertEqual(len(tasks), 3)
+        self.assertEqual(
+            sorted([tag['name'] for tag in task['tags']] for task in tasks),
+            [[], ['Home'], ['Home', 'Work']],
+        )
+        self.assertEqual({task['user']['email'] for task in tasks},
+                         {self.user.email})
+        self.assertEqual(tasks[0]['dueDate'], '2089-04-20T12:00:00+00:00')
+
+    def test_variables_and_arguments(self):
+        """Test filtering tasks and fetching a task by id."""
+        done = create_task(self.user, is_complete=True)
+        create_task(self.user)
+
+        listed = self.query(TASKS_QUERY, variables={'complete': True})
+        single = self.query('{ task(id: %d) { description } }' % done.id)
+
+        self.assertEqual([task['id'] for task in
+                          listed.data['data']['tasks']], [str(done.id)])
+        self.assertEqual(single.data['data']['task'],
+                         {'description': 'Task'})
+
+    def test_other_users_tasks_hidden(self):
+        """Test a task of another user isn't found."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        task = create_task(other)
+
+        res = self.query('{ task(id: %d) { id } }' % task.id)
+
+        self.assertIsNone(res.data['data']['task'])
+
+    def test_invalid_queries_rejected(self):
+        """Test syntax errors, unknown fields and mutations get a 400."""
+        for query in ['{ tasks {', '{ tasks { secret } }',
+                      'mutation { deleteTask }']:
+            with self.subTest(query=query):
+                res = self.query(query)
+
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+                self.assertTrue(res.data['errors'])
+
+    @override_settings(GRAPHQL_MAX_DEPTH=2)
+    def test_deep_queries_rejected(self):
+        """Test queries nested deeper than allowed are rejected, also
+        through fragments."""
+        allowed = self.query('{ tasks { id } }')
+        too_deep = self.query(
+            '{ ...Tasks } fragment Tasks on Query { tasks { tags { id } } }'
+        )
+
+        self.assertEqual(allowed.status_code, status.HTTP_200_OK)
+        self.assertEqual(too_deep.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('3 levels deep', too_deep.data['errors'][0]['message'])
+
+    @override_settings(GRAPHQL_MAX_COST=200, GRAPHQL_MAX_LIST=50)
+    def test_costly_queries_rejected(self):
+        """Test the cost of fields in lists counts each item."""
+        # 1 + 10 * (1 + 1 + 10 * 1) = 121
+        cheap = self.query('{ tasks(first: 10) { id tags { id } } }')
+        # 1 + 50 * (1 + 1 + 10 * 1) = 601
+        costly = self.query('{ tasks { id tags { id } } }')
+
+        self.assertEqual(cheap.status_code, status.HTTP_200_OK)
+        self.assertEqual(costly.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('costs 601', costly.data['errors'][0]['message'])
+
+    @override_settings(GRAPHQL_MAX_COST=50, GRAPHQL_MAX_LIST=50)
+    def test_negative_first_rejected(self):
+        """Test a negative `first` can't lower the cost of a query."""
+        res = self.query(
+            '{ a: tasks(first: -100000) { id tags { id } } '
+            'b: tasks { id tags { id } } }'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("can't be negative",
+                      res.data['errors'][0]['message'])
+
+    def test_documents_parsed_once(self):
+        """Test a repeated query isn't parsed again."""
+        self.query(TASKS_QUERY)
+        self.query(TASKS_QUERY)
+
+        info = gql.document.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_persisted_queries(self):
+        """Test a query is registered with its hash and then run by it."""
+        digest = hashlib.sha256(TASKS_QUERY.encode()).hexdigest()
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': digest}}
+        create_task(self.user)
+
+        unknown = self.query(None, extensions=extensions)
+        registered = self.query(TASKS_QUERY, extensions=extensions)
+        by_hash = self.query(None, extensions=extensions)
+        mismatch = self.query('{ me { id } }', extensions=extensions)
+
+        self.assertEqual(unknown.data['errors'][0]['message'],
+                         'PersistedQueryNotFound')
+        self.assertEqual(by_hash.status_code, status.HTTP_200_OK)
+        self.assertEqual(by_hash.data, registered.data)
+        self.assertEqual(len(by_hash.data['data']['tasks']), 1)
+        self.assertEqual(mismatch.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,102 @@
+"""
+Tests for idempotency keys.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.idempotency import Claim
+from core.models import Task
+
+TASK_URL = reverse('task:task-list')
+
+PAYLOAD = {
+    'description': 'Sample',
+    'due_date': '2089-04-20T12:00:00Z',
+    'tags': [{'name': 'Home'}],
+}
+
+
+class IdempotencyTests(TestCase):
+    """Test retried writes with an Idempotency-Key header."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def post(self, payload=PAYLOAD, key='key-1'):
+        return self.client.post(TASK_URL, payload, format='json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_response(self):
+        """Test a retry gets the first response without a new task."""
+        first = self.post()
+
+        with self.assertNumQueries(0):
+            retry = self.post()
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_requests_without_key_not_replayed(self):
+        """Test requests without a key or with another key all run."""
+        self.client.post(TASK_URL, PAYLOAD, format='json')
+        self.client.post(TASK_URL, PAYLOAD, format='json')
+        self.post(key='key-2')
+
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_keys_scoped_to_user(self):
+        """Test another user's key doesn't replay their response."""
+        self.post()
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user=other)
+
+        res = self.post()
+
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(Task.objects.filter(user=other).count(), 1)
+
+    def test_key_reused_for_other_request(self):
+        """Test a key can't be reused with a different body."""
+        self.post()
+
+        res = self.post({**PAYLOAD, 'description': 'Other'})
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_concurrent_request_rejected(self):
+        """Test a retry of a request still running gets a conflict."""
+        claim = Claim(self.user.pk, 'key-1', 'running')
+        self.assertIsNone(claim.acquire())
+
+        with self.settings(IDEMPOTENCY_WAIT_SECONDS=0):
+            res = self.post()
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Task.objects.exists())
+
+    def test_validation_errors_replayed(self):
+        """Test failed requests are replayed too."""
+        first = self.post({'description': 'No due date'})
+        retry = self.post({'description': 'No due date'})
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
@@ -0,0 +1,199 @@
+"""
+Tests for background jobs.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs, purge
+from core.models import Job
+
+JOBS_URL = reverse('core:job-list')
+
+calls = []
+
+
+@jobs.register('tests.record')
+def record(value):
+    calls.append(value)
+    return {'value': value}
+
+
+@jobs.register('tests.fail')
+def fail():
+    raise RuntimeError('Boom')
+
+
+class JobTests(TestCase):
+    """Test queueing and running jobs."""
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_run_job(self):
+        """Test a queued job runs once and stores its result."""
+        job = jobs.enqueue('tests.record', value=42)
+
+        self.assertEqual(jobs.run_pending(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [42])
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertEqual(job.result, {'value': 42})
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(job.locked_until)
+
+    def test_unknown_job(self):
+        """Test queueing an unregistered job is an error."""
+        with self.assertRaises(ValueError):
+            jobs.enqueue('tests.missing')
+
+    def test_failed_job_retried(self):
+        """Test a failing job is retried later, then marked failed."""
+        job = jobs.enqueue('tests.fail', max_attempts=2)
+
+        jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Boom', job.error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_future_job_not_claimed(self):
+        """Test a job isn't run before its run_at."""
+        job = jobs.enqueue('tests.record', value=1)
+        Job.objects.filter(pk=job.pk).update(
+            run_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        self.assertIsNone(jobs.claim())
+
+    def test_expired_job_claimed_again(self):
+        """Test a running job past its visibility timeout is reclaimed."""
+        job = jobs.enqueue('tests.record', value=1)
+        claimed = jobs.claim()
+        self.assertEqual(claimed, job)
+        self.assertIsNone(jobs.claim())
+
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(jobs.claim(), job)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+
+    def test_expired_job_out_of_attempts_failed(self):
+        """Test a job whose worker died on its last attempt fails."""
+        job = jobs.enqueue('tests.record', value=1, max_attempts=1)
+        jobs.claim()
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertIsNone(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+
+    def test_purge_runs_as_job(self):
+        """Test scheduling a purge queues a job deleting the user."""
+        user = get_user_model().objects.create_user(
+            email='test@example.com', password='testpass123',
+        )
+
+        job = purge.schedule_user_purge(user)
+        jobs.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.SUCCEEDED)
+        self.assertIsNone(job.user)
+        self.assertFalse(get_user_model().objects.filter(pk=user.pk).exists())
+
+
+class JobApiTests(TestCase):
+    """Test the job status endpoints."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com', password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test authentication is required for job status."""
+        res = APIClient().get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_own_jobs(self):
+        """Test users only see their own jobs."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass123',
+        )
+        job = jobs.enqueue('tests.record', user=self.user, value=1)
+        jobs.enqueue('tests.record', user=other, value=2)
+
+        res = self.client.get(JOBS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data], [job.id])
+        self.assertEqual(res.data[0]['status'], Job.Status.QUEUED)
+
+    def test_retrieve_job(self):
+        """Test retrieving the status of a finished job."""
+        job = jobs.enqueue('tests.record', user=self.user, value=1)
+        jobs.run_pending()
+
+        res = self.client.get(reverse('core:job-detail', args=[job.id]))
+
+        self.assertEqual(res.data['status'], Job.Status.SUCCEEDED)
+        self.assertEqual(res.data['result'], {'value': 1})
+
+
+class RunWorkersCommandTests(TransactionTestCase):
+    """Test the run_workers command."""
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def run_burst(self, threads):
+        for value in range(5):
+            jobs.enqueue('tests.record', value=value)
+        out = StringIO()
+
+        call_command('run_workers', processes=1, threads=threads, burst=True,
+                     stdout=out)
+
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertIn('Ran 5 jobs.', out.getvalue())
+        self.assertFalse(
+            Job.objects.exclude(status=Job.Status.SUCCEEDED).exists()
+        )
+
+    def test_burst_runs_every_job(self):
+        """Test a worker drains the queue and exits."""
+        self.run_burst(threads=1)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'Needs row locks for concurrent workers.')
+    def test_burst_threads_share_queue(self):
+        """Test worker threads drain the queue together."""
+        self.run_burst(threads=2)
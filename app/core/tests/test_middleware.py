@@ -0,0 +1,124 @@
+"""
+Tests for the compression middleware.
+"""
+import asyncio
+import gzip
+
+import brotli
+import zstandard
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import metrics
+from core.middleware import CompressionMiddleware, choose_encoding
+
+CONTENT = b'{"description": "Sample task description"}' * 100
+
+DECOMPRESS = {
+    'gzip': gzip.decompress,
+    'br': brotli.decompress,
+    'zstd': lambda data: zstandard.ZstdDecompressor().decompressobj()
+    .decompress(data),
+}
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """Test compressing responses."""
+
+    def setUp(self) -> None:
+        metrics.reset()
+        self.factory = RequestFactory()
+
+    def process(self, response, accept_encoding):
+        request = self.factory.get(
+            '/api/task/tasks/', HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_choose_encoding(self):
+        """Test the encoding is negotiated from Accept-Encoding."""
+        encodings = ['zstd', 'br', 'gzip']
+        cases = [
+            ('gzip, deflate, br, zstd', 'zstd'),
+            ('gzip, br;q=0.9', 'gzip'),
+            ('br;q=0.5, gzip;q=0.5', 'br'),
+            ('*;q=0.1, zstd;q=0', 'br'),
+            ('gzip;q=0, identity', None),
+            ('', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(choose_encoding(header, encodings), expected)
+
+    def test_compress_response(self):
+        """Test each encoding compresses the response."""
+        for encoding, decompress in DECOMPRESS.items():
+            with self.subTest(encoding=encoding):
+                res = self.process(HttpResponse(CONTENT), encoding)
+
+                self.assertEqual(res['Content-Encoding'], encoding)
+                self.assertEqual(res['Vary'], 'Accept-Encoding')
+                self.assertEqual(int(res['Content-Length']),
+                                 len(res.content))
+                self.assertEqual(decompress(res.content), CONTENT)
+
+    def test_small_response_not_compressed(self):
+        """Test responses under the threshold are left alone."""
+        res = self.process(HttpResponse(b'{"id": 1}'), 'gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, b'{"id": 1}')
+
+    def test_encoded_response_not_compressed(self):
+        """Test responses that already have an encoding are left alone."""
+        response = HttpResponse(CONTENT)
+        response['Content-Encoding'] = 'identity'
+
+        res = self.process(response, 'gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'identity')
+        self.assertEqual(res.content, CONTENT)
+
+    def test_compress_streaming_response(self):
+        """Test streaming responses are compressed chunk by chunk."""
+        chunks = [CONTENT[:1000], CONTENT[1000:]]
+        for encoding, decompress in DECOMPRESS.items():
+            with self.subTest(encoding=encoding):
+                res = self.process(StreamingHttpResponse(chunks), encoding)
+
+                self.assertEqual(res['Content-Encoding'], encoding)
+                self.assertFalse(res.has_header('Content-Length'))
+                compressed = list(res.streaming_content)
+                self.assertEqual(len(compressed), len(chunks) + 1)
+                self.assertEqual(decompress(b''.join(compressed)), CONTENT)
+
+    def test_compress_async_streaming_response(self):
+        """Test async streaming responses are compressed."""
+        async def content():
+            yield CONTENT[:1000]
+            yield CONTENT[1000:]
+
+        async def collect(response):
+            return [chunk async for chunk in response.streaming_content]
+
+        res = self.process(StreamingHttpResponse(content()), 'gzip')
+
+        compressed = asyncio.run(collect(res))
+        self.assertEqual(gzip.decompress(b''.join(compressed)), CONTENT)
+
+    def test_metrics(self):
+        """Test bytes saved and CPU time are recorded per encoding."""
+        res = self.process(HttpResponse(CONTENT), 'gzip')
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(
+            snapshot['counters']['compression_bytes_saved{encoding=gzip}'],
+            len(CONTENT) - len(res.content),
+        )
+        self.assertEqual(
+            snapshot['summaries']
+            ['compression_cpu_seconds{encoding=gzip}']['count'],
+            1,
+        )
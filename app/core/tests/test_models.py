@@ -5,7 +5,9 @@ from datetime import datetime
 
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 
 from core import models
@@ -86,6 +88,40 @@ class ModelTests(TestCase):
                 due_date=timezone.make_aware(datetime(1889, 4, 20)),
             )
 
+    def test_past_series_validated_by_last_occurrence(self):
+        """Test a series starting in the past needs occurrences to come."""
+        user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+        )
+        start = timezone.make_aware(datetime(2000, 1, 1))
+
+        with self.assertRaises(ValidationError):
+            models.Task.objects.create(
+                user=user, description='Test task', due_date=start,
+                recurrence='FREQ=YEARLY;COUNT=1',
+            )
+        task = models.Task.objects.create(
+            user=user, description='Test task', due_date=start,
+            recurrence='FREQ=YEARLY',
+        )
+        self.assertIsNone(task.recurrence_end)
+
+    def test_invalid_recurrence_raise_error(self):
+        """Test an unsupported rule is reported on its field."""
+        user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+        )
+        with self.assertRaises(ValidationError) as error:
+            models.Task.objects.create(
+                user=user,
+                description='Test task',
+                due_date=timezone.make_aware(datetime(2089, 4, 20)),
+                recurrence='FREQ=HOURLY',
+            )
+        self.assertIn('recurrence', error.exception.message_dict)
+
     def test_create_tag(self):
         """Test creating a tag."""
         user = get_user_model().objects.create_user(
@@ -97,3 +133,64 @@ class ModelTests(TestCase):
             name='Tag1',
         )
         self.assertEqual(str(tag), tag.name)
+
+
+class ChangeTrackingTests(TestCase):
+    """Test saves only write changed fields."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+        )
+        models.Task.objects.create(
+            user=self.user,
+            description='Test task',
+            due_date=timezone.make_aware(datetime(2089, 4, 20)),
+        )
+        self.task = models.Task.objects.get()
+
+    def test_only_changed_fields_updated(self):
+        """Test an update sets only the changed columns."""
+        self.task.is_complete = True
+
+        with CaptureQueriesContext(connection) as queries:
+            self.task.save()
+
+        [query] = queries.captured_queries
+        self.assertIn('SET "is_complete" = ', query['sql'])
+        self.assertNotIn('"description"', query['sql'])
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.is_complete)
+
+    def test_unchanged_save_skipped(self):
+        """Test saving without changes runs no query."""
+        self.task.description = 'Test task'
+
+        with self.assertNumQueries(0):
+            self.task.save()
+            self.user.save()
+
+    def test_unchanged_due_date_not_validated(self):
+        """Test a task past its due date can still be changed."""
+        past = timezone.make_aware(datetime(2020, 1, 1))
+        models.Task.objects.filter(pk=self.task.pk).update(due_date=past)
+        self.task.refresh_from_db()
+
+        self.task.description = 'Changed'
+        self.task.save()
+        self.task.due_date = timezone.make_aware(datetime(2021, 1, 1))
+
+        with self.assertRaises(ValidationError):
+            self.task.save()
+
+    def test_auto_now_fields_updated(self):
+        """Test user updates also set `updated_at`."""
+        user = get_user_model().objects.get()
+        user.username = 'changed'
+
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+
+        self.assertIn('"updated_at"', queries.captured_queries[0]['sql'])
+        self.assertNotIn('"email"', queries.captured_queries[0]['sql'])
@@ -0,0 +1,274 @@
+"""
+Tests for the outbox and webhook delivery.
+"""
+import hashlib
+import hmac
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import outbox
+from core.models import (
+    OutboxEvent,
+    Tag,
+    Task,
+    WebhookCursor,
+    WebhookSubscription,
+)
+
+TASK_URL = reverse('task:task-list')
+
+
+class StubServer:
+    """Local HTTP server recording the webhook requests it receives."""
+
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                stub.requests.append((self.path, dict(self.headers), body))
+                self.send_response(stub.status_code)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+
+    def url(self, path='/hook'):
+        return f'http://127.0.0.1:{self.server.server_port}{path}'
+
+    def events(self, path='/hook'):
+        return [
+            event
+            for request_path, _, body in self.requests
+            if request_path == path
+            for event in json.loads(body)['events']
+        ]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class OutboxApiTests(TestCase):
+    """Test task changes record outbox events."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            username='Jonny123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_task_changes_recorded(self):
+        """Test creating, updating and deleting a task record events."""
+        res = self.client.post(TASK_URL, {
+            'description': 'Sample',
+            'due_date': '2089-04-01T12:00:00Z',
+            'tags': [{'name': 'Work'}],
+        }, format='json')
+        task_id = res.data['id']
+        detail_url = reverse('task:task-detail', args=[task_id])
+        self.client.patch(detail_url, {'priority': 3})
+        self.client.delete(detail_url)
+
+        events = list(OutboxEvent.objects.order_by('id'))
+        self.assertEqual(
+            [event.topic for event in events],
+            ['task.created', 'task.updated', 'task.deleted'],
+        )
+        self.assertEqual(events[0].user_id, self.user.id)
+        self.assertEqual(events[0].payload['tags'][0]['name'], 'Work')
+        self.assertEqual(events[1].payload['priority'], 3)
+        self.assertEqual(events[2].payload, {'id': task_id})
+
+    def test_invalid_change_not_recorded(self):
+        """Test a rejected change records no event."""
+        res = self.client.post(TASK_URL, {'description': 'Sample'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_bulk_changes_recorded(self):
+        """Test the bulk actions record an event per task."""
+        task = Task.objects.create(
+            user=self.user, description='Sample',
+            due_date=datetime(2089, 4, 1, tzinfo=timezone.utc),
+        )
+
+        self.client.post(reverse('task:task-complete'))
+        self.client.post(reverse('task:task-clear-completed'))
+
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by('id')
+                 .values_list('topic', 'payload')),
+            [('task.completed', {'id': task.id}),
+             ('task.deleted', {'id': task.id})],
+        )
+
+    def test_bulk_changes_recorded_once_per_task(self):
+        """Test a task matching several tag filters gets one event."""
+        task = Task.objects.create(
+            user=self.user, description='Sample',
+            due_date=datetime(2089, 4, 1, tzinfo=timezone.utc),
+        )
+        home = Tag.objects.create(user=self.user, name='Home')
+        work = Tag.objects.create(user=self.user, name='Work')
+        task.tags.add(home, work)
+        params = f'?tags={home.id},{work.id}'
+
+        completed = self.client.post(reverse('task:task-complete') + params)
+        cleared = self.client.post(
+            reverse('task:task-clear-completed') + params
+        )
+
+        self.assertEqual(completed.data, {'updated': 1})
+        self.assertEqual(cleared.data, {'deleted': 1})
+        self.assertEqual(
+            list(OutboxEvent.objects.order_by('id')
+                 .values_list('topic', 'payload')),
+            [('task.completed', {'id': task.id}),
+             ('task.deleted', {'id': task.id})],
+        )
+        self.assertFalse(Task.tags.through.objects.exists())
+
+
+@override_settings(WEBHOOK_SETTLE_SECONDS=0)
+class DispatchTests(TestCase):
+    """Test delivering outbox events to webhooks."""
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            username='Jonny123',
+        )
+
+    def record(self, topic, task_id):
+        return outbox.record(self.user.id, topic, {'id': task_id})
+
+    def subscribe(self, url, **fields):
+        subscription = WebhookSubscription.objects.create(url=url, **fields)
+        # Make the events recorded in the test visible to the subscription.
+        WebhookSubscription.objects.filter(pk=subscription.pk).update(
+            created_at=subscription.created_at - timedelta(minutes=1)
+        )
+        subscription.refresh_from_db()
+        return subscription
+
+    def test_events_delivered_in_order_batches(self):
+        """Test events are delivered in batches, oldest first."""
+        for task_id in range(5):
+            self.record('task.updated', task_id)
+
+        with StubServer() as server:
+            self.subscribe(server.url(), secret='s3cret')
+            first = outbox.dispatch(batch_size=3)
+            second = outbox.dispatch(batch_size=3)
+
+        self.assertEqual(first, {'delivered': 3, 'failed': 0})
+        self.assertEqual(second, {'delivered': 2, 'failed': 0})
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual([e['data']['id'] for e in server.events()],
+                         [0, 1, 2, 3, 4])
+        _, headers, body = server.requests[0]
+        expected = hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+        self.assertEqual(headers['X-Webhook-Signature'], f'sha256={expected}')
+
+    def test_failed_delivery_retried_in_order(self):
+        """Test a failed batch is retried before newer events."""
+        self.record('task.created', 1)
+
+        with StubServer(status_code=500) as failing, StubServer() as ok:
+            broken = self.subscribe(failing.url())
+            self.subscribe(ok.url())
+
+            result = outbox.dispatch()
+            self.record('task.updated', 1)
+
+            cursor = WebhookCursor.objects.get(subscription=broken,
+                                               shard=self.user.shard)
+            self.assertEqual(cursor.last_event_id, 0)
+            self.assertEqual(cursor.attempts, 1)
+            self.assertIsNotNone(cursor.retry_at)
+            self.assertEqual(outbox.dispatch()['failed'], 0)
+
+            failing.status_code = 200
+            WebhookCursor.objects.filter(pk=cursor.pk).update(retry_at=None)
+            outbox.dispatch()
+
+        self.assertEqual(result, {'delivered': 1, 'failed': 1})
+        self.assertEqual([e['topic'] for e in failing.events()],
+                         ['task.created', 'task.created', 'task.updated'])
+        self.assertEqual([e['topic'] for e in ok.events()],
+                         ['task.created', 'task.updated'])
+
+    def test_topics_filtered(self):
+        """Test subscriptions only receive the topics they asked for."""
+        self.record('task.updated', 1)
+        self.record('tag.deleted', 2)
+        self.record('task.deleted', 3)
+
+        with StubServer() as server:
+            subscription = self.subscribe(server.url(),
+                                          topics='tag, task.deleted')
+            outbox.dispatch()
+
+        self.assertEqual([e['topic'] for e in server.events()],
+                         ['tag.deleted', 'task.deleted'])
+        cursor = WebhookCursor.objects.get(subscription=subscription,
+                                           shard=self.user.shard)
+        self.assertEqual(
+            cursor.last_event_id,
+            OutboxEvent.objects.using(self.user.shard).latest('id').id,
+        )
+
+    @override_settings(WEBHOOK_SETTLE_SECONDS=60)
+    def test_unsettled_events_wait(self):
+        """Test events of possibly uncommitted transactions wait."""
+        self.record('task.updated', 1)
+
+        with StubServer() as server:
+            self.subscribe(server.url())
+            result = outbox.dispatch()
+
+        self.assertEqual(result, {'delivered': 0, 'failed': 0})
+        self.assertEqual(server.requests, [])
+
+    def test_prune_delivered_events(self):
+        """Test events every subscription received are deleted."""
+        delivered = self.record('task.updated', 1)
+
+        with StubServer() as server:
+            self.subscribe(server.url())
+            outbox.dispatch()
+        pending = self.record('task.updated', 2)
+
+        self.assertEqual(outbox.prune(), 1)
+        events = OutboxEvent.objects.using(self.user.shard)
+        self.assertEqual(list(events), [pending])
+        self.assertFalse(events.filter(pk=delivered.pk).exists())
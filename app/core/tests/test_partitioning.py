@@ -0,0 +1,84 @@
+"""
+Tests for partitioning the task table.
+"""
+import re
+from datetime import datetime, timezone
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import partitioning
+from core.models import Task
+
+DUE = datetime(2089, 4, 1, 12, tzinfo=timezone.utc)
+
+
+class TaskQueryTests(TestCase):
+    """Test task writes name the user."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+        )
+
+    def test_update_names_stored_user(self):
+        """Test saving a loaded task filters on its stored user."""
+        Task.objects.create(user=self.user, description='Sample',
+                            due_date=DUE)
+        task = Task.objects.get()
+
+        with CaptureQueriesContext(connection) as queries:
+            task.description = 'Changed'
+            task.save()
+
+        self.assertIn('"user_id" = %s' % self.user.pk,
+                      queries.captured_queries[0]['sql'])
+        task.refresh_from_db()
+        self.assertEqual(task.description, 'Changed')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL.')
+class PartitionTests(TestCase):
+    """Test rebuilding the task table as partitions."""
+
+    def setUp(self) -> None:
+        self.users = [
+            get_user_model().objects.create_user(
+                email=f'test{n}@example.com', password='testpass123',
+            )
+            for n in range(3)
+        ]
+
+    def test_partition_keeps_tasks(self):
+        """Test rows, ids and tags survive partitioning."""
+        tasks = [
+            Task.objects.create(user=user, description='Sample',
+                                due_date=DUE)
+            for user in self.users
+        ]
+
+        partitioning.partition(connection, 4)
+        task = Task.objects.create(user=self.users[0],
+                                   description='New', due_date=DUE)
+
+        self.assertEqual(partitioning.partition_count(connection), 4)
+        self.assertEqual(
+            list(Task.objects.order_by('id').values_list('id', flat=True)),
+            [*(task.id for task in tasks), task.id],
+        )
+        partitioning.partition(connection, 2)
+        self.assertEqual(partitioning.partition_count(connection), 2)
+        self.assertEqual(Task.objects.count(), 4)
+
+    def test_user_queries_read_one_partition(self):
+        """Test a user's tasks are read from a single partition."""
+        partitioning.partition(connection, 4)
+
+        plan = Task.objects.filter(user=self.users[0]).explain()
+
+        partitions = re.findall(rf'{Task._meta.db_table}_4_\d+', plan)
+        self.assertEqual(len(set(partitions)), 1)
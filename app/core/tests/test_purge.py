@@ -0,0 +1,87 @@
+"""
+Tests for purging user accounts.
+"""
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import purge
+from core.models import Task, Tag
+
+
+def create_task(user, **params):
+    """Create and return a task for the user."""
+    default = {
+        'description': 'Task',
+        'due_date': timezone.make_aware(datetime(2089, 4, 20)),
+    }
+    default.update(params)
+
+    return Task.objects.create(user=user, **default)
+
+
+class PurgeTests(TestCase):
+    """Test the account purge pipeline."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+        )
+        self.other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='password123',
+        )
+        tag = Tag.objects.create(user=self.user, name='Work')
+        for _ in range(5):
+            create_task(self.user).tags.add(tag)
+        self.other_task = create_task(self.other_user)
+
+    def test_schedule_disables_user(self):
+        """Test scheduling a purge disables the user right away."""
+        purge.schedule_user_purge(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.purge_requested_at)
+        self.assertEqual(list(purge.pending_purges()), [self.user])
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 5)
+
+    def test_purge_user_in_batches(self):
+        """Test purging deletes links, tasks and tags batch by batch."""
+        reports = []
+
+        totals = purge.purge_user(
+            self.user, batch_size=2,
+            progress=lambda stage, deleted: reports.append((stage, deleted)),
+        )
+
+        self.assertEqual(totals, {'links': 5, 'tasks': 5, 'tags': 1,
+                                  'archived': 0})
+        self.assertEqual(
+            reports,
+            [('links', 2), ('links', 4), ('links', 5),
+             ('tasks', 2), ('tasks', 4), ('tasks', 5),
+             ('tags', 1)],
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertFalse(Tag.objects.exists())
+        self.assertEqual(list(Task.objects.all()), [self.other_task])
+
+    def test_purge_command(self):
+        """Test the command purges only scheduled users."""
+        purge.schedule_user_purge(self.user)
+        out = StringIO()
+
+        call_command('purge_users', batch_size=10, stdout=out)
+
+        self.assertIn('Purged user', out.getvalue())
+        self.assertEqual(
+            list(get_user_model().objects.all()), [self.other_user]
+        )
@@ -0,0 +1,112 @@
+"""
+Tests for recurrence rules.
+"""
+from datetime import datetime, timezone
+
+from django.test import SimpleTestCase
+from django.utils.timezone import make_aware
+
+from core import recurrence
+
+
+def local(*args):
+    return make_aware(datetime(*args))
+
+
+class ParseTests(SimpleTestCase):
+    """Test parsing recurrence rules."""
+
+    def test_parse_rule(self):
+        """Test a rule is parsed and formatted normalized."""
+        rule = recurrence.parse(
+            'freq=weekly;interval=2;until=20891231T120000Z'
+        )
+
+        self.assertEqual(rule.freq, 'WEEKLY')
+        self.assertEqual(rule.interval, 2)
+        self.assertIsNone(rule.count)
+        self.assertEqual(rule.until,
+                         datetime(2089, 12, 31, 12, tzinfo=timezone.utc))
+        self.assertEqual(str(rule),
+                         'FREQ=WEEKLY;INTERVAL=2;UNTIL=20891231T120000Z')
+
+    def test_invalid_rules_rejected(self):
+        """Test unsupported and malformed rules raise ValueError."""
+        for value in ['', 'FREQ=HOURLY', 'FREQ=DAILY;BYDAY=MO',
+                      'FREQ=DAILY;INTERVAL=0', 'FREQ=DAILY;COUNT=x',
+                      'FREQ=DAILY;COUNT=2;UNTIL=20890101', 'DAILY',
+                      'FREQ=DAILY;UNTIL=tomorrow']:
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    recurrence.parse(value)
+
+
+class RuleTests(SimpleTestCase):
+    """Test expanding recurrence rules."""
+
+    def test_occurrences_between(self):
+        """Test the occurrences of a window are listed."""
+        rule = recurrence.parse('FREQ=DAILY;INTERVAL=3')
+        start = local(2089, 1, 1, 9)
+
+        self.assertEqual(
+            list(rule.between(start, local(2089, 1, 5), local(2089, 1, 12))),
+            [local(2089, 1, 7, 9), local(2089, 1, 10, 9)],
+        )
+
+    def test_wall_clock_time_kept_across_dst(self):
+        """Test occurrences keep their local time when DST starts."""
+        rule = recurrence.parse('FREQ=WEEKLY')
+        start = local(2089, 3, 20, 9)
+
+        occurrences = list(
+            rule.between(start, start, local(2089, 4, 1))
+        )
+
+        self.assertEqual([value.hour for value in occurrences], [9, 9])
+        self.assertNotEqual(occurrences[0].utcoffset(),
+                            occurrences[1].utcoffset())
+
+    def test_short_months_use_last_day(self):
+        """Test a monthly series on the 31st falls on shorter month ends."""
+        rule = recurrence.parse('FREQ=MONTHLY;COUNT=4')
+        start = local(2089, 1, 31, 9)
+
+        self.assertEqual(
+            list(rule.between(start, start, local(2090, 1, 1))),
+            [local(2089, 1, 31, 9), local(2089, 2, 28, 9),
+             local(2089, 3, 31, 9), local(2089, 4, 30, 9)],
+        )
+        self.assertEqual(rule.last(start), local(2089, 4, 30, 9))
+
+    def test_until_is_inclusive(self):
+        """Test an occurrence at UNTIL is the last one."""
+        rule = recurrence.parse('FREQ=YEARLY;UNTIL=20910401')
+        start = local(2089, 4, 1, 9)
+
+        self.assertEqual(
+            list(rule.between(start, start, local(2100, 1, 1))),
+            [local(2089, 4, 1, 9), local(2090, 4, 1, 9),
+             local(2091, 4, 1, 9)],
+        )
+        self.assertEqual(rule.last(start), local(2091, 4, 1, 9))
+
+    def test_includes(self):
+        """Test checking whether a time is an occurrence."""
+        rule = recurrence.parse('FREQ=WEEKLY;COUNT=3')
+        start = local(2089, 4, 3, 9)
+
+        self.assertTrue(rule.includes(start, local(2089, 4, 17, 9)))
+        self.assertFalse(rule.includes(start, local(2089, 4, 24, 9)))
+        self.assertFalse(rule.includes(start, local(2089, 4, 10, 10)))
+
+    def test_endless_series(self):
+        """Test an endless series has no last occurrence and stops at the
+        end of the calendar."""
+        rule = recurrence.parse('FREQ=YEARLY;INTERVAL=1000')
+        start = local(2089, 4, 1)
+
+        self.assertIsNone(rule.last(start))
+        self.assertEqual(
+            len(list(rule.between(start, start, local(9999, 12, 1)))), 8
+        )
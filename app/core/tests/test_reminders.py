@@ -0,0 +1,189 @@
+"""
+Tests for due-date reminders.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import events
+from core.models import Task
+from core.reminders import Scheduler
+
+START = datetime(2089, 4, 1, 12, tzinfo=timezone.utc)
+
+
+class ListSink:
+    """Sink keeping the reminders it's sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminders):
+        self.sent.extend(reminders)
+
+
+class SchedulerTests(TestCase):
+    """Test firing reminders of due tasks."""
+    databases = set(settings.DATABASE_SHARDS)
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            username='Jonny123',
+        )
+        self.sink = ListSink()
+        self.scheduler = Scheduler(sink=self.sink, lead=600, window=3600,
+                                   max_pending=100)
+
+    def create_task(self, minutes, **fields):
+        return Task.objects.create(
+            user=self.user, description='Sample',
+            due_date=START + timedelta(minutes=minutes), **fields,
+        )
+
+    def tick(self, minutes):
+        return self.scheduler.tick(START + timedelta(minutes=minutes))
+
+    def sent(self):
+        return [reminder.task_id for reminder in self.sink.sent]
+
+    def change(self, task, event_type='task.updated'):
+        self.scheduler.on_event(task.user_id,
+                                {'type': event_type, 'id': task.id})
+
+    def test_reminders_fired_in_order(self):
+        """Test reminders fire their lead time before tasks are due."""
+        late = self.create_task(40)
+        early = self.create_task(20)
+        self.create_task(30, is_complete=True)
+
+        wait = self.tick(0)
+        self.assertEqual(wait, 600)
+        self.assertEqual(len(self.scheduler), 2)
+        self.tick(10)
+        self.assertEqual(self.sent(), [early.id])
+        self.tick(45)
+
+        self.assertEqual(self.sent(), [early.id, late.id])
+        self.assertEqual(self.sink.sent[0].due_date,
+                         START + timedelta(minutes=20))
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_window_loaded_as_time_passes(self):
+        """Test only reminders of the coming window are held."""
+        task = self.create_task(120)
+
+        self.tick(0)
+        self.assertEqual(len(self.scheduler), 0)
+        self.tick(90)
+        self.assertEqual(len(self.scheduler), 1)
+        self.tick(110)
+
+        self.assertEqual(self.sent(), [task.id])
+
+    def test_changes_applied(self):
+        """Test created, moved and deleted tasks update the reminders."""
+        self.tick(0)
+        created = self.create_task(20)
+        moved = self.create_task(25)
+        deleted = self.create_task(30)
+        self.change(created, 'task.created')
+        self.change(moved, 'task.created')
+        self.change(deleted, 'task.created')
+        self.tick(1)
+        self.assertEqual(len(self.scheduler), 3)
+
+        Task.objects.filter(pk=moved.pk).update(
+            due_date=START + timedelta(minutes=50)
+        )
+        self.change(moved)
+        self.change(deleted, 'task.deleted')
+        deleted.delete()
+        self.tick(40)
+
+        self.assertEqual(self.sent(), [created.id, moved.id])
+
+    def test_resync_reloads_user(self):
+        """Test a resync event reads the user's window again."""
+        task = self.create_task(20)
+        self.tick(0)
+
+        Task.objects.filter(pk=task.pk).update(is_complete=True)
+        self.scheduler.on_event(self.user.id, events.RESYNC)
+        self.tick(1)
+
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_stale_reminders_not_sent(self):
+        """Test tasks changed without an event are checked before firing."""
+        completed = self.create_task(20)
+        moved = self.create_task(20)
+        self.tick(0)
+
+        Task.objects.filter(pk=completed.pk).update(is_complete=True)
+        Task.objects.filter(pk=moved.pk).update(
+            due_date=START + timedelta(minutes=30)
+        )
+        self.tick(15)
+        self.assertEqual(self.sent(), [])
+        self.tick(25)
+
+        self.assertEqual(self.sent(), [moved.id])
+
+    def test_sent_reminder_not_repeated(self):
+        """Test changing a task after its reminder doesn't send it again."""
+        task = self.create_task(20)
+        self.tick(0)
+        self.tick(15)
+
+        self.change(task)
+        self.tick(16)
+        Task.objects.filter(pk=task.pk).update(
+            due_date=START + timedelta(minutes=40)
+        )
+        self.change(task)
+        self.tick(35)
+
+        self.assertEqual(self.sent(), [task.id, task.id])
+        self.assertEqual(self.sink.sent[1].due_date,
+                         START + timedelta(minutes=40))
+
+    def test_pending_reminders_bounded(self):
+        """Test the window shrinks to hold at most `max_pending`."""
+        self.scheduler.max_pending = 4
+        tasks = [self.create_task(20 + minute) for minute in range(10)]
+
+        self.tick(0)
+        self.assertEqual(len(self.scheduler), 4)
+        for minute in range(20, 60, 2):
+            self.tick(minute)
+            self.assertLessEqual(len(self.scheduler), 4)
+
+        self.assertEqual(self.sent(), [task.id for task in tasks])
+
+    def test_signals_reach_scheduler(self):
+        """Test saving a task notifies a listening scheduler."""
+        self.tick(0)
+        events.broker.listen(self.scheduler.on_event)
+        self.addCleanup(events.broker.unlisten, self.scheduler.on_event)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.create_task(20)
+        self.tick(10)
+
+        self.assertEqual(self.sent(), [task.id])
+
+
+class RunRemindersCommandTests(SimpleTestCase):
+    """Test the reminder scheduler command."""
+
+    @override_settings(EVENTS_BACKEND='core.events.LocalBackend')
+    def test_in_process_events_backend_rejected(self):
+        """Test the command fails when events don't cross processes."""
+        with self.assertRaisesMessage(CommandError, 'EVENTS_BACKEND'):
+            call_command('run_reminders')
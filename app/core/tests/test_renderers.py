@@ -0,0 +1,194 @@
+"""
+Tests for the API renderers and parsers.
+"""
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+import cbor2
+import msgpack
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import parsers, renderers
+from core.models import Task
+from core.parsers import CBORParser, FastJSONParser, MessagePackParser
+from core.renderers import CBORRenderer, FastJSONRenderer, MessagePackRenderer
+
+TASK_URL = reverse('task:task-list')
+
+FORMATS = [
+    (MessagePackRenderer, MessagePackParser),
+    (CBORRenderer, CBORParser),
+]
+
+
+class FastJSONTests(SimpleTestCase):
+    """Test the orjson renderer and parser match the DRF ones."""
+
+    data = {
+        'id': 1,
+        'created_at': datetime(2089, 4, 1, 12, 30, tzinfo=timezone.utc),
+        'due_date': datetime(2089, 4, 1, 12, 30, 15, 123456),
+        'description': 'Caf\u00e9 \u2028 \u2029 "quoted" \U0001f600',
+        'name': gettext_lazy('Work'),
+        'tags': [{'id': 2, 'name': 'Work'}],
+        'counts': {1: 2, None: 3},
+        'is_complete': True,
+        'priority': None,
+    }
+
+    def assertSameOutput(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_render_matches_json_renderer(self):
+        """Test the rendered bytes match JSONRenderer."""
+        self.assertSameOutput(self.data)
+        self.assertSameOutput({'id': 1, 'name': 'Work'})
+        self.assertSameOutput([self.data['created_at'], 'a\u2028b'])
+
+    def test_render_unsupported_values(self):
+        """Test values orjson renders differently are left to JSONRenderer."""
+        self.assertSameOutput({**self.data, 'price': Decimal('1E+16')})
+        self.assertSameOutput({**self.data, 'big': 2 ** 70})
+
+    def test_render_indented(self):
+        """Test indented output is left to JSONRenderer."""
+        self.assertSameOutput(self.data, 'application/json; indent=4')
+
+    def test_render_without_orjson(self):
+        """Test rendering falls back when orjson isn't installed."""
+        with patch.object(renderers, 'orjson', None):
+            self.assertSameOutput(self.data)
+
+    def test_parse_matches_json_parser(self):
+        """Test parsed data matches JSONParser."""
+        bodies = [
+            b'{"id": 1, "tags": [{"name": "Work"}], "x": 1.5e-7}',
+            '{"name": "Caf\u00e9"}'.encode(),
+            b'{"big": 123456789012345678901234567890}',
+        ]
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(
+                    FastJSONParser().parse(io.BytesIO(body)),
+                    JSONParser().parse(io.BytesIO(body)),
+                )
+
+    def test_parse_without_orjson(self):
+        """Test parsing falls back when orjson isn't installed."""
+        with patch.object(parsers, 'orjson', None):
+            data = FastJSONParser().parse(io.BytesIO(b'{"id": 1}'))
+
+        self.assertEqual(data, {'id': 1})
+
+    def test_parse_invalid_body(self):
+        """Test invalid JSON and non-finite numbers are parse errors."""
+        for body in [b'{"id": ', b'{"x": NaN}']:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(io.BytesIO(body))
+
+
+class RoundTripTests(SimpleTestCase):
+    """Test data survives rendering and parsing."""
+
+    def test_round_trip(self):
+        """Test nested data and datetimes round trip natively."""
+        data = {
+            'id': 1,
+            'due_date': datetime(2089, 4, 1, 12, 30, tzinfo=timezone.utc),
+            'tags': [{'id': 2, 'name': 'Work'}],
+            'priority': None,
+        }
+        for renderer, parser in FORMATS:
+            with self.subTest(renderer=renderer.__name__):
+                body = renderer().render(data)
+                parsed = parser().parse(io.BytesIO(body))
+
+                self.assertEqual(parsed, data)
+
+    def test_unknown_types_encoded_like_json(self):
+        """Test types without a native encoding fall back to JSON's."""
+        data = {'ratio': Decimal('0.5')}
+        body = MessagePackRenderer().render(data)
+
+        self.assertEqual(msgpack.unpackb(body), {'ratio': 0.5})
+
+    def test_invalid_body_raises_parse_error(self):
+        """Test a malformed body is a parse error."""
+        for _, parser in FORMATS:
+            with self.subTest(parser=parser.__name__):
+                with self.assertRaises(ParseError):
+                    parser().parse(io.BytesIO(b'\xc1\xff'))
+
+
+class BinaryTaskApiTests(TestCase):
+    """Test the task API over the binary formats."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            username='Jonny123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_and_list_msgpack(self):
+        """Test creating and listing tasks with MessagePack."""
+        due_date = datetime(2089, 4, 1, 12, 30, tzinfo=timezone.utc)
+        payload = {'description': 'Sample', 'due_date': due_date,
+                   'tags': [{'name': 'Work'}]}
+        res = self.client.post(
+            TASK_URL,
+            msgpack.packb(payload, datetime=True),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Task.objects.get().due_date, due_date)
+
+        res = self.client.get(TASK_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        tasks = msgpack.unpackb(res.content, timestamp=3)
+        self.assertEqual(tasks[0]['due_date'], due_date)
+        self.assertIsInstance(tasks[0]['created_at'], datetime)
+        self.assertEqual(tasks[0]['tags'][0]['name'], 'Work')
+
+    def test_list_cbor(self):
+        """Test listing tasks with CBOR."""
+        due_date = datetime(2089, 4, 1, 12, 30, tzinfo=timezone.utc)
+        Task.objects.create(user=self.user, description='Sample',
+                            due_date=due_date)
+
+        res = self.client.get(TASK_URL, {'format': 'cbor'})
+
+        self.assertEqual(res['Content-Type'], 'application/cbor')
+        self.assertEqual(cbor2.loads(res.content)[0]['due_date'], due_date)
+
+    def test_json_keeps_iso_datetimes(self):
+        """Test JSON responses still render datetimes as strings."""
+        due_date = datetime(2089, 4, 1, 12, 30, tzinfo=timezone.utc)
+        Task.objects.create(user=self.user, description='Sample',
+                            due_date=due_date)
+
+        res = self.client.get(TASK_URL)
+
+        rendered = res.json()[0]['due_date']
+        self.assertIsInstance(rendered, str)
+        self.assertEqual(datetime.fromisoformat(rendered), due_date)
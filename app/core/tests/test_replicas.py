@@ -0,0 +1,183 @@
+"""
+Tests for read replica routing.
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.db.utils import OperationalError
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import replicas
+from core.db.routers import PrimaryReplicaRouter
+from core.models import Task
+
+TASK_URL = reverse('task:task-list')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+@patch('core.db.replicas._probe')
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the primary/replica router."""
+
+    def setUp(self) -> None:
+        replicas.reset_health()
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_primary_by_default(self, patched_probe):
+        """Test reads outside a replica context use the primary."""
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        patched_probe.assert_not_called()
+
+    def test_reads_go_to_replica_when_active(self, patched_probe):
+        """Test reads inside a replica context use a replica."""
+        patched_probe.return_value = True
+
+        with replicas.read_from_replica():
+            alias = self.router.db_for_read(Task)
+
+        self.assertIn(alias, ['replica_1', 'replica_2'])
+
+    def test_writes_go_to_primary(self, patched_probe):
+        """Test writes always use the primary."""
+        with replicas.read_from_replica():
+            alias = self.router.db_for_write(Task)
+
+        self.assertEqual(alias, 'default')
+
+    def test_unhealthy_replica_skipped(self, patched_probe):
+        """Test a replica failing its probe is taken out of rotation."""
+        def probe(alias):
+            if alias == 'replica_1':
+                raise OperationalError()
+            return True
+        patched_probe.side_effect = probe
+
+        for _ in range(10):
+            self.assertEqual(replicas.choose_replica(), 'replica_2')
+
+    def test_all_replicas_down_falls_back_to_primary(self, patched_probe):
+        """Test reads fall back to the primary without healthy replicas."""
+        patched_probe.side_effect = OperationalError
+
+        self.assertEqual(replicas.choose_replica(), 'default')
+
+    def test_health_probe_is_cached(self, patched_probe):
+        """Test healthy replicas are not probed on every read."""
+        patched_probe.return_value = True
+
+        for _ in range(10):
+            replicas.choose_replica()
+
+        self.assertEqual(patched_probe.call_count, 2)
+
+    def test_replicas_not_migrated(self, patched_probe):
+        """Test migrations are not applied to replicas."""
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+@patch('core.db.replicas.choose_replica', return_value='default')
+class ReplicaViewTests(TestCase):
+    """Test task views route reads to replicas."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_reads_from_replica(self, patched_choose):
+        """Test listing tasks reads from a replica."""
+        res = self.client.get(TASK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patched_choose.assert_called()
+        self.assertFalse(replicas.is_active())
+
+    def test_write_pins_user_to_primary(self, patched_choose):
+        """Test a write keeps the user's next reads on the primary."""
+        payload = {
+            'description': 'Test task',
+            'due_date': timezone.make_aware(datetime(2089, 4, 20)),
+        }
+        res = self.client.post(TASK_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        patched_choose.reset_mock()
+
+        res = self.client.get(TASK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(replicas.is_pinned(self.user))
+        patched_choose.assert_not_called()
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Test task views against a replica mirroring the primary."""
+    databases = {'default', 'replica_1'}
+
+    def setUp(self) -> None:
+        cache.clear()
+        replicas.reset_health()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+        )
+        self.client.force_authenticate(user=self.user)
+        Task.objects.create(
+            user=self.user, description='Test task',
+            due_date=timezone.make_aware(datetime(2089, 4, 20)),
+        )
+
+    def list_tasks(self):
+        """Return the task list and the task queries run on the primary and
+        the replica."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            res = self.client.get(TASK_URL)
+
+        def task_queries(queries):
+            return [query for query in queries.captured_queries
+                    if 'core_task' in query['sql']]
+        return res, task_queries(primary), task_queries(replica)
+
+    def test_reads_go_to_replica(self):
+        """Test a user who didn't write reads from the replica."""
+        res, primary, replica = self.list_tasks()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(primary, [])
+        self.assertTrue(replica)
+
+    def test_reads_after_write_go_to_primary(self):
+        """Test a user reads their own write from the primary."""
+        res = self.client.post(TASK_URL, {
+            'description': 'Another task',
+            'due_date': timezone.make_aware(datetime(2089, 4, 21)),
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res, primary, replica = self.list_tasks()
+
+        self.assertEqual(len(res.data), 2)
+        self.assertTrue(primary)
+        self.assertEqual(replica, [])
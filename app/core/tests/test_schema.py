@@ -0,0 +1,83 @@
+"""
+Tests for serving the OpenAPI schema and the API-only profile.
+"""
+import importlib
+import json
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import clear_url_caches, reverse
+
+from rest_framework import status
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaViewTests(SimpleTestCase):
+    """Test the schema view."""
+
+    def setUp(self) -> None:
+        schema._schemas.clear()
+
+    def tearDown(self) -> None:
+        schema._schemas.clear()
+
+    def test_precomputed_schema_served(self):
+        """Test the schema file generated at build time is served."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'openapi.json'
+            path.write_text(json.dumps({'openapi': '3.0.3', 'paths': {}}))
+
+            with override_settings(OPENAPI_SCHEMA_FILE=str(path)):
+                res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content)['paths'], {})
+
+    @override_settings(OPENAPI_SCHEMA_FILE='/nonexistent/openapi.json')
+    def test_schema_generated_once(self):
+        """Test a missing schema file is generated on first use only."""
+        with patch('drf_spectacular.generators.SchemaGenerator.get_schema',
+                   return_value={'openapi': '3.0.3'}) as patched_generate:
+            self.client.get(SCHEMA_URL, {'format': 'json'})
+            res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patched_generate.assert_called_once()
+
+    @override_settings(OPENAPI_SCHEMA_FILE='/nonexistent/openapi.json')
+    def test_schema_kept_per_supported_language(self):
+        """Test unknown languages share the default language's schema."""
+        with patch('drf_spectacular.generators.SchemaGenerator.get_schema',
+                   return_value={'openapi': '3.0.3'}) as patched_generate:
+            for lang in ['zz', 'zz-1', 'en-us', 'de', 'de-at']:
+                res = self.client.get(SCHEMA_URL,
+                                      {'format': 'json', 'lang': lang})
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(set(schema._schemas), {None, 'de'})
+        self.assertEqual(patched_generate.call_count, 2)
+
+
+class ApiProfileTests(SimpleTestCase):
+    """Test the URLs mounted by the API-only profile."""
+
+    def tearDown(self) -> None:
+        importlib.reload(importlib.import_module('app.urls'))
+        clear_url_caches()
+
+    @override_settings(SERVE_ADMIN=False, SERVE_API_DOCS=False)
+    def test_admin_and_docs_not_mounted(self):
+        """Test the admin and the docs are left out."""
+        urls = importlib.reload(importlib.import_module('app.urls'))
+
+        routes = [str(pattern.pattern) for pattern in urls.urlpatterns]
+
+        self.assertNotIn('admin/', routes)
+        self.assertNotIn('api/docs/', routes)
+        self.assertIn('api/task/', routes)
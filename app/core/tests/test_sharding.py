@@ -0,0 +1,183 @@
+"""
+Tests for sharding task data by user.
+"""
+from datetime import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import sharding
+from core.db.routers import ShardRouter
+from core.models import Task, Tag, User
+
+TASK_URL = reverse('task:task-list')
+
+
+def create_task(user, **params):
+    """Create and return a task for the user."""
+    default = {
+        'description': 'Task',
+        'due_date': timezone.make_aware(datetime(2089, 4, 20)),
+    }
+    default.update(params)
+
+    return Task.objects.create(user=user, **default)
+
+
+class ShardRouterTests(SimpleTestCase):
+    """Test routing sharded models."""
+
+    def setUp(self) -> None:
+        self.router = ShardRouter()
+
+    @override_settings(DATABASE_SHARDS=['default', 'shard_1', 'shard_2'])
+    def test_new_user_shard_is_stable(self):
+        """Test new users are spread over shards deterministically."""
+        emails = [f'user{i}@example.com' for i in range(30)]
+        shards = [sharding.shard_for_new_user(email) for email in emails]
+
+        self.assertEqual(set(shards), {'default', 'shard_1', 'shard_2'})
+        self.assertEqual(
+            shards, [sharding.shard_for_new_user(e) for e in emails]
+        )
+
+    def test_sharded_models(self):
+        """Test tasks, tags and their links are sharded, users are not."""
+        self.assertTrue(sharding.is_sharded(Task))
+        self.assertTrue(sharding.is_sharded(Tag))
+        self.assertTrue(sharding.is_sharded(Task.tags.through))
+        self.assertFalse(sharding.is_sharded(User))
+
+    def test_active_shard_used_for_queries(self):
+        """Test queries without hints go to the active shard."""
+        self.assertIsNone(self.router.db_for_read(Task))
+
+        with sharding.use_shard('shard_1'):
+            self.assertEqual(self.router.db_for_read(Task), 'shard_1')
+            self.assertEqual(self.router.db_for_write(Tag), 'shard_1')
+            self.assertIsNone(self.router.db_for_read(User))
+
+    def test_user_hint_routes_to_user_shard(self):
+        """Test a user instance hint routes to that user's shard."""
+        user = User(email='test@example.com', shard='shard_2')
+
+        alias = self.router.db_for_write(Task, instance=user)
+
+        self.assertEqual(alias, 'shard_2')
+
+    def test_default_shard_left_to_next_router(self):
+        """Test the default shard defers to the replica router."""
+        with sharding.use_shard('default'):
+            self.assertIsNone(self.router.db_for_read(Task))
+
+    def test_relation_between_user_and_task_allowed(self):
+        """Test tasks may reference users stored in another database."""
+        user = User(email='test@example.com', shard='shard_1')
+        user._state.db = 'default'
+        task = Task(description='Task')
+        task._state.db = 'shard_1'
+
+        self.assertTrue(self.router.allow_relation(user, task))
+
+
+@override_settings(DATABASE_SHARDS=['default', 'shard_1'])
+class MultiShardTests(TestCase):
+    """Test moving data between shard databases."""
+    databases = {'default', 'shard_1'}
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.target = 'shard_1'
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+            shard='default',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_move_user(self):
+        """Test moving a user copies tasks, tags and links."""
+        tag = Tag.objects.create(user=self.user, name='Work')
+        task = create_task(self.user)
+        task.tags.add(tag)
+
+        moved = sharding.move_user(self.user, self.target)
+
+        self.assertEqual(moved, 1)
+        self.assertEqual(self.user.shard, self.target)
+        self.assertFalse(Task.objects.using('default').exists())
+        moved_task = Task.objects.using(self.target).get(pk=task.pk)
+        self.assertEqual(list(moved_task.tags.all()), [tag])
+
+    def test_moved_ids_unique_on_target(self):
+        """Test moved rows keep their ids next to the target's own rows."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='password123',
+            shard=self.target,
+        )
+        with sharding.use_shard(self.target):
+            other_task = create_task(other)
+        task = create_task(self.user)
+
+        sharding.move_user(self.user, self.target)
+        with sharding.use_shard(self.target):
+            new_task = create_task(self.user)
+
+        self.assertGreater(other_task.pk, sharding.SHARD_ID_RANGE)
+        self.assertEqual(
+            Task.objects.using(self.target).filter(
+                pk__in=[task.pk, other_task.pk, new_task.pk],
+            ).count(),
+            3,
+        )
+
+    def test_api_uses_user_shard(self):
+        """Test the task API reads and writes the user's shard."""
+        sharding.move_user(self.user, self.target)
+        payload = {
+            'description': 'Sharded task',
+            'due_date': timezone.make_aware(datetime(2089, 4, 20)),
+            'tags': [{'name': 'Work'}],
+        }
+
+        res = self.client.post(TASK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.get(TASK_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertTrue(
+            Task.objects.using(self.target).filter(user=self.user).exists()
+        )
+        self.assertFalse(Tag.objects.using('default').exists())
+
+    def test_delete_user_removes_sharded_data(self):
+        """Test deleting a user deletes their tasks on another shard."""
+        sharding.move_user(self.user, self.target)
+        with sharding.use_shard(self.target):
+            create_task(self.user)
+
+        self.user.delete()
+
+        self.assertFalse(Task.objects.using(self.target).exists())
+
+    def test_rebalance_command_moves_user(self):
+        """Test the rebalance command moves a single user."""
+        create_task(self.user)
+        out = StringIO()
+
+        call_command('rebalance_shards', user=self.user.pk,
+                     target=self.target, stdout=out)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.shard, self.target)
+        self.assertIn('Moved 1 tasks.', out.getvalue())
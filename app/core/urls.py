@@ -0,0 +1,16 @@
+"""
+URL mappings for the job API.
+"""
+from django.urls import include, path
+from rest_framework import routers
+
+from core import views
+
+router = routers.SimpleRouter()
+router.register(r'jobs', views.JobViewSet)
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,165 @@
+"""
+Views for operational and push endpoints.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import (
+    authentication,
+    exceptions,
+    permissions,
+    status,
+    viewsets,
+)
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import batch, events, gql, metrics
+from core.mixins import ShardMixin
+from core.models import Job
+from core.openapi import OpenApiTypes, extend_schema
+from core.serializers import BatchSerializer, JobSerializer
+
+
+class MetricsView(APIView):
+    """Return in-process metrics of this worker."""
+    authentication_classes = [authentication.TokenAuthentication,
+                              authentication.SessionAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+    schema = None
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of the authenticated user's background jobs."""
+    serializer_class = JobSerializer
+    queryset = Job.objects.all()
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return self.queryset.filter(
+            user=self.request.user
+        ).order_by('-created_at')
+
+
+class BatchView(APIView):
+    """Run several API requests in one round trip."""
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    batchable = False
+
+    @extend_schema(request=BatchSerializer,
+                   responses={200: OpenApiTypes.OBJECT})
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'responses': batch.run(
+            request,
+            serializer.validated_data['requests'],
+            parallel=serializer.validated_data['parallel'],
+        )})
+
+
+class GraphQLView(ShardMixin, APIView):
+    """Run a GraphQL query over the user's tasks and tags."""
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    schema = None
+
+    def post(self, request):
+        data = request.data
+        query = data.get('query')
+        variables = data.get('variables')
+        if not isinstance(query, (str, type(None))) or \
+                not isinstance(variables, (dict, type(None))):
+            raise exceptions.ParseError(
+                'Send a query string and a variables object.'
+            )
+        try:
+            query = gql.resolve_query(query, data.get('extensions'))
+        except gql.PersistedQueryNotFound:
+            return Response({'errors': [{
+                'message': 'PersistedQueryNotFound',
+                'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'},
+            }]})
+        except ValueError as error:
+            return Response({'errors': [{'message': str(error)}]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if query is None:
+            raise exceptions.ParseError('Send a query.')
+
+        parsed, errors = gql.document(query)
+        if errors:
+            return Response(
+                {'errors': [error.formatted for error in errors]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result = gql.run(request, parsed, variables,
+                         data.get('operationName'))
+        return Response(result.formatted)
+
+
+def _authenticate(request):
+    """Return the user authenticated by token or session, or None."""
+    request = Request(request, authenticators=[
+        authentication.TokenAuthentication(),
+        authentication.SessionAuthentication(),
+    ])
+    try:
+        user = request.user
+    except exceptions.AuthenticationFailed:
+        return None
+    return user if user.is_authenticated else None
+
+
+class EventStreamView(View):
+    """Stream the authenticated user's task and tag changes as
+    Server-Sent Events. Needs the ASGI server."""
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'detail': 'Event streams are only served over ASGI.'},
+                status=501,
+            )
+        user = await sync_to_async(_authenticate)(request)
+        if user is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=401,
+            )
+
+        response = StreamingHttpResponse(
+            self.stream(user.pk), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, user_id):
+        subscription = events.broker.subscribe(user_id)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                batch = await subscription.next_batch(
+                    settings.EVENTS_KEEPALIVE_SECONDS
+                )
+                if not batch:
+                    # Keeps proxies from closing an idle connection.
+                    yield ': keepalive\n\n'
+                    continue
+                yield ''.join(
+                    f'event: {event["type"]}\n'
+                    f'data: {json.dumps({"id": event.get("id")})}\n\n'
+                    for event in batch
+                )
+        finally:
+            events.broker.unsubscribe(subscription)
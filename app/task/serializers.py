@@ -1,15 +1,106 @@
 """
 Serializers for task APIs.
 """
+from collections import namedtuple
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
 from rest_framework import serializers
 
+from core import recurrence
 from core.models import (
     Task,
     Tag,
 )
 
+FieldPlan = namedtuple(
+    'FieldPlan', ['serializer_class', 'fields', 'columns', 'prefetch']
+)
+
+
+@lru_cache(maxsize=512)
+def field_plan(serializer_class, fields=None, expand=frozenset()):
+    """Work out which fields to render and which columns and relations to
+    load for a `?fields=`/`?expand=` request.
+
+    `columns` is None when the queryset can't be narrowed with `.only()`.
+    """
+    available = serializer_class().get_fields()
+    expandable = set(getattr(serializer_class.Meta, 'expandable_fields', ()))
+
+    unknown = sorted((fields or set()) - set(available))
+    if unknown:
+        raise serializers.ValidationError(
+            {'fields': f'Unknown fields: {", ".join(unknown)}.'}
+        )
+    unexpandable = sorted(expand - expandable)
+    if unexpandable:
+        raise serializers.ValidationError(
+            {'expand': f'Can\'t expand: {", ".join(unexpandable)}.'}
+        )
+
+    if fields is None:
+        names = tuple(available)
+    else:
+        names = tuple(
+            name for name in available if name in fields or name in expand
+        )
+
+    columns = [] if fields is not None else None
+    prefetch = []
+    model = serializer_class.Meta.model
+    for name in names:
+        field = available[name]
+        source = field.source or name
+        if isinstance(field, (serializers.ListSerializer,
+                              serializers.ManyRelatedField)):
+            prefetch.append(source)
+            continue
+        if columns is None:
+            continue
+        try:
+            concrete = model._meta.get_field(source).concrete
+        except FieldDoesNotExist:
+            concrete = False
+        if concrete:
+            columns.append(source)
+        else:
+            columns = None
+
+    return FieldPlan(
+        serializer_class,
+        names,
+        tuple(columns) if columns is not None else None,
+        tuple(prefetch),
+    )
+
+
+class SparseFieldsMixin:
+    """Render only the fields in the `field_plan` of the context."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        plan = self.context.get('field_plan')
+        if plan is None or not isinstance(self, plan.serializer_class):
+            return fields
+        return {name: fields[name] for name in plan.fields}
+
 
-class TagSerializer(serializers.ModelSerializer):
+class DateTimeField(serializers.DateTimeField):
+    """Datetime field left as a datetime for renderers that encode
+    datetimes natively."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        renderer = getattr(request, 'accepted_renderer', None)
+        if value and getattr(renderer, 'native_datetimes', False):
+            return self.enforce_timezone(value)
+        return super().to_representation(value)
+
+
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for tags."""
 
     class Meta:
@@ -18,15 +109,44 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for tasks."""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.DateTimeField: DateTimeField,
+    }
     tags = TagSerializer(many=True, required=False)
 
     class Meta:
         model = Task
         fields = ['id', 'created_at', 'description', 'is_complete',
-                  'due_date', 'priority', 'tags']
-        read_only_fields = ['id', 'created_at']
+                  'due_date', 'priority', 'tags', 'recurrence', 'series',
+                  'occurrence']
+        read_only_fields = ['id', 'created_at', 'series', 'occurrence']
+        expandable_fields = ['tags']
+
+    def validate_recurrence(self, value):
+        """Check the rule can be expanded and store it normalized."""
+        if not value:
+            return value
+        if self.instance is not None and self.instance.series_id:
+            raise serializers.ValidationError(
+                'An occurrence of a recurring task can\'t recur.'
+            )
+        try:
+            return str(recurrence.parse(value))
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def save(self, **kwargs):
+        """Save the task, reporting the checks of `Task.clean` as
+        validation errors."""
+        try:
+            return super().save(**kwargs)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(
+                serializers.as_serializer_error(exc)
+            )
 
     def _get_or_create_tags(self, tags, task):
         """Handle creating or getting tags as needed."""
@@ -63,3 +183,14 @@ class TaskSerializer(serializers.ModelSerializer):
 
         instance.save()
         return instance
+
+
+class AgendaTaskSerializer(serializers.ModelSerializer):
+    """Serializer for the tasks of an agenda bucket."""
+    serializer_field_mapping = TaskSerializer.serializer_field_mapping
+
+    class Meta:
+        model = Task
+        fields = ['id', 'description', 'is_complete', 'due_date',
+                  'priority', 'series', 'occurrence']
+        read_only_fields = fields
@@ -0,0 +1,135 @@
+"""
+Tests for the agenda API.
+"""
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Task
+
+AGENDA_URL = reverse('task:agenda-list')
+
+
+def create_task(user, due_date, **params):
+    return Task.objects.create(user=user, description='Task',
+                               due_date=due_date, **params)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class PublicAgendaApiTest(TestCase):
+    """Tests unauthorized agenda requests."""
+
+    def test_auth_required(self):
+        """Test auth is required for the agenda."""
+        res = APIClient().get(AGENDA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAgendaApiTest(TestCase):
+    """Tests authorized agenda requests."""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+            username='Jonny123',
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def agenda(self, **params):
+        return self.client.get(AGENDA_URL, {
+            'from': '2089-04-01', 'to': '2089-04-08', **params,
+        })
+
+    def summary(self, res):
+        return [
+            (bucket['date'], bucket['count'],
+             [task['id'] for task in bucket['tasks']])
+            for bucket in res.data['buckets']
+        ]
+
+    def test_tasks_bucketed_by_day(self):
+        """Test tasks are counted per day with the first of each day."""
+        first = create_task(self.user, utc(2089, 4, 2, 6))
+        second = create_task(self.user, utc(2089, 4, 2, 8))
+        create_task(self.user, utc(2089, 4, 2, 10))
+        later = create_task(self.user, utc(2089, 4, 5, 10))
+        create_task(self.user, utc(2089, 4, 9, 10))
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='password123',
+        )
+        create_task(other_user, utc(2089, 4, 2, 10))
+
+        # The buckets and the series of recurring tasks.
+        with self.assertNumQueries(2):
+            res = self.agenda(limit=2)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['period'], 'day')
+        self.assertEqual(res.data['tz'], 'Europe/Kyiv')
+        self.assertEqual(self.summary(res), [
+            (datetime(2089, 4, 2).date(), 3, [first.id, second.id]),
+            (datetime(2089, 4, 5).date(), 1, [later.id]),
+        ])
+
+    def test_days_start_in_requested_time_zone(self):
+        """Test the tz parameter decides which day a task falls on."""
+        task = create_task(self.user, utc(2089, 4, 2, 23, 30))
+
+        kyiv = self.agenda()
+        new_york = self.agenda(tz='America/New_York')
+
+        self.assertEqual(self.summary(kyiv),
+                         [(datetime(2089, 4, 3).date(), 1, [task.id])])
+        self.assertEqual(self.summary(new_york),
+                         [(datetime(2089, 4, 2).date(), 1, [task.id])])
+
+    def test_tasks_bucketed_by_week(self):
+        """Test weeks start on Monday."""
+        sunday = create_task(self.user, utc(2089, 4, 3, 9))
+        monday = create_task(self.user, utc(2089, 4, 4, 9))
+
+        res = self.agenda(period='week', to='2089-04-30')
+
+        self.assertEqual(self.summary(res), [
+            (datetime(2089, 3, 28).date(), 1, [sunday.id]),
+            (datetime(2089, 4, 4).date(), 1, [monday.id]),
+        ])
+
+    def test_recurring_tasks_counted(self):
+        """Test each occurrence of a recurring task is in its bucket."""
+        create_task(self.user, utc(2089, 4, 2, 12))
+        series = create_task(self.user, utc(2089, 3, 1, 6),
+                             recurrence='FREQ=DAILY')
+
+        res = self.agenda(to='2089-04-03', limit=1)
+
+        self.assertEqual(self.summary(res), [
+            (datetime(2089, 4, 1).date(), 1, [series.id]),
+            (datetime(2089, 4, 2).date(), 2, [series.id]),
+        ])
+        self.assertEqual(res.data['buckets'][1]['tasks'][0]['series'],
+                         series.id)
+
+    def test_invalid_parameters_return_error(self):
+        """Test bad windows, time zones and periods are rejected."""
+        for params in [{'from': ''}, {'to': 'soon'},
+                       {'to': '2089-03-01'}, {'to': '2091-01-01'},
+                       {'tz': 'Mars/Olympus'}, {'period': 'month'},
+                       {'limit': 0}, {'limit': 'all'}]:
+            with self.subTest(params=params):
+                res = self.agenda(**params)
+
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
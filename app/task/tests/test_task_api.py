@@ -1,16 +1,24 @@
 """
 Tests for task API.
 """
+import json
+import shutil
+import tempfile
 from datetime import datetime
 
+import msgpack
+
+from django.db import connection
 from django.utils import timezone
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core import archive
 from core.models import (
     Task,
     Tag,
@@ -311,3 +319,403 @@ class PrivateTaskApiTest(TestCase):
         self.assertIn(serializer1.data, res.data)
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
+
+    def test_filter_by_due_date_and_completion(self):
+        """Test filtering tasks by due date window and completion."""
+        create_task(user=self.user, description='Early',
+                    due_date=timezone.make_aware(datetime(2088, 1, 1)))
+        late = create_task(user=self.user, description='Late',
+                           due_date=timezone.make_aware(datetime(2090, 1, 1)))
+        create_task(user=self.user, description='Done', is_complete=True,
+                    due_date=timezone.make_aware(datetime(2090, 1, 1)))
+
+        params = {'due_after': '2089-01-01T00:00:00', 'is_complete': 0}
+        res = self.client.get(TASK_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [TaskSerializer(late).data])
+
+    def test_filter_invalid_date_returns_error(self):
+        """Test an unparsable due date filter is rejected."""
+        res = self.client.get(TASK_URL, {'due_before': 'tomorrow'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_invalid_completion_returns_error(self):
+        """Test a completion filter other than 0 or 1 is rejected."""
+        listed = self.client.get(TASK_URL, {'is_complete': 'abc'})
+        cleared = self.client.post(
+            reverse('task:task-clear-completed') + '?is_complete=abc'
+        )
+
+        self.assertEqual(listed.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(cleared.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_complete_matching_tasks(self):
+        """Test completing every task matching the filters at once."""
+        early = create_task(user=self.user,
+                            due_date=timezone.make_aware(datetime(2088, 1, 1)))
+        late = create_task(user=self.user,
+                           due_date=timezone.make_aware(datetime(2090, 1, 1)))
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='password123',
+        )
+        other = create_task(user=other_user,
+                            due_date=timezone.make_aware(datetime(2088, 1, 1)))
+
+        url = reverse('task:task-complete') + '?due_before=2089-01-01T00:00'
+        # Savepoint, outbox insert, update, release.
+        with self.assertNumQueries(4):
+            res = self.client.post(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'updated': 1})
+        early.refresh_from_db()
+        late.refresh_from_db()
+        other.refresh_from_db()
+        self.assertTrue(early.is_complete)
+        self.assertFalse(late.is_complete)
+        self.assertFalse(other.is_complete)
+
+    def test_complete_filtered_by_tags(self):
+        """Test completing tasks filtered by tags."""
+        tag = Tag.objects.create(user=self.user, name='Work')
+        tagged = create_task(user=self.user)
+        tagged.tags.add(tag)
+        untagged = create_task(user=self.user)
+
+        url = reverse('task:task-complete') + f'?tags={tag.id}'
+        res = self.client.post(url)
+
+        self.assertEqual(res.data, {'updated': 1})
+        tagged.refresh_from_db()
+        untagged.refresh_from_db()
+        self.assertTrue(tagged.is_complete)
+        self.assertFalse(untagged.is_complete)
+
+    def test_clear_completed_tasks(self):
+        """Test deleting completed tasks and their tag links at once."""
+        tag = Tag.objects.create(user=self.user, name='Work')
+        done = create_task(user=self.user, is_complete=True)
+        done.tags.add(tag)
+        open_task = create_task(user=self.user)
+        open_task.tags.add(tag)
+
+        # Savepoint, outbox insert, task and link deletes, release: no
+        # ids are read.
+        with self.assertNumQueries(5):
+            res = self.client.post(reverse('task:task-clear-completed'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 1})
+        self.assertFalse(Task.objects.filter(id=done.id).exists())
+        self.assertEqual(
+            list(Task.tags.through.objects.values_list('task_id', flat=True)),
+            [open_task.id],
+        )
+        self.assertTrue(Tag.objects.filter(id=tag.id).exists())
+
+    def test_sparse_fields(self):
+        """Test only the requested fields are returned and loaded."""
+        task = create_task(user=self.user)
+        task.tags.add(Tag.objects.create(user=self.user, name='Work'))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TASK_URL, {'fields': 'id,description'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, [{'id': task.id, 'description': task.description}]
+        )
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('core_tag', sql)
+        self.assertNotIn('"priority"', sql)
+
+    def test_expand_tags(self):
+        """Test expanding tags adds them to a sparse response."""
+        task = create_task(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Work')
+        task.tags.add(tag)
+
+        res = self.client.get(
+            detail_url(task.id), {'fields': 'id', 'expand': 'tags'}
+        )
+
+        self.assertEqual(
+            res.data, {'id': task.id, 'tags': [{'id': tag.id, 'name': 'Work'}]}
+        )
+
+    def test_list_prefetches_tags(self):
+        """Test listing tasks doesn't query tags once per task."""
+        tag = Tag.objects.create(user=self.user, name='Work')
+        for _ in range(3):
+            create_task(user=self.user).tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(TASK_URL)
+        count = len(queries)
+
+        create_task(user=self.user).tags.add(tag)
+        with self.assertNumQueries(count):
+            self.client.get(TASK_URL)
+
+    def test_unknown_field_returns_error(self):
+        """Test requesting an unknown field returns an error."""
+        res = self.client.get(TASK_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecurringTaskApiTest(TestCase):
+    """Tests for recurring tasks."""
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+            username='Jonny123',
+        )
+        self.client.force_authenticate(user=self.user)
+        self.series = create_task(
+            user=self.user, description='Standup',
+            due_date=timezone.make_aware(datetime(2089, 4, 3, 9)),
+            recurrence='FREQ=WEEKLY;COUNT=10',
+        )
+
+    def list_window(self, start, end, **params):
+        return self.client.get(TASK_URL, {
+            'due_after': start, 'due_before': end, **params,
+        })
+
+    def test_create_recurring_task(self):
+        """Test creating a task with a recurrence rule."""
+        res = self.client.post(TASK_URL, {
+            'description': 'Rent',
+            'due_date': '2089-04-01T12:00:00Z',
+            'recurrence': 'freq=monthly',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        task = Task.objects.get(id=res.data['id'])
+        self.assertEqual(task.recurrence, 'FREQ=MONTHLY')
+        self.assertIsNone(task.recurrence_end)
+        self.assertEqual(self.series.recurrence_end,
+                         timezone.make_aware(datetime(2089, 6, 5, 9)))
+
+    def test_invalid_recurrence_returns_error(self):
+        """Test an unsupported rule is rejected."""
+        res = self.client.post(TASK_URL, {
+            'description': 'Rent',
+            'due_date': '2089-04-01T12:00:00Z',
+            'recurrence': 'FREQ=HOURLY',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recurrence', res.data)
+
+    def test_finished_series_in_past_returns_error(self):
+        """Test a series without occurrences to come is due too early."""
+        res = self.client.post(TASK_URL, {
+            'description': 'Rent',
+            'due_date': '2000-01-01T00:00:00Z',
+            'recurrence': 'FREQ=YEARLY;COUNT=1',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Task.objects.filter(description='Rent').exists())
+
+    def test_window_lists_occurrences(self):
+        """Test a due date window lists the occurrences inside it."""
+        single = create_task(
+            user=self.user,
+            due_date=timezone.make_aware(datetime(2089, 4, 20)),
+        )
+
+        res = self.list_window('2089-04-10T00:00', '2089-05-01T00:00')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(task['id'], task['series'], task['due_date'])
+             for task in res.data],
+            [(self.series.id, self.series.id, '2089-04-24T09:00:00+03:00'),
+             (single.id, None, '2089-04-20T00:00:00+03:00'),
+             (self.series.id, self.series.id, '2089-04-17T09:00:00+03:00'),
+             (self.series.id, self.series.id, '2089-04-10T09:00:00+03:00')],
+        )
+        self.assertEqual(res.data[0]['occurrence'], res.data[0]['due_date'])
+        self.assertEqual(res.data[0]['description'], 'Standup')
+
+    def test_list_without_window_lists_series(self):
+        """Test tasks are listed as stored without a due date window."""
+        res = self.client.get(TASK_URL)
+
+        self.assertEqual(res.data, [TaskSerializer(self.series).data])
+
+    def test_window_cost_independent_of_series_length(self):
+        """Test a window late in a series needs no more queries."""
+        endless = create_task(
+            user=self.user,
+            due_date=timezone.make_aware(datetime(2089, 1, 1, 8)),
+            recurrence='FREQ=DAILY',
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.list_window('2089-04-10T00:00', '2089-04-11T00:00')
+        with self.assertNumQueries(len(queries)):
+            res = self.list_window('2189-04-10T00:00', '2189-04-11T00:00')
+
+        self.assertEqual(
+            [(task['series'], task['due_date']) for task in res.data],
+            [(endless.id, '2189-04-10T08:00:00+03:00')],
+        )
+
+    def test_modify_occurrence_materializes_it(self):
+        """Test changing one occurrence stores it as its own task."""
+        tag = Tag.objects.create(user=self.user, name='Work')
+        self.series.tags.add(tag)
+        url = reverse('task:task-occurrence', args=[self.series.id])
+
+        res = self.client.patch(url, {
+            'occurrence': '2089-04-17T09:00:00+03:00',
+            'is_complete': True,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        task = Task.objects.get(id=res.data['id'])
+        self.assertEqual(task.series, self.series)
+        self.assertTrue(task.is_complete)
+        self.assertEqual(list(task.tags.all()), [tag])
+        res = self.list_window('2089-04-10T00:00', '2089-04-20T00:00')
+        self.assertEqual(
+            [(item['id'], item['is_complete']) for item in res.data],
+            [(task.id, True), (self.series.id, False)],
+        )
+
+    def test_modify_occurrence_twice_reuses_task(self):
+        """Test an occurrence is only stored once."""
+        url = reverse('task:task-occurrence', args=[self.series.id])
+        at = '2089-04-17T09:00:00+03:00'
+
+        first = self.client.patch(url, {'occurrence': at, 'priority': 2})
+        second = self.client.patch(url, {'occurrence': at, 'priority': 3})
+
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(self.series.occurrences.get().priority, 3)
+
+    def test_modify_unknown_occurrence_returns_error(self):
+        """Test a time that isn't an occurrence is rejected."""
+        url = reverse('task:task-occurrence', args=[self.series.id])
+
+        res = self.client.patch(url, {
+            'occurrence': '2089-04-18T09:00:00+03:00',
+            'is_complete': True,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(self.series.occurrences.exists())
+
+    def test_bulk_actions_skip_series(self):
+        """Test completing and clearing tasks leaves series alone."""
+        url = reverse('task:task-occurrence', args=[self.series.id])
+        self.client.patch(url, {'occurrence': '2089-04-10T09:00:00+03:00',
+                                'is_complete': True})
+
+        completed = self.client.post(reverse('task:task-complete'))
+        cleared = self.client.post(reverse('task:task-clear-completed'))
+
+        self.assertEqual(completed.data, {'updated': 0})
+        self.assertEqual(cleared.data, {'deleted': 0})
+        self.series.refresh_from_db()
+        self.assertFalse(self.series.is_complete)
+        self.assertTrue(self.series.occurrences.exists())
+
+    def test_too_many_occurrences_returns_error(self):
+        """Test an unbounded window of a frequent series is rejected."""
+        create_task(
+            user=self.user,
+            due_date=timezone.make_aware(datetime(2089, 1, 1)),
+            recurrence='FREQ=DAILY',
+        )
+
+        with self.settings(TASK_MAX_OCCURRENCES=5):
+            res = self.list_window('2089-01-01T00:00', '2089-02-01T00:00')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ArchivedTaskApiTest(TestCase):
+    """Tests for listing archived tasks."""
+
+    def setUp(self) -> None:
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+        settings = self.settings(TASK_ARCHIVE_DIR=archive_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='password123',
+            username='Jonny123',
+        )
+        self.client.force_authenticate(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Home')
+        self.archived = create_task(
+            user=self.user, description='Old', is_complete=True,
+            due_date=timezone.make_aware(datetime(2089, 1, 5)),
+        )
+        self.archived.tags.add(self.tag)
+        archive.archive_shard(
+            'default', timezone.make_aware(datetime(2089, 2, 1))
+        )
+        self.task = create_task(user=self.user)
+
+    def list_tasks(self, **params):
+        res = self.client.get(TASK_URL, {'include_archived': 1, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return json.loads(b''.join(res.streaming_content))
+
+    def test_archived_tasks_listed_after_tasks(self):
+        """Test archived tasks are streamed after the other tasks."""
+        tasks = self.list_tasks()
+
+        self.assertEqual([task['id'] for task in tasks],
+                         [self.task.id, self.archived.id])
+        self.assertEqual(tasks[1]['description'], 'Old')
+        self.assertEqual(tasks[1]['tags'],
+                         [{'id': self.tag.id, 'name': 'Home'}])
+
+    def test_archived_tasks_hidden_by_default(self):
+        """Test the list leaves archived tasks out unless asked."""
+        res = self.client.get(TASK_URL)
+
+        self.assertEqual([task['id'] for task in res.data], [self.task.id])
+
+    def test_filters_apply_to_archived_tasks(self):
+        """Test list filters and sparse fields apply to the archive."""
+        self.assertEqual(self.list_tasks(is_complete=0),
+                         TaskSerializer([self.task], many=True).data)
+        self.assertEqual(
+            self.list_tasks(tags=self.tag.id, fields='id'),
+            [{'id': self.archived.id}],
+        )
+        self.assertEqual(
+            self.list_tasks(due_after='2089-02-01T00:00', fields='id'),
+            [{'id': self.task.id}],
+        )
+
+    def test_archived_tasks_in_negotiated_format(self):
+        """Test a list with archived tasks is rendered as MessagePack when
+        asked for."""
+        res = self.client.get(TASK_URL, {'include_archived': 1},
+                              HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        tasks = msgpack.unpackb(res.content, timestamp=3)
+        self.assertEqual([task['id'] for task in tasks],
+                         [self.task.id, self.archived.id])
+        self.assertEqual(tasks[1]['due_date'], self.archived.due_date)
@@ -9,6 +9,7 @@ from task import views
 router = routers.DefaultRouter()
 router.register(r'tasks', views.TaskViewSet)
 router.register(r'tags', views.TagViewSet)
+router.register(r'agenda', views.AgendaViewSet, basename='agenda')
 
 app_name = 'task'
 
@@ -1,27 +1,55 @@
 """
 Views for the task APIs.
 """
-from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import (
-    extend_schema_view,
-    extend_schema,
-    OpenApiParameter,
-)
+import zoneinfo
+from datetime import datetime, timedelta
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber, TruncDay, TruncWeek
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import (
     permissions,
     authentication,
     viewsets,
     mixins,
 )
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
 from task.serializers import (
+    AgendaTaskSerializer,
     TaskSerializer,
     TagSerializer,
+    field_plan,
 )
 from core.models import (
     Task,
     Tag,
 )
+from core.openapi import (
+    OpenApiTypes,
+    extend_schema_view,
+    extend_schema,
+    OpenApiParameter,
+)
+from core import archive, events, outbox, recurrence
+from core.mixins import (
+    CoalescedReadMixin,
+    IdempotencyMixin,
+    OutboxMixin,
+    ReplicaReadMixin,
+    ShardMixin,
+)
+from core.renderers import FastJSONRenderer
+
+# Tasks serialized at a time when a list is streamed.
+STREAM_BATCH_SIZE = 500
 
 
 def _params_to_ints(qs: str) -> list[int]:
@@ -29,18 +57,188 @@ def _params_to_ints(qs: str) -> list[int]:
     return [int(str_id) for str_id in qs.split(',')]
 
 
+def _param_to_datetime(name: str, value: str) -> datetime:
+    """Convert an ISO 8601 string to an aware datetime."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: 'Enter a valid ISO 8601 date/time.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _param_to_bool(name: str, value: str) -> bool:
+    """Convert a 0/1 flag to a boolean."""
+    if value not in ('0', '1'):
+        raise ValidationError({name: 'Expected 0 or 1.'})
+    return value == '1'
+
+
+def _delete_all(queryset, using) -> int:
+    """Delete the rows of `queryset` with a single DELETE, without reading
+    them, and return their number.
+
+    Unlike `QuerySet.delete()` no cascade runs and no delete signals are
+    sent.
+    """
+    ids, params = queryset.values('pk').query.get_compiler(using).as_sql()
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    meta = queryset.model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(meta.db_table)} '
+            f'WHERE {quote(meta.pk.column)} IN ({ids})',
+            params,
+        )
+        return cursor.rowcount
+
+
+def _params_to_set(qs: str | None) -> frozenset[str] | None:
+    """Convert a comma separated list of names to a set."""
+    if not qs:
+        return None
+    return frozenset(name.strip() for name in qs.split(',') if name.strip())
+
+
+def expand_series(queryset, start, end, param):
+    """Return the unchanged occurrences due from `start` until `end` of
+    the recurring tasks in `queryset`, as unsaved tasks.
+
+    Too many occurrences are reported as an error of the `param` filter.
+    """
+    series = list(
+        queryset.exclude(recurrence='')
+        .filter(is_complete=False, due_date__lt=end)
+        .filter(Q(recurrence_end__isnull=True) |
+                Q(recurrence_end__gte=start))
+    )
+    if not series:
+        return []
+    # Occurrences stored as their own tasks are listed as such. Naming the
+    # users lets a partitioned task table read only their partitions.
+    changed = set(
+        Task.objects.filter(user_id__in={task.user_id for task in series},
+                            series__in=series, occurrence__gte=start,
+                            occurrence__lt=end)
+        .values_list('series_id', 'occurrence')
+    )
+
+    occurrences = []
+    for task in series:
+        rule = recurrence.parse(task.recurrence)
+        for at in rule.between(task.due_date, start, end):
+            if (task.pk, at) in changed:
+                continue
+            if len(occurrences) == settings.TASK_MAX_OCCURRENCES:
+                raise ValidationError({
+                    param: 'Too many occurrences, narrow the window.',
+                })
+            occurrences.append(task.occurrence_at(at))
+    return occurrences
+
+
+class SparseFieldsMixin:
+    """Support `?fields=` and `?expand=` on read actions.
+
+    Only the requested fields are rendered, only their columns are loaded
+    and relations are only prefetched when they are rendered.
+    """
+
+    def get_field_plan(self):
+        if self.request.method != 'GET':
+            return None
+        params = self.request.query_params
+        return field_plan(
+            self.get_serializer_class(),
+            _params_to_set(params.get('fields')),
+            _params_to_set(params.get('expand')) or frozenset(),
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['field_plan'] = self.get_field_plan()
+        return context
+
+    def narrow_queryset(self, queryset, *required):
+        """Load only the columns and relations the response renders, and
+        the `required` columns."""
+        plan = self.get_field_plan()
+        if plan is None:
+            return queryset
+        if plan.columns is not None:
+            queryset = queryset.only(*plan.columns, *required)
+        if plan.prefetch:
+            queryset = queryset.prefetch_related(*plan.prefetch)
+        return queryset
+
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return',
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description='Comma separated list of nested fields to add',
+    ),
+]
+
+TASK_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma seperated list of tag IDs to filter',
+    ),
+    OpenApiParameter(
+        'is_complete',
+        OpenApiTypes.INT, enum=[0, 1],
+        description='Filter by completion status',
+    ),
+    OpenApiParameter(
+        'due_before',
+        OpenApiTypes.DATETIME,
+        description='Only tasks due before this time',
+    ),
+    OpenApiParameter(
+        'due_after',
+        OpenApiTypes.DATETIME,
+        description='Only tasks due at or after this time',
+    ),
+]
+
+
 @extend_schema_view(
     list=extend_schema(
-        parameters=[
+        parameters=TASK_FILTER_PARAMETERS + [
             OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Comma seperated list of tag IDs to filter',
-            )
-        ]
-    )
+                'include_archived',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Append archived tasks to the list',
+            ),
+        ] + SPARSE_FIELDS_PARAMETERS,
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
+    complete=extend_schema(
+        parameters=TASK_FILTER_PARAMETERS,
+        request=None,
+        responses={200: OpenApiTypes.OBJECT},
+    ),
+    clear_completed=extend_schema(
+        parameters=TASK_FILTER_PARAMETERS,
+        request=None,
+        responses={200: OpenApiTypes.OBJECT},
+    ),
 )
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(IdempotencyMixin,
+                  ShardMixin,
+                  CoalescedReadMixin,
+                  ReplicaReadMixin,
+                  SparseFieldsMixin,
+                  OutboxMixin,
+                  viewsets.ModelViewSet):
     """
     API endpoint that allows tasks to be viewed or edited.
     """
@@ -49,17 +247,216 @@ class TaskViewSet(viewsets.ModelViewSet):
     authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
-        tags = self.request.query_params.get('tags')
+    def get_due_window(self):
+        """Return the `due_after` and `due_before` filters, or None."""
+        params = self.request.query_params
+        due_after = params.get('due_after')
+        due_before = params.get('due_before')
+        return (
+            _param_to_datetime('due_after', due_after) if due_after else None,
+            _param_to_datetime('due_before', due_before)
+            if due_before else None,
+        )
+
+    def expands_series(self):
+        """Recurring tasks are listed as their occurrences when the list
+        is limited to a due date window."""
+        return self.action == 'list' and None not in self.get_due_window()
+
+    def filter_tasks(self, queryset):
+        """Apply the user and the filters other than due dates."""
+        params = self.request.query_params
+        tags = params.get('tags')
+        is_complete = params.get('is_complete')
 
-        queryset = self.queryset
         if tags:
             tag_ids = _params_to_ints(tags)
             queryset = queryset.filter(tags__id__in=tag_ids)
+        if is_complete is not None:
+            queryset = queryset.filter(
+                is_complete=_param_to_bool('is_complete', is_complete),
+            )
+        return queryset.filter(user=self.request.user)
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-due_date')
+    def get_queryset(self):
+        queryset = self.filter_tasks(self.queryset)
+        due_after, due_before = self.get_due_window()
+        required = ()
+        if self.expands_series():
+            # Occurrences are added by `list`.
+            queryset = queryset.filter(recurrence='')
+            required = ('due_date',)
+        if due_before:
+            queryset = queryset.filter(due_date__lt=due_before)
+        if due_after:
+            queryset = queryset.filter(due_date__gte=due_after)
+
+        # Ties are broken by id, the (user, due_date) index doesn't.
+        return self.narrow_queryset(queryset, *required) \
+            .order_by('-due_date', 'id')
+
+    def get_occurrences(self, start, end):
+        """Return the unchanged occurrences of recurring tasks due from
+        `start` until `end`, as unsaved tasks."""
+        series = self.narrow_queryset(
+            self.filter_tasks(self.queryset),
+            'due_date', 'recurrence', 'user',
+        )
+        return expand_series(series, start, end, 'due_before')
+
+    def get_archived(self):
+        """Return an iterator of the user's archived tasks matching the
+        list filters."""
+        params = self.request.query_params
+        tags = params.get('tags')
+        is_complete = params.get('is_complete')
+        if is_complete is not None and \
+                not _param_to_bool('is_complete', is_complete):
+            return iter(())
+        tag_ids = set(_params_to_ints(tags)) if tags else None
+        due_after, due_before = self.get_due_window()
+
+        def matches(task):
+            if (due_after is not None and task.due_date < due_after) or \
+                    (due_before is not None and task.due_date >= due_before):
+                return False
+            return tag_ids is None or \
+                not tag_ids.isdisjoint(tag.pk for tag in task.tags.all())
+
+        return filter(matches, archive.user_archive(self.request.user))
+
+    def stream(self, tasks):
+        """Return a response streaming the tasks as a JSON array, a batch
+        at a time."""
+        renderer = FastJSONRenderer()
+
+        def render():
+            iterator = iter(tasks)
+            opening = b'['
+            while batch := list(islice(iterator, STREAM_BATCH_SIZE)):
+                data = renderer.render(
+                    self.get_serializer(batch, many=True).data
+                )
+                yield opening + data[1:-1]
+                opening = b','
+            yield b'[]' if opening == b'[' else b']'
+
+        return StreamingHttpResponse(render(),
+                                     content_type='application/json')
+
+    def list(self, request, *args, **kwargs):
+        include_archived = request.query_params.get('include_archived') == '1'
+        if not self.expands_series() and not include_archived:
+            return super().list(request, *args, **kwargs)
+
+        tasks = list(self.get_queryset())
+        if self.expands_series():
+            tasks.extend(self.get_occurrences(*self.get_due_window()))
+            tasks.sort(key=lambda task: task.due_date, reverse=True)
+        if include_archived:
+            tasks = chain(tasks, self.get_archived())
+            if isinstance(request.accepted_renderer, FastJSONRenderer):
+                # The archive index is read now, while the user's shard is
+                # active, and the segments while the response is sent.
+                return self.stream(tasks)
+            # Other formats are rendered whole by the negotiated renderer.
+            tasks = list(tasks)
+        serializer = self.get_serializer(tasks, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['patch'])
+    def occurrence(self, request, pk=None):
+        """Change one occurrence of a recurring task, storing it as its
+        own task."""
+        series = self.get_object()
+        value = request.data.get('occurrence')
+        at = None
+        if isinstance(value, str) and value:
+            at = _param_to_datetime('occurrence', value)
+        if at is None or not series.recurrence or \
+                not recurrence.parse(series.recurrence) \
+                .includes(series.due_date, at):
+            raise ValidationError(
+                {'occurrence': 'Not an occurrence of this task.'}
+            )
+
+        with self._atomic():
+            task, created = series.materialize(at)
+            if created:
+                outbox.record(request.user.pk, 'task.created',
+                              self._outbox_payload(task))
+            serializer = self.get_serializer(task, data=request.data,
+                                             partial=True)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+
+        return Response(serializer.data)
+
+    def bulk_targets(self, queryset, using):
+        """Return the user's tasks in a filtered queryset, once each.
+
+        The filters may join through tags, so they are applied in a
+        subquery and a task matching several tags is still one row.
+        """
+        return Task.objects.using(using).filter(
+            user=self.request.user, id__in=queryset.values('id'),
+        )
+
+    @action(detail=False, methods=['post'])
+    def complete(self, request):
+        """Mark every task matching the list filters complete."""
+        using = router.db_for_write(Task)
+        # Completing a recurring task would end its series.
+        tasks = self.bulk_targets(
+            self.get_queryset().filter(is_complete=False, recurrence=''),
+            using,
+        )
+
+        with transaction.atomic(using=using):
+            # Recorded first, while the tasks still match the filters.
+            outbox.record_each(request.user.pk, 'task.completed', tasks,
+                               using=using)
+            updated = tasks.update(is_complete=True)
+            if updated:
+                # Bulk updates send no signals, ask clients to refetch.
+                events.publish(request.user.pk, 'resync', using=using)
+
+        return Response({'updated': updated})
+
+    @action(detail=False, methods=['post'], url_path='clear-completed')
+    def clear_completed(self, request):
+        """Delete every completed task matching the list filters."""
+        using = router.db_for_write(Task)
+        # Deleting a completed occurrence would bring it back, and its
+        # series may still have other occurrences.
+        tasks = self.bulk_targets(
+            self.get_queryset().filter(
+                is_complete=True, recurrence='', series__isnull=True,
+            ),
+            using,
+        )
+
+        with transaction.atomic(using=using):
+            outbox.record_each(request.user.pk, 'task.deleted', tasks,
+                               using=using)
+            # Nothing else references tasks, so they are deleted with a
+            # single statement instead of being loaded by the cascade
+            # collector. No post_delete signals are sent: the resync event
+            # stands in for the per-task ones, and the view drops the
+            # user's shared reads after the write. Tag filters join
+            # through the tag links, so those are deleted afterwards: the
+            # foreign key is checked at commit.
+            deleted = _delete_all(tasks, using)
+            if deleted:
+                Task.tags.through.objects.using(using).filter(
+                    tag__user=request.user,
+                ).exclude(
+                    task_id__in=Task.objects.using(using)
+                    .filter(user=request.user).values('id'),
+                ).delete()
+                events.publish(request.user.pk, 'resync', using=using)
+
+        return Response({'deleted': deleted})
 
 
 @extend_schema_view(
@@ -70,10 +467,16 @@ class TaskViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes',
             )
-        ]
+        ] + SPARSE_FIELDS_PARAMETERS
     )
 )
-class TagViewSet(viewsets.GenericViewSet,
+class TagViewSet(IdempotencyMixin,
+                 ShardMixin,
+                 CoalescedReadMixin,
+                 ReplicaReadMixin,
+                 SparseFieldsMixin,
+                 OutboxMixin,
+                 viewsets.GenericViewSet,
                  mixins.DestroyModelMixin,
                  mixins.UpdateModelMixin,
                  mixins.ListModelMixin):
@@ -93,6 +496,162 @@ class TagViewSet(viewsets.GenericViewSet,
         if assigned_only:
             queryset = queryset.filter(task__isnull=False)
 
-        return queryset.filter(
+        return self.narrow_queryset(queryset).filter(
             user=self.request.user
         ).order_by('-name').distinct()
+
+
+AGENDA_PERIODS = {'day': TruncDay, 'week': TruncWeek}
+
+AGENDA_MAX_LIMIT = 100
+
+
+def _bucket_start(value, period, tz):
+    """Return the first day of the bucket of an aware datetime."""
+    day = timezone.localtime(value, tz).date()
+    if period == 'week':
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'from', OpenApiTypes.STR, required=True,
+                description='Start of the agenda, an ISO 8601 date or '
+                            'date/time',
+            ),
+            OpenApiParameter(
+                'to', OpenApiTypes.STR, required=True,
+                description='End of the agenda (exclusive), an ISO 8601 '
+                            'date or date/time',
+            ),
+            OpenApiParameter(
+                'tz', OpenApiTypes.STR,
+                description='IANA time zone the days start in',
+            ),
+            OpenApiParameter(
+                'period', OpenApiTypes.STR, enum=list(AGENDA_PERIODS),
+                description='Bucket tasks by day (default) or week',
+            ),
+            OpenApiParameter(
+                'limit', OpenApiTypes.INT,
+                description='Most tasks to return per bucket',
+            ),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    ),
+)
+class AgendaViewSet(ShardMixin,
+                    ReplicaReadMixin,
+                    viewsets.GenericViewSet):
+    """
+    API endpoint counting the user's tasks per day or week, with the
+    first tasks of each.
+    """
+    serializer_class = AgendaTaskSerializer
+    queryset = Task.objects.all()
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_timezone(self):
+        name = self.request.query_params.get('tz')
+        if not name:
+            return timezone.get_current_timezone()
+        try:
+            return zoneinfo.ZoneInfo(name)
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            raise ValidationError({'tz': 'Unknown time zone.'})
+
+    def get_bound(self, name, tz):
+        value = self.request.query_params.get(name)
+        if not value:
+            raise ValidationError({name: 'This parameter is required.'})
+        day = parse_date(value)
+        if day is None:
+            return _param_to_datetime(name, value)
+        return datetime.combine(day, datetime.min.time(), tzinfo=tz)
+
+    def get_limit(self):
+        value = self.request.query_params.get(
+            'limit', settings.AGENDA_TASKS_PER_BUCKET
+        )
+        try:
+            limit = int(value)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= AGENDA_MAX_LIMIT:
+            raise ValidationError(
+                {'limit': f'Enter a number from 1 to {AGENDA_MAX_LIMIT}.'}
+            )
+        return limit
+
+    def list(self, request):
+        params = request.query_params
+        tz = self.get_timezone()
+        start = self.get_bound('from', tz)
+        end = self.get_bound('to', tz)
+        if end <= start:
+            raise ValidationError({'to': 'Must be later than from.'})
+        if end - start > timedelta(days=settings.AGENDA_MAX_DAYS):
+            raise ValidationError({
+                'to': f'The agenda spans {settings.AGENDA_MAX_DAYS} days '
+                      f'at most.',
+            })
+        period = params.get('period', 'day')
+        if period not in AGENDA_PERIODS:
+            raise ValidationError({'period': 'Expected day or week.'})
+        limit = self.get_limit()
+
+        # Counts and the first tasks of each bucket in one query, read
+        # from the (user, due_date) index.
+        bucket = AGENDA_PERIODS[period]('due_date', tzinfo=tz)
+        columns = self.serializer_class.Meta.fields
+        tasks = self.queryset.filter(
+            user=request.user,
+            due_date__gte=start,
+            due_date__lt=end,
+            recurrence='',
+        ).annotate(
+            bucket_size=Window(Count('id'), partition_by=[bucket]),
+            position=Window(
+                RowNumber(),
+                partition_by=[bucket],
+                order_by=[F('due_date').asc(), F('id').asc()],
+            ),
+        ).filter(
+            position__lte=limit,
+        ).only(*columns).order_by('due_date', 'id')
+
+        buckets = {}
+        for task in tasks:
+            day = _bucket_start(task.due_date, period, tz)
+            counted = buckets.setdefault(day, [task.bucket_size, []])
+            counted[1].append(task)
+
+        series = self.queryset.filter(user=request.user) \
+            .only(*columns, 'recurrence', 'user')
+        for occurrence in expand_series(series, start, end, 'to'):
+            day = _bucket_start(occurrence.due_date, period, tz)
+            counted = buckets.setdefault(day, [0, []])
+            counted[0] += 1
+            counted[1].append(occurrence)
+
+        results = []
+        for day in sorted(buckets):
+            count, day_tasks = buckets[day]
+            day_tasks.sort(key=lambda task: task.due_date)
+            results.append({
+                'date': day,
+                'count': count,
+                'tasks': self.get_serializer(day_tasks[:limit],
+                                             many=True).data,
+            })
+        return Response({
+            'from': start,
+            'to': end,
+            'tz': str(tz),
+            'period': period,
+            'buckets': results,
+        })
@@ -1,10 +1,12 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, authentication, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.purge import schedule_user_purge
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
@@ -22,7 +24,7 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
     authentication_classes = [authentication.TokenAuthentication]
@@ -31,3 +33,8 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return the authenticated user."""
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """Disable the account now and delete its data in the background."""
+        schedule_user_purge(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)